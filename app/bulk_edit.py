@@ -0,0 +1,206 @@
+"""一括編集・一括削除の共通ヘルパー。
+
+各一覧画面の選択モードで選んだレコード（ログインユーザーが所有するもの）に、
+同じ変更をまとめて適用する。POST の JSON ボディは
+{"ids": [1, 2, 3], "changes": {"category": 5, "shift_days": -1}} の形で、
+変更は UPDATE ... WHERE user_id = ... AND id IN (...) の1クエリで行い、件数を返す。
+
+削除はカスケードもシグナルもなければ _raw_delete の1クエリで行う。
+シグナルで派生データを保つモデル（取引 → 月次集計）は BulkTarget.sync を指定し、
+シグナルを通らない代わりに変更前後の内容を渡して差分を反映する。
+"""
+from __future__ import annotations
+
+import copy
+import json
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any
+
+from django.db import transaction as db_transaction
+from django.db.models import F, Model, QuerySet
+from django.db.models.deletion import DO_NOTHING, Collector
+from django.http import HttpRequest, JsonResponse
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    from django.contrib.auth.base_user import AbstractBaseUser
+
+# 日時の項目をずらす変更の名前（値は日数）
+SHIFT_DAYS = 'shift_days'
+MAX_SHIFT_DAYS = 3650
+
+
+class BulkEditError(ValueError):
+    """一括編集の内容が不正。code はレスポンスの error にそのまま使う。"""
+
+    def __init__(self, code: str) -> None:
+        super().__init__(code)
+        self.code = code
+
+
+@dataclass(frozen=True)
+class BulkTarget:
+    """一括編集・一括削除の対象モデルと、変更できる項目。"""
+
+    model: type[Model]
+    # 選択肢から選ぶ項目（項目名 → 選べる値）
+    choice_fields: dict[str, tuple[Any, ...]] = field(default_factory=dict)
+    # 参照先を選ぶ外部キー（項目名 → ユーザーが選べる参照先のクエリセットを返す関数）。
+    # null 可の項目は None で解除できる
+    owned_fields: dict[str, Callable[[AbstractBaseUser], QuerySet]] = field(default_factory=dict)
+    # shift_days でずらす日時の項目（空のものはそのまま）
+    date_fields: tuple[str, ...] = ()
+    # シグナルの代わりに派生データを更新する関数（変更前, 変更後のインスタンス）。削除では変更後は空
+    sync: Callable[[list[Model], list[Model]], None] | None = None
+    # sync に渡すインスタンスに読み込む項目
+    sync_fields: tuple[str, ...] = ()
+
+
+def parse_ids(payload: object) -> list[int] | None:
+    """{"ids": [...]} から整数の ID を取り出す。ids がリストでなければ None。"""
+    raw_ids = payload.get('ids', []) if isinstance(payload, dict) else None
+    if not isinstance(raw_ids, list):
+        return None
+    return [int(i) for i in raw_ids if isinstance(i, int) or (isinstance(i, str) and i.isdigit())]
+
+
+def clean_changes(target: BulkTarget, user: AbstractBaseUser, changes: object) -> dict[str, Any]:
+    """変更内容を検証し、項目名 → 値（外部キーは参照先のインスタンス、shift_days は日数）にする。"""
+    if not isinstance(changes, dict) or not changes:
+        raise BulkEditError('invalid_changes')
+    cleaned: dict[str, Any] = {}
+    for name, value in changes.items():
+        if name in target.choice_fields:
+            if value not in target.choice_fields[name]:
+                raise BulkEditError(f'invalid_{name}')
+            cleaned[name] = value
+        elif name in target.owned_fields:
+            if value is None and target.model._meta.get_field(name).null:
+                cleaned[name] = None
+                continue
+            related_model = target.model._meta.get_field(name).related_model
+            try:
+                cleaned[name] = target.owned_fields[name](user).get(pk=int(value))
+            except (TypeError, ValueError, related_model.DoesNotExist):
+                raise BulkEditError(f'invalid_{name}') from None
+        elif name == SHIFT_DAYS and target.date_fields:
+            if isinstance(value, bool) or not isinstance(value, int) or abs(value) > MAX_SHIFT_DAYS:
+                raise BulkEditError('invalid_shift_days')
+            if value:
+                cleaned[name] = value
+        else:
+            raise BulkEditError('unknown_field')
+    return cleaned
+
+
+def _update_values(target: BulkTarget, changes: dict[str, Any]) -> dict[str, Any]:
+    """UPDATE に渡す値。日時は F 式でずらし、auto_now の項目は現在時刻にする。"""
+    values = {name: value for name, value in changes.items() if name != SHIFT_DAYS}
+    if changes.get(SHIFT_DAYS):
+        delta = timedelta(days=changes[SHIFT_DAYS])
+        values.update({name: F(name) + delta for name in target.date_fields})
+    now = timezone.now()
+    for model_field in target.model._meta.concrete_fields:
+        if getattr(model_field, 'auto_now', False):
+            values[model_field.name] = now
+    return values
+
+
+def _apply_in_memory(instance: Model, changes: dict[str, Any], target: BulkTarget) -> Model:
+    """UPDATE 後の内容を、読み込んだインスタンスのコピーに反映する（sync 用）。"""
+    changed = copy.copy(instance)
+    for name, value in changes.items():
+        if name == SHIFT_DAYS:
+            for date_field in target.date_fields:
+                current = getattr(changed, date_field)
+                if current is not None:
+                    setattr(changed, date_field, current + timedelta(days=value))
+        else:
+            setattr(changed, name, value)
+    return changed
+
+
+def bulk_update(
+    target: BulkTarget, user: AbstractBaseUser, ids: list[int], changes: dict[str, Any],
+) -> int:
+    """所有者の絞り込み付きで、選んだレコードに同じ変更を1回の UPDATE で適用し、件数を返す。"""
+    queryset = target.model.objects.filter(user=user, id__in=ids)
+    values = _update_values(target, changes)
+    if target.sync is None:
+        return queryset.update(**values)
+
+    with db_transaction.atomic():
+        before = list(queryset.select_for_update().only('id', *target.sync_fields).order_by())
+        if not before:
+            return 0
+        updated = target.model.objects.filter(id__in=[obj.pk for obj in before]).update(**values)
+        target.sync(before, [_apply_in_memory(obj, changes, target) for obj in before])
+    return updated
+
+
+def _can_raw_delete(target: BulkTarget, queryset: QuerySet) -> bool:
+    """カスケードする関連がなく、シグナルも（sync で代わりに処理しない限り）ないか。"""
+    if target.sync is None:
+        return Collector(using=queryset.db, origin=queryset).can_fast_delete(queryset)
+    return all(
+        relation.on_delete is DO_NOTHING
+        for relation in target.model._meta.related_objects
+        if relation.on_delete is not None
+    )
+
+
+def bulk_delete(target: BulkTarget, user: AbstractBaseUser, ids: list[int]) -> int:
+    """所有者の絞り込み付きで選んだレコードを削除し、削除した件数を返す。
+
+    カスケードもシグナルもなければ DELETE 1回。sync があれば変更前の内容を読んで
+    DELETE 1回の後に反映する。どちらでもなければ通常の delete()（カスケード先も削除）。
+    """
+    queryset = target.model.objects.filter(user=user, id__in=ids)
+    if not _can_raw_delete(target, queryset):
+        _, per_model = queryset.delete()
+        return per_model.get(target.model._meta.label, 0)
+    if target.sync is None:
+        return queryset._raw_delete(queryset.db)
+
+    with db_transaction.atomic():
+        before = list(queryset.select_for_update().only('id', *target.sync_fields).order_by())
+        if not before:
+            return 0
+        deleted_query = target.model.objects.filter(id__in=[obj.pk for obj in before])
+        deleted = deleted_query._raw_delete(deleted_query.db)
+        target.sync(before, [])
+    return deleted
+
+
+def load_payload(request: HttpRequest) -> tuple[dict | None, JsonResponse | None]:
+    """POST の JSON ボディを読む。読めなければエラーのレスポンスを返す。"""
+    if request.method != 'POST':
+        return None, JsonResponse({'success': False, 'error': 'method_not_allowed'}, status=405)
+    try:
+        payload = json.loads(request.body or '{}')
+    except (json.JSONDecodeError, ValueError):
+        return None, JsonResponse({'success': False, 'error': 'invalid_json'}, status=400)
+    if not isinstance(payload, dict):
+        return None, JsonResponse({'success': False, 'error': 'invalid_json'}, status=400)
+    return payload, None
+
+
+def bulk_edit_response(request: HttpRequest, target: BulkTarget) -> JsonResponse:
+    """選んだレコードに同じ変更を適用する一括編集エンドポイントの本体。"""
+    payload, error_response = load_payload(request)
+    if error_response is not None:
+        return error_response
+
+    ids = parse_ids(payload)
+    if ids is None:
+        return JsonResponse({'success': False, 'error': 'invalid_ids'}, status=400)
+    try:
+        changes = clean_changes(target, request.user, payload.get('changes'))
+    except BulkEditError as error:
+        return JsonResponse({'success': False, 'error': error.code}, status=400)
+    if not ids or not changes:
+        return JsonResponse({'success': True, 'updated': 0})
+    updated = bulk_update(target, request.user, ids, changes)
+    return JsonResponse({'success': True, 'updated': updated})
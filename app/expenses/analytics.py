@@ -0,0 +1,167 @@
+"""家計簿の期間比較（前月比・前年同月比）。
+
+月次集計（MonthlyLedgerSummary）を「軸 × 月」で GROUP BY し、LAG ウィンドウ関数で
+前月・前年同月の値を同じ行に並べる。比較の軸（カテゴリ・支払方法・費用タイプ）ごとに
+クエリは1回で、月をたどって集計し直すことはしない。
+
+前月は「同じ軸の直前の月」、前年同月は「同じ軸・同じ月（1〜12）の直前の年」を LAG で取り、
+その月が本当に前月・前年同月であるか（支出のない月を飛ばしていないか）を確かめて使う。
+"""
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import TYPE_CHECKING
+
+from django.core.cache import cache
+from django.db.models import F, Sum, Window
+from django.db.models.functions import ExtractMonth, Lag
+
+from project.utils import MAJOR_CATEGORY_LABELS
+
+from . import caching
+from .models import MonthlyLedgerSummary
+
+if TYPE_CHECKING:
+    from django.contrib.auth.base_user import AbstractBaseUser
+
+ANALYTICS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# 比較の軸 → (集計キーの項目, 表示名の項目)。費用タイプは固定のラベルを使う
+DIMENSIONS: dict[str, tuple[str, str | None]] = {
+    'category': ('category_id', 'category__name'),
+    'payment_method': ('payment_method_id', 'payment_method__name'),
+    'major_category': ('major_category', None),
+}
+
+
+def _add_months(month_start: date, months: int) -> date:
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _rate(current: Decimal, base: Decimal) -> float | None:
+    """増減率（%）。比較元が 0 なら None。"""
+    if not base:
+        return None
+    return round(float((current - base) / base * 100), 1)
+
+
+def compare_dimension(
+    user: AbstractBaseUser,
+    year_month: date,
+    dimension: str,
+    transaction_type: str = 'expense',
+) -> list[dict[str, object]]:
+    """指定月の軸ごとの合計を、前月・前年同月と並べて返す（当月の多い順）。
+
+    当月に支出がなく、前月・前年同月にだけある項目も当月 0 として含める。
+    """
+    key_field, label_field = DIMENSIONS[dimension]
+    previous_month = _add_months(year_month, -1)
+    last_year = _add_months(year_month, -12)
+    value_fields = [key_field, 'year_month'] + ([label_field] if label_field else [])
+
+    by_month = [F('year_month').asc()]
+    by_key_and_calendar_month = [F(key_field), ExtractMonth('year_month')]
+    rows = (
+        MonthlyLedgerSummary.objects
+        .filter(
+            user=user, transaction_type=transaction_type,
+            year_month__in=[last_year, previous_month, year_month],
+        )
+        .values(*value_fields)
+        .annotate(total=Sum('amount'))
+        .annotate(
+            lag_total=Window(Lag('total'), partition_by=[F(key_field)], order_by=by_month),
+            lag_month=Window(Lag('year_month'), partition_by=[F(key_field)], order_by=by_month),
+            lag_year_total=Window(
+                Lag('total'), partition_by=by_key_and_calendar_month, order_by=by_month,
+            ),
+            lag_year_month=Window(
+                Lag('year_month'), partition_by=by_key_and_calendar_month, order_by=by_month,
+            ),
+        )
+        .order_by()
+    )
+
+    zero = Decimal('0')
+    comparisons: dict[object, dict[str, object]] = {}
+    # 当月にない項目のための、前月・前年同月の合計
+    earlier: dict[object, dict[date, tuple[Decimal, str]]] = {}
+    for row in rows:
+        key = row[key_field]
+        label = row[label_field] if label_field else MAJOR_CATEGORY_LABELS.get(key, key)
+        if row['year_month'] != year_month:
+            earlier.setdefault(key, {})[row['year_month']] = (row['total'], label)
+            continue
+        comparisons[key] = _comparison_row(
+            key, label, row['total'],
+            row['lag_total'] if row['lag_month'] == previous_month else zero,
+            row['lag_year_total'] if row['lag_year_month'] == last_year else zero,
+        )
+
+    for key, totals in earlier.items():
+        if key in comparisons:
+            continue
+        label = next(iter(totals.values()))[1]
+        comparisons[key] = _comparison_row(
+            key, label, zero,
+            totals.get(previous_month, (zero, label))[0],
+            totals.get(last_year, (zero, label))[0],
+        )
+
+    return sorted(
+        comparisons.values(),
+        key=lambda row: (-row['current'], -row['previous_month'], str(row['label'])),
+    )
+
+
+def _comparison_row(
+    key: object,
+    label: str,
+    current: Decimal,
+    previous: Decimal,
+    last_year: Decimal,
+) -> dict[str, object]:
+    return {
+        'key': key,
+        'label': label,
+        'current': float(current),
+        'previous_month': float(previous),
+        'same_month_last_year': float(last_year),
+        'mom_change': float(current - previous),
+        'mom_rate': _rate(current, previous),
+        'yoy_change': float(current - last_year),
+        'yoy_rate': _rate(current, last_year),
+    }
+
+
+def analytics_version(user: AbstractBaseUser, year_month: date) -> int:
+    """比較結果のバージョン（当月・前月・前年同月のうち最も新しいデータバージョン）。"""
+    return max(
+        caching.month_data_version(user.pk, month)
+        for month in (year_month, _add_months(year_month, -1), _add_months(year_month, -12))
+    )
+
+
+def get_period_comparison(user: AbstractBaseUser, year_month: date) -> dict[str, object]:
+    """指定月の前月比・前年同月比を全ての軸について返す。ユーザー・月ごとにキャッシュする。
+
+    キーには比較する3か月のデータバージョンを含めるので、取引が変われば作り直される。
+    """
+    version = analytics_version(user, year_month)
+    key = f'expenses:analytics:{user.pk}:{year_month:%Y-%m}:v{version}'
+    result = cache.get(key)
+    if result is None:
+        result = {
+            'month': f'{year_month:%Y-%m}',
+            'previous_month': f'{_add_months(year_month, -1):%Y-%m}',
+            'same_month_last_year': f'{_add_months(year_month, -12):%Y-%m}',
+            'dimensions': {
+                dimension: compare_dimension(user, year_month, dimension)
+                for dimension in DIMENSIONS
+            },
+        }
+        cache.set(key, result, caching.chart_cache_timeout(year_month))
+    return result
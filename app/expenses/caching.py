@@ -0,0 +1,222 @@
+"""家計簿の集計結果キャッシュ（Django キャッシュフレームワーク）。
+
+キャッシュ（settings.CACHES の DatabaseCache）は web・cron の全プロセスで共有されるので、
+どのプロセスで無効化しても他のプロセスのキャッシュに反映される。
+
+予算サマリー: キーにはユーザーごとのバージョン番号を含める。予算・カテゴリの変更では
+バージョンを上げてそのユーザーの全キーを一度に無効化し、今月以降の取引の変更では
+影響する月のキーだけを削除する。
+
+グラフデータ: ユーザーごとのデータバージョン（取引・カテゴリの書き込みのたびに上がる
+カウンター。値は最終更新時刻のミリ秒以上に保つ）と、月ごとに「最後に変更されたときのデータバージョン」を記録する。
+キーはその月のバージョンを含むため、変更のない過去の月は長めの期限でキャッシュから返し、
+変更された月だけが作り直される。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections.abc import Callable
+from datetime import UTC, date, datetime
+
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.utils.timezone import localdate
+
+BUDGET_OVERVIEW_CACHE_TIMEOUT = 60 * 60 * 24
+# グラフデータの保持期間（今月 / 変更の少ない過去の月）
+CHART_CACHE_TIMEOUT = 60 * 60 * 24
+PAST_MONTH_CHART_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def _budget_version_key(user_id: int) -> str:
+    return f'expenses:budget_overview:version:{user_id}'
+
+
+def _budget_version(user_id: int) -> int:
+    """ユーザーの予算キャッシュのバージョン。
+
+    キャッシュから消えていた場合も以前の値と重ならないよう、現在時刻（ミリ秒）で初期化する。
+    """
+    key = _budget_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key) or 0
+    return version
+
+
+def _budget_overview_key(user_id: int, version: int, year: int, month: int) -> str:
+    return f'expenses:budget_overview:{user_id}:v{version}:{year}-{month:02d}'
+
+
+def budget_overview_key(user_id: int, year: int, month: int) -> str:
+    """予算サマリー（build_budget_overview の結果）のキャッシュキー。"""
+    return _budget_overview_key(user_id, _budget_version(user_id), year, month)
+
+
+def _run_on_commit(func: Callable[[], None]) -> None:
+    """コミット後に実行する（トランザクション外ではすぐに実行される）。
+
+    トランザクション中に別リクエストが古いデータでキャッシュを作り直しても、
+    コミット後の無効化で取り除かれるので、コミット前に無効化する必要はない。
+    """
+    db_transaction.on_commit(func)
+
+
+def _next_versions(keys: list[str]) -> dict[str, int]:
+    """バージョンキーごとの次の値（set_many でまとめて書き込む）。
+
+    値は現在時刻（ミリ秒）を下回らないようにし、キャッシュから消えていた場合も
+    以前の値と重ならないようにする。
+    """
+    now = int(time.time() * 1000)
+    current = cache.get_many(keys)
+    return {key: max(current.get(key, 0) + 1, now) for key in keys}
+
+
+def _bump_budget_versions(user_ids: set[int]) -> None:
+    keys = [_budget_version_key(user_id) for user_id in user_ids]
+    cache.set_many(_next_versions(keys), timeout=None)
+
+
+def invalidate_budget_overview(user_id: int) -> None:
+    """ユーザーの予算サマリーを全月分無効化する（予算・カテゴリの変更時）。"""
+    _run_on_commit(lambda: _bump_budget_versions({user_id}))
+
+
+def invalidate_budget_overview_months(months: set[tuple[int, date]]) -> None:
+    """(ユーザーID, 集計月) ごとに予算サマリーを無効化する（取引の変更時）。
+
+    過去の月の変更は予算の繰越額を通じて以降の月にも影響するため、
+    そのユーザーは全月分を無効化する。
+    """
+    if not months:
+        return
+    this_month = localdate().replace(day=1)
+    past_users = {user_id for user_id, year_month in months if year_month < this_month}
+    months = {
+        (user_id, year_month) for user_id, year_month in months if user_id not in past_users
+    }
+
+    def invalidate() -> None:
+        if past_users:
+            _bump_budget_versions(past_users)
+        if not months:
+            return
+        # バージョンが消えているユーザーは、以前のキーがもう使われないので削除しなくてよい
+        versions = cache.get_many([_budget_version_key(user_id) for user_id, _ in months])
+        cache.delete_many([
+            _budget_overview_key(
+                user_id, versions[_budget_version_key(user_id)], year_month.year, year_month.month,
+            )
+            for user_id, year_month in months
+            if _budget_version_key(user_id) in versions
+        ])
+
+    _run_on_commit(invalidate)
+
+
+# ==========================================================================
+# データバージョンとグラフデータ
+# ==========================================================================
+
+def _data_version_key(user_id: int) -> str:
+    return f'expenses:data_version:{user_id}'
+
+
+def _month_version_key(user_id: int, year_month: date) -> str:
+    return f'expenses:data_version:{user_id}:{year_month:%Y-%m}'
+
+
+def _all_months_version_key(user_id: int) -> str:
+    return f'expenses:data_version:{user_id}:all'
+
+
+def data_version(user_id: int) -> int:
+    """ユーザーの家計簿データのバージョン（取引・カテゴリの書き込みのたびに上がる）。
+
+    キャッシュから消えていた場合も以前の値と重ならないよう、現在時刻（ミリ秒）で初期化する。
+    """
+    key = _data_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key) or 0
+    return version
+
+
+def data_version_modified(version: int) -> datetime:
+    """データバージョンが表す更新時刻（HTTP の Last-Modified 用）。"""
+    return datetime.fromtimestamp(version / 1000, tz=UTC)
+
+
+def month_data_version(user_id: int, year_month: date) -> int:
+    """集計月のデータが最後に変更されたときのデータバージョン。
+
+    カテゴリの変更（全月に影響）があればそちらの方が新しければそれを返す。
+    記録が消えていれば、現在のデータバージョンで変更されたものとして扱う。
+    """
+    month_key = _month_version_key(user_id, year_month)
+    all_key = _all_months_version_key(user_id)
+    versions = cache.get_many([month_key, all_key])
+    if month_key not in versions:
+        cache.add(month_key, data_version(user_id), timeout=None)
+        versions[month_key] = cache.get(month_key, 0)
+    return max(versions[month_key], versions.get(all_key, 0))
+
+
+def record_transaction_changes(months: set[tuple[int, date]]) -> None:
+    """(ユーザーID, 集計月) ごとに、取引の変更としてデータバージョンを上げる。"""
+    if not months:
+        return
+
+    def bump() -> None:
+        versions = _next_versions(list({_data_version_key(user_id) for user_id, _ in months}))
+        cache.set_many({
+            **versions,
+            **{
+                _month_version_key(user_id, year_month): versions[_data_version_key(user_id)]
+                for user_id, year_month in months
+            },
+        }, timeout=None)
+
+    _run_on_commit(bump)
+
+
+def record_category_change(user_id: int) -> None:
+    """カテゴリ・支払方法の変更（名前・色はグラフに含まれる）として全月分のバージョンを上げる。"""
+    def bump() -> None:
+        version = _next_versions([_data_version_key(user_id)])[_data_version_key(user_id)]
+        cache.set_many({
+            _data_version_key(user_id): version,
+            _all_months_version_key(user_id): version,
+        }, timeout=None)
+
+    _run_on_commit(bump)
+
+
+def filter_hash(filters: dict[str, str]) -> str:
+    """絞り込み条件（get_transactions の引数）をキャッシュキー用の短いハッシュにする。"""
+    normalized = json.dumps(
+        {name: value for name, value in filters.items() if value}, sort_keys=True,
+    )
+    return hashlib.sha256(normalized.encode()).hexdigest()[:16]
+
+
+def chart_payload_key(user_id: int, year_month: date, filters: dict[str, str]) -> str:
+    """月表示のグラフデータのキャッシュキー。"""
+    version = month_data_version(user_id, year_month)
+    return f'expenses:chart:{user_id}:{year_month:%Y-%m}:{filter_hash(filters)}:v{version}'
+
+
+def chart_cache_timeout(year_month: date) -> int:
+    """グラフデータの保持期間。
+
+    過去の月は変更されればキーが変わるので長めにするが、無効化の取りこぼしがあっても
+    古いデータを返し続けないよう無期限にはしない。
+    """
+    if year_month < localdate().replace(day=1):
+        return PAST_MONTH_CHART_CACHE_TIMEOUT
+    return CHART_CACHE_TIMEOUT
@@ -0,0 +1,83 @@
+"""取引のエクスポート（CSV / NDJSON）。
+
+サーバーサイドカーソル（QuerySet.iterator）で EXPORT_CHUNK_SIZE 件ずつ読み、
+1行ずつ文字列にして返すジェネレーター。StreamingHttpResponse に渡せば、
+件数によらず使用メモリは一定に収まる。
+
+CSV の見出しと取引タイプ・費用タイプの表記は importers が解釈できる形に
+そろえてあるので、エクスポートしたファイルはそのまま再インポートできる。
+"""
+from __future__ import annotations
+
+import csv
+import json
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from django.utils.timezone import localtime
+
+from .models import Transaction
+
+if TYPE_CHECKING:
+    from django.db.models import QuerySet
+
+EXPORT_CHUNK_SIZE = 2000
+
+_EXPORT_FIELDS = (
+    'id', 'date', 'amount', 'transaction_type', 'major_category',
+    'purpose', 'purpose_description', 'category__name', 'payment_method__name',
+)
+_CSV_HEADER = ['日付', '金額', '取引タイプ', '費用タイプ', '用途', '説明', 'カテゴリ', '支払方法']
+_TRANSACTION_TYPE_LABELS = dict(Transaction.TRANSACTION_TYPE_CHOICES)
+_MAJOR_CATEGORY_LABELS = dict(Transaction.MAJOR_CATEGORY_TYPE_CHOICES)
+
+
+class _Echo:
+    """csv.writer の書き込み先。書いた1行をそのまま返す。"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _export_rows(transactions_qs: QuerySet) -> Iterator[tuple]:
+    """エクスポート対象の列だけを、チャンク単位のカーソルで1行ずつ返す。"""
+    return transactions_qs.values_list(*_EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def stream_csv(transactions_qs: QuerySet) -> Iterator[str]:
+    """取引を CSV（BOM 付き UTF-8）の行として順に返す。"""
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(_CSV_HEADER)
+    for (
+        _id, date, amount, transaction_type, major_category,
+        purpose, purpose_description, category, payment_method,
+    ) in _export_rows(transactions_qs):
+        yield writer.writerow([
+            localtime(date).date().isoformat(),
+            amount,
+            _TRANSACTION_TYPE_LABELS.get(transaction_type, transaction_type),
+            _MAJOR_CATEGORY_LABELS.get(major_category, major_category),
+            purpose,
+            purpose_description,
+            category,
+            payment_method,
+        ])
+
+
+def stream_ndjson(transactions_qs: QuerySet) -> Iterator[str]:
+    """取引を NDJSON（1行1オブジェクト）として順に返す。"""
+    for (
+        transaction_id, date, amount, transaction_type, major_category,
+        purpose, purpose_description, category, payment_method,
+    ) in _export_rows(transactions_qs):
+        yield json.dumps({
+            'id': transaction_id,
+            'date': localtime(date).isoformat(),
+            'amount': str(amount),
+            'transaction_type': transaction_type,
+            'major_category': major_category,
+            'purpose': purpose,
+            'purpose_description': purpose_description,
+            'category': category,
+            'payment_method': payment_method,
+        }, ensure_ascii=False) + '\n'
@@ -0,0 +1,185 @@
+"""予算の月末支出予測。
+
+過去 FORECAST_HISTORY_MONTHS か月の支出から、カテゴリごとの日次累積支出カーブ
+（SpendingCurve）を1回の GROUP BY で作って保存しておく（forecast_budgets コマンドで毎晩）。
+画面表示時は「今月ここまでの支出 + カーブ上の残り日数分の支出」で月末支出を見積もり、
+予算を超える日を累積カーブの二分探索で求める。カテゴリあたりの計算量は一定。
+"""
+from __future__ import annotations
+
+import calendar
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import TYPE_CHECKING
+
+from django.contrib.auth import get_user_model
+from django.db import transaction as db_transaction
+from django.db.models import Sum
+from django.db.models.functions import ExtractDay
+from django.utils.timezone import get_current_timezone, localdate, make_aware
+
+from .models import SpendingCurve, Transaction
+
+if TYPE_CHECKING:
+    from django.contrib.auth.base_user import AbstractBaseUser
+
+FORECAST_HISTORY_MONTHS = 3
+
+_ZERO = Decimal('0')
+
+
+def _months_before(month_start: date, months: int) -> date:
+    """month_start の months か月前の月初日。"""
+    index = month_start.year * 12 + month_start.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def build_spending_curves(
+    user: AbstractBaseUser | None = None,
+    *,
+    today: date | None = None,
+    months: int = FORECAST_HISTORY_MONTHS,
+) -> list[SpendingCurve]:
+    """直近 months か月（今月を除く）の支出から SpendingCurve（未保存）を作る。
+
+    user 未指定なら全ユーザー分。日別・カテゴリ別の支出は1クエリで集計する。
+    支出のなかった月も 0 として months か月で平均する。
+    履歴のないユーザーも、全体カーブ（月数 0）を1件作る（表示時に作り直さないため）。
+    """
+    today = today or localdate()
+    month_start = today.replace(day=1)
+    history_start = _months_before(month_start, months)
+    tz = get_current_timezone()
+
+    transactions = Transaction.objects.filter(
+        transaction_type='expense',
+        date__gte=make_aware(datetime.combine(history_start, time.min)),
+        date__lt=make_aware(datetime.combine(month_start, time.min)),
+    )
+    if user is not None:
+        transactions = transactions.filter(user=user)
+    rows = (
+        transactions
+        .annotate(day=ExtractDay('date', tzinfo=tz))
+        .values('user_id', 'category_id', 'day')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+
+    # (user_id, category_id) → 日別合計（31日分）。category_id=None は全体
+    daily: dict[tuple[int, int | None], list[Decimal]] = defaultdict(lambda: [_ZERO] * 31)
+    for row in rows:
+        day_index = row['day'] - 1
+        for key in ((row['user_id'], row['category_id']), (row['user_id'], None)):
+            daily[key][day_index] += row['total']
+    users_with_history = {user_id for user_id, _ in daily}
+
+    # 履歴がなくても全体カーブを作る
+    user_ids = (
+        [user.pk] if user is not None else get_user_model().objects.values_list('pk', flat=True)
+    )
+    for user_id in user_ids:
+        if (user_id, None) not in daily:
+            daily[(user_id, None)] = [_ZERO] * 31
+
+    curves = []
+    for (user_id, category_id), totals in daily.items():
+        month_count = months if user_id in users_with_history else 0
+        cumulative = []
+        running = _ZERO
+        for total in totals:
+            running += total
+            cumulative.append(
+                (running / month_count).quantize(Decimal('0.01')) if month_count else _ZERO
+            )
+        curves.append(SpendingCurve(
+            user_id=user_id, category_id=category_id, cumulative=cumulative, months=month_count,
+        ))
+    return curves
+
+
+def refresh_spending_curves(
+    user: AbstractBaseUser | None = None,
+    *,
+    today: date | None = None,
+    months: int = FORECAST_HISTORY_MONTHS,
+) -> int:
+    """SpendingCurve を作り直し、保存した件数を返す。user 未指定なら全ユーザー分。"""
+    curves = build_spending_curves(user, today=today, months=months)
+    with db_transaction.atomic():
+        existing = SpendingCurve.objects.all()
+        if user is not None:
+            existing = existing.filter(user=user)
+        existing.delete()
+        SpendingCurve.objects.bulk_create(curves, batch_size=1000)
+    return len(curves)
+
+
+def _forecast(
+    used: Decimal,
+    limit: Decimal | None,
+    curve: SpendingCurve | None,
+    today: date,
+) -> tuple[Decimal, date | None]:
+    """月末の支出見込みと、予算を超える見込み日（超えない・既に超過なら None）を返す。"""
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    if curve is not None and curve.months:
+        cumulative = curve.cumulative
+        spent_by_today = cumulative[today.day - 1]
+        projected = used + cumulative[days_in_month - 1] - spent_by_today
+        if limit is None or limit <= 0 or used > limit or projected <= limit:
+            return projected, None
+        # 累積カーブは単調増加なので、予算を超える最初の日を今月の日数の範囲で二分探索する
+        threshold = limit - used + spent_by_today
+        day = bisect_right(cumulative, threshold, lo=today.day, hi=days_in_month)
+        return projected, today.replace(day=min(day + 1, days_in_month))
+
+    # 履歴がなければ今月の1日あたりの支出が続くものとして見積もる
+    daily_rate = used / today.day
+    projected = (daily_rate * days_in_month).quantize(Decimal('0.01'))
+    if limit is None or limit <= 0 or used > limit or projected <= limit or daily_rate <= 0:
+        return projected, None
+    day = int((limit / daily_rate).to_integral_value(rounding='ROUND_FLOOR')) + 1
+    return projected, today.replace(day=min(max(day, today.day), days_in_month))
+
+
+def attach_budget_forecast(
+    overview: dict[str, object],
+    user: AbstractBaseUser,
+    today: date | None = None,
+) -> dict[str, object]:
+    """予算サマリー（build_budget_overview の結果）の各行に月末予測を加えて返す。
+
+    各行に projected（月末の支出見込み）と projected_over_date（予算超過の見込み日）が付く。
+    保存済みのカーブを1クエリで読むだけで、履歴の再集計は行わない。
+    """
+    today = today or localdate()
+    curves = {curve.category_id: curve for curve in SpendingCurve.objects.filter(user=user)}
+    if not curves:
+        # 夜間処理の後に登録したユーザーが初めて表示した場合だけ、その場で作る
+        refresh_spending_curves(user, today=today)
+        curves = {curve.category_id: curve for curve in SpendingCurve.objects.filter(user=user)}
+
+    def with_forecast(row: dict[str, object], curve: SpendingCurve | None) -> dict[str, object]:
+        limit = row['limit'] if row['has_budget'] else None
+        projected, over_date = _forecast(row['used'], limit, curve, today)
+        return {**row, 'projected': projected, 'projected_over_date': over_date}
+
+    overall_curve = curves.get(None)
+    return {
+        **overview,
+        'overall': with_forecast(overview['overall'], overall_curve),
+        'category_rows': [
+            with_forecast(row, curves.get(row['category'].id, _empty_curve_like(overall_curve)))
+            for row in overview['category_rows']
+        ],
+    }
+
+
+def _empty_curve_like(curve: SpendingCurve | None) -> SpendingCurve | None:
+    """履歴期間に支出のないカテゴリ用のカーブ（支出 0 が続く見込み）。"""
+    if curve is None or not curve.months:
+        return None
+    return SpendingCurve(cumulative=[_ZERO] * 31, months=curve.months)
@@ -71,6 +71,58 @@ class TransactionForm(forms.ModelForm):
         return amount
 
 
+class TransactionBatchRowForm(forms.Form):
+    """取引の一括登録（batch_create_expenses）の1行。
+
+    カテゴリ・支払方法は呼び出し側で事前に読み込んだユーザーのもの（id → オブジェクト）から選ぶ。
+    ModelForm と違い、行ごとの検証でクエリを発行しない。
+    """
+    date = forms.DateTimeField(label='日付')
+    amount = forms.DecimalField(label='金額', max_digits=10, decimal_places=2)
+    purpose = forms.CharField(label='用途', max_length=100)
+    purpose_description = forms.CharField(label='説明', required=False)
+    transaction_type = forms.ChoiceField(
+        label='取引タイプ', choices=Transaction.TRANSACTION_TYPE_CHOICES,
+    )
+    major_category = forms.ChoiceField(
+        label='費用タイプ', choices=Transaction.MAJOR_CATEGORY_TYPE_CHOICES,
+    )
+    category = forms.TypedChoiceField(label='カテゴリ', coerce=int)
+    payment_method = forms.TypedChoiceField(label='支払方法', coerce=int)
+
+    clean_amount = TransactionForm.clean_amount
+
+    def __init__(
+        self,
+        *args: object,
+        categories: dict[int, Category],
+        payment_methods: dict[int, PaymentMethod],
+        **kwargs: object,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.categories = categories
+        self.payment_methods = payment_methods
+        self.fields['category'].choices = [(pk, obj.name) for pk, obj in categories.items()]
+        self.fields['payment_method'].choices = [
+            (pk, obj.name) for pk, obj in payment_methods.items()
+        ]
+
+    def build_transaction(self, user: object) -> Transaction:
+        """検証済みの内容から（未保存の）Transaction を作る。"""
+        data = self.cleaned_data
+        return Transaction(
+            user=user,
+            date=data['date'],
+            amount=data['amount'],
+            purpose=data['purpose'],
+            purpose_description=data['purpose_description'],
+            transaction_type=data['transaction_type'],
+            major_category=data['major_category'],
+            category=self.categories[data['category']],
+            payment_method=self.payment_methods[data['payment_method']],
+        )
+
+
 class PaymentMethodForm(forms.ModelForm):
     class Meta:
         model = PaymentMethod
@@ -278,3 +330,26 @@ class RecurringPaymentForm(forms.ModelForm):
             cleaned_data['days_of_month'] = []
 
         return cleaned_data
+
+
+class TransactionImportForm(forms.Form):
+    """取引の一括インポート（CSV / OFX ファイルのアップロード）。"""
+
+    FORMAT_CHOICES = [
+        ('auto', '自動判定（拡張子）'),
+        ('csv', 'CSV'),
+        ('ofx', 'OFX'),
+    ]
+    ENCODING_CHOICES = [
+        ('utf-8-sig', 'UTF-8'),
+        ('cp932', 'Shift_JIS'),
+    ]
+
+    file = forms.FileField(label='ファイル')
+    file_format = forms.ChoiceField(label='形式', choices=FORMAT_CHOICES, initial='auto')
+    encoding = forms.ChoiceField(label='文字コード', choices=ENCODING_CHOICES, initial='utf-8-sig')
+
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs['class'] = 'form-control'
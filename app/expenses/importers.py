@@ -0,0 +1,387 @@
+"""取引の一括インポート（CSV / OFX）。
+
+ファイルは1行（OFX は1取引）ずつ読み、IMPORT_BATCH_SIZE 件ごとに
+重複確認・bulk_create・月次集計の差分更新を行う。ファイル全体を
+メモリに載せないので、10万行規模のファイルでも使用メモリは一定に収まる。
+
+重複は内容ハッシュ（Transaction.import_hash）で判定する。同じファイルを
+再インポートしても、取り込み済みの行は作成されない。
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import re
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import TYPE_CHECKING, TextIO
+
+from django.db import transaction as db_transaction
+from django.utils.timezone import get_current_timezone
+
+from . import services
+from .models import Category, PaymentMethod, Transaction
+
+if TYPE_CHECKING:
+    from django.contrib.auth.base_user import AbstractBaseUser
+    from django.db.models import Model
+
+IMPORT_BATCH_SIZE = 1000
+DEFAULT_CATEGORY_NAME = '未分類'
+DEFAULT_PAYMENT_METHOD_NAME = '未設定'
+MAX_REPORTED_ERRORS = 20
+
+_MAX_AMOUNT = Decimal('99999999')
+_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%Y%m%d')
+
+# CSV の見出し → 項目名（英語・日本語どちらの見出しでもよい）
+_CSV_COLUMNS = {
+    'date': 'date', '日付': 'date',
+    'amount': 'amount', '金額': 'amount',
+    'type': 'transaction_type', 'transaction_type': 'transaction_type',
+    '取引タイプ': 'transaction_type',
+    'purpose': 'purpose', '用途': 'purpose', '摘要': 'purpose',
+    'description': 'purpose_description', '説明': 'purpose_description',
+    'メモ': 'purpose_description',
+    'category': 'category', 'カテゴリ': 'category',
+    'payment_method': 'payment_method', '支払方法': 'payment_method',
+    'major_category': 'major_category', '費用タイプ': 'major_category',
+}
+_REQUIRED_CSV_COLUMNS = ('date', 'amount', 'purpose')
+
+
+@dataclass
+class ImportRow:
+    """取り込み対象の1取引。key は重複判定に使う行の識別文字列。"""
+
+    line: int
+    date: datetime
+    amount: Decimal
+    transaction_type: str
+    purpose: str
+    purpose_description: str = ''
+    category: str = ''
+    payment_method: str = ''
+    major_category: str = 'variable'
+    key: str = ''
+
+
+@dataclass
+class RowError:
+    """解析できなかった行。"""
+
+    line: int
+    message: str
+
+
+@dataclass
+class ImportResult:
+    """インポート結果の集計。"""
+
+    created: int = 0
+    duplicates: int = 0
+    error_count: int = 0
+    errors: list[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.created + self.duplicates + self.error_count
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, error: RowError) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'{error.line}行目: {error.message}')
+
+
+# =============================================================================
+# 解析
+# =============================================================================
+
+def _choice_value(raw: str, choices: list[tuple[str, str]]) -> str | None:
+    """選択肢の値またはラベルから値を返す。"""
+    raw = raw.strip()
+    for value, label in choices:
+        if raw in (value, label):
+            return value
+    return None
+
+
+def _parse_date(raw: str) -> datetime:
+    raw = raw.strip()
+    for date_format in _DATE_FORMATS:
+        try:
+            # 日付だけの書式なので、現在のタイムゾーンの 0 時として扱う
+            return datetime.strptime(raw, date_format).replace(tzinfo=get_current_timezone())
+        except ValueError:
+            continue
+    raise ValueError(f'日付を解釈できません（{raw}）。')
+
+
+def _parse_amount(raw: str) -> Decimal:
+    cleaned = raw.strip().replace(',', '').replace('¥', '').replace('円', '')
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f'金額を解釈できません（{raw}）。') from None
+    # NaN / Infinity は Decimal として読めるが、比較すると InvalidOperation になる
+    if not amount.is_finite():
+        raise ValueError(f'金額を解釈できません（{raw}）。')
+    if abs(amount) > _MAX_AMOUNT:
+        raise ValueError('金額は99,999,999以下である必要があります。')
+    return amount
+
+
+def _build_row(line: int, values: dict[str, str]) -> ImportRow:
+    """項目名 → 文字列の辞書から ImportRow を作る。不正な値は ValueError。"""
+    amount = _parse_amount(values['amount'])
+    raw_type = values.get('transaction_type', '').strip()
+    if raw_type:
+        transaction_type = _choice_value(raw_type, Transaction.TRANSACTION_TYPE_CHOICES)
+        if transaction_type is None:
+            raise ValueError(f'取引タイプを解釈できません（{raw_type}）。')
+    else:
+        # 取引タイプ列がなければ符号で判定する（銀行明細の入出金と同じ向き）
+        transaction_type = 'expense' if amount < 0 else 'income'
+    if amount < 0:
+        amount = -amount
+
+    major_category = 'variable'
+    raw_major = values.get('major_category', '').strip()
+    if raw_major:
+        major_category = _choice_value(raw_major, Transaction.MAJOR_CATEGORY_TYPE_CHOICES)
+        if major_category is None:
+            raise ValueError(f'費用タイプを解釈できません（{raw_major}）。')
+
+    purpose = values['purpose'].strip()
+    if not purpose:
+        raise ValueError('用途が空です。')
+    category = values.get('category', '').strip()
+    payment_method = values.get('payment_method', '').strip()
+    if len(category) > 20 or len(payment_method) > 20:
+        raise ValueError('カテゴリ名・支払方法名は20文字以内にしてください。')
+
+    return ImportRow(
+        line=line,
+        date=_parse_date(values['date']),
+        amount=amount,
+        transaction_type=transaction_type,
+        purpose=purpose[:100],
+        purpose_description=values.get('purpose_description', '').strip(),
+        category=category,
+        payment_method=payment_method,
+        major_category=major_category,
+    )
+
+
+def parse_csv(stream: TextIO) -> Iterator[ImportRow | RowError]:
+    """見出し付き CSV を1行ずつ解析する。"""
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [_CSV_COLUMNS.get(name.strip().lower()) for name in header]
+    missing = [name for name in _REQUIRED_CSV_COLUMNS if name not in columns]
+    if missing:
+        yield RowError(1, f'必須の列がありません（{", ".join(missing)}）。')
+        return
+
+    for record in reader:
+        line = reader.line_num
+        if not any(value.strip() for value in record):
+            continue
+        if len(record) != len(columns):
+            yield RowError(line, '列の数が見出しと一致しません。')
+            continue
+        values = {column: value for column, value in zip(columns, record, strict=True) if column}
+        try:
+            yield _build_row(line, values)
+        except (KeyError, ValueError) as exc:
+            message = str(exc) if isinstance(exc, ValueError) else '列が不足しています。'
+            yield RowError(line, message)
+
+
+_OFX_BLOCK_END = '</STMTTRN>'
+_OFX_TAG_RE = re.compile(r'<([A-Z0-9.]+)>([^<\r\n]*)')
+_OFX_READ_SIZE = 64 * 1024
+
+
+def parse_ofx(stream: TextIO) -> Iterator[ImportRow | RowError]:
+    """OFX（SGML / XML どちらの形式も可）の STMTTRN を1件ずつ解析する。"""
+    buffer = ''
+    number = 0
+    while True:
+        chunk = stream.read(_OFX_READ_SIZE)
+        buffer += chunk
+        while True:
+            end = buffer.find(_OFX_BLOCK_END)
+            if end < 0:
+                break
+            start = buffer.rfind('<STMTTRN>', 0, end)
+            block = buffer[start:end] if start >= 0 else ''
+            buffer = buffer[end + len(_OFX_BLOCK_END):]
+            number += 1
+            yield _parse_ofx_transaction(number, block)
+        if not chunk:
+            break
+        # 取引ブロックの外側は不要なので、未完のブロック（と途中で切れた開始タグ）だけ残す
+        start = buffer.rfind('<STMTTRN>')
+        buffer = buffer[start:] if start >= 0 else buffer[-len('<STMTTRN>'):]
+
+
+def _parse_ofx_transaction(number: int, block: str) -> ImportRow | RowError:
+    tags = {name: value.strip() for name, value in _OFX_TAG_RE.findall(block)}
+    try:
+        row = _build_row(number, {
+            'date': tags.get('DTPOSTED', '')[:8],
+            'amount': tags.get('TRNAMT', ''),
+            'purpose': tags.get('NAME') or tags.get('MEMO', ''),
+            'purpose_description': tags.get('MEMO', '') if tags.get('NAME') else '',
+        })
+    except ValueError as exc:
+        return RowError(number, str(exc))
+    if tags.get('FITID'):
+        row.key = f"ofx:{tags['FITID']}"
+    return row
+
+
+def parse_file(stream: TextIO, file_format: str) -> Iterator[ImportRow | RowError]:
+    """形式（'csv' / 'ofx'）に応じた解析器で読む。"""
+    if file_format == 'ofx':
+        return parse_ofx(stream)
+    return parse_csv(stream)
+
+
+def detect_format(filename: str) -> str:
+    """拡張子からファイル形式を推定する。"""
+    return 'ofx' if filename.lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+
+# =============================================================================
+# 取り込み
+# =============================================================================
+
+class _NameLookup:
+    """名前 → カテゴリ / 支払方法のキャッシュ。
+
+    未登録の名前は、画面からの登録と同じ上限（limit 件）まで作成する。
+    上限に達していれば ValueError（その行はエラーとして報告する）。
+    """
+
+    def __init__(
+        self,
+        model: type[Model],
+        user: AbstractBaseUser,
+        default_name: str,
+        *,
+        limit: int,
+        label: str,
+    ) -> None:
+        self.model = model
+        self.user = user
+        self.default_name = default_name
+        self.limit = limit
+        self.label = label
+        self.cache = {obj.name: obj for obj in model.objects.filter(user=user)}
+
+    def get(self, name: str) -> Model:
+        name = name or self.default_name
+        obj = self.cache.get(name)
+        if obj is None:
+            if len(self.cache) >= self.limit:
+                raise ValueError(
+                    f'{self.label}の登録上限数（{self.limit}件）に達しているため「{name}」を作成できません。'
+                )
+            obj = self.model.objects.create(user=self.user, name=name)
+            self.cache[name] = obj
+        return obj
+
+
+def _row_hash(row: ImportRow, occurrences: Counter) -> str:
+    """行の内容ハッシュ。同一ファイル内の同じ内容の行は出現順で区別する。"""
+    key = row.key or '|'.join([
+        row.date.date().isoformat(), str(row.amount.normalize()), row.transaction_type,
+        row.purpose, row.purpose_description, row.category, row.payment_method,
+    ])
+    digest = hashlib.sha256(key.encode()).digest()
+    occurrences[digest] += 1
+    return hashlib.sha256(digest + str(occurrences[digest]).encode()).hexdigest()
+
+
+def import_transactions(
+    user: AbstractBaseUser,
+    rows: Iterable[ImportRow | RowError],
+    *,
+    default_category: str = DEFAULT_CATEGORY_NAME,
+    default_payment_method: str = DEFAULT_PAYMENT_METHOD_NAME,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportResult:
+    """解析済みの行を取引として一括登録する。全体を1トランザクションで行う。"""
+    result = ImportResult()
+    started = time.perf_counter()
+    categories = _NameLookup(
+        Category, user, default_category, limit=services.CATEGORY_LIMIT, label='使用用途',
+    )
+    payment_methods = _NameLookup(
+        PaymentMethod, user, default_payment_method,
+        limit=services.PAYMENT_METHOD_LIMIT, label='支払方法',
+    )
+    occurrences: Counter = Counter()
+    rows = iter(rows)
+
+    with db_transaction.atomic():
+        while batch := list(islice(rows, batch_size)):
+            pending: dict[str, ImportRow] = {}
+            for row in batch:
+                if isinstance(row, RowError):
+                    result.add_error(row)
+                else:
+                    pending[_row_hash(row, occurrences)] = row
+
+            existing = set(
+                Transaction.objects
+                .filter(user=user, import_hash__in=list(pending))
+                .values_list('import_hash', flat=True)
+            )
+            result.duplicates += len(existing)
+
+            new_transactions = []
+            for import_hash, row in pending.items():
+                if import_hash in existing:
+                    continue
+                try:
+                    category = categories.get(row.category)
+                    payment_method = payment_methods.get(row.payment_method)
+                except ValueError as exc:
+                    result.add_error(RowError(row.line, str(exc)))
+                    continue
+                new_transaction = Transaction(
+                    user=user,
+                    date=row.date,
+                    amount=row.amount,
+                    transaction_type=row.transaction_type,
+                    purpose=row.purpose,
+                    purpose_description=row.purpose_description,
+                    category=category,
+                    payment_method=payment_method,
+                    major_category=row.major_category,
+                    import_hash=import_hash,
+                )
+                new_transaction.refresh_search_grams()
+                new_transactions.append(new_transaction)
+
+            Transaction.objects.bulk_create(new_transactions)
+            services.adjust_ledger_summary(added=new_transactions)
+            result.created += len(new_transactions)
+
+    result.elapsed = time.perf_counter() - started
+    return result
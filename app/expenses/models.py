@@ -1,8 +1,16 @@
-from django.db import models
+import calendar
+from collections.abc import Iterable, Iterator
+from datetime import date
+from typing import Any
+
 from django.conf import settings
-from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MaxLengthValidator
+from django.db import models
+from django.utils import timezone
+
+from .search import build_search_grams
 
 
 class PaymentMethod(models.Model):
@@ -42,10 +50,44 @@ class Transaction(models.Model):
     major_category = models.CharField(max_length=10, choices=MAJOR_CATEGORY_TYPE_CHOICES)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     purpose_description = models.TextField()
-    
+    # 用途・説明の n-gram（キーワード検索のインデックス用。save() で自動更新）
+    search_grams = ArrayField(models.TextField(), default=list, blank=True, editable=False)
+    # 一括インポートした行の内容ハッシュ（再インポート時の重複除外用。手入力の取引は空）
+    import_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            # 一覧の並び順とキーセットページネーション用（日付順・金額の昇順・金額の降順）。
+            # 金額の降順（-amount, -date, -id）は (amount, date, id) を逆順に読む
+            models.Index(fields=['user', 'date', 'id'], name='transaction_user_date_id_idx'),
+            models.Index(
+                fields=['user', 'amount', '-date', '-id'], name='transaction_amount_asc_idx',
+            ),
+            models.Index(
+                fields=['user', 'amount', 'date', 'id'], name='transaction_amount_desc_idx',
+            ),
+            GinIndex(fields=['search_grams'], name='transaction_search_grams_idx'),
+            models.Index(
+                fields=['user', 'import_hash'], name='transaction_import_hash_idx',
+                condition=~models.Q(import_hash=''),
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.user.email} - {self.amount} - {self.transaction_type}"
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'purpose', 'purpose_description'} & set(update_fields):
+            self.refresh_search_grams()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_grams'}
+        super().save(*args, **kwargs)
+
+    def refresh_search_grams(self) -> None:
+        """用途・説明から検索用 n-gram を作り直す（bulk_create 前にも呼ぶこと）。"""
+        self.search_grams = build_search_grams(self.purpose, self.purpose_description)
+
 
 class RecurringPayment(models.Model):
     FREQUENCY_CHOICES = [
@@ -102,10 +144,8 @@ class RecurringPayment(models.Model):
     def __str__(self) -> str:
         return f"{self.purpose} - {self.get_frequency_display()}"
 
-    def should_execute_on(self, target_date: 'date') -> bool:
+    def should_execute_on(self, target_date: date) -> bool:
         """指定日に実行すべきかどうかを判定する"""
-        from datetime import date  # noqa: F811
-
         if not self.is_active:
             return False
 
@@ -116,28 +156,54 @@ class RecurringPayment(models.Model):
             return True
         elif self.frequency == 'weekly':
             # 曜日リストのいずれかに一致すれば実行
-            days = self.days_of_week if self.days_of_week else [0]
-            return target_date.weekday() in days
-        elif self.frequency == 'monthly':
-            # 日リストのいずれかに一致すれば実行（月末調整あり）
-            import calendar
-            days = self.days_of_month if self.days_of_month else [1]
-            last_day = calendar.monthrange(target_date.year, target_date.month)[1]
-            effective_days = [min(d, last_day) for d in days]
-            return target_date.day in effective_days
-        elif self.frequency == 'yearly':
-            # 指定月かつ日リストのいずれかに一致すれば実行
-            import calendar
-            month = self.month_of_year or 1
-            if target_date.month != month:
-                return False
-            days = self.days_of_month if self.days_of_month else [1]
-            last_day = calendar.monthrange(target_date.year, target_date.month)[1]
-            effective_days = [min(d, last_day) for d in days]
-            return target_date.day in effective_days
+            return target_date.weekday() in self._weekdays()
+        elif self.frequency in ('monthly', 'yearly'):
+            # 日リストのいずれかに一致すれば実行（月末調整あり。毎年は指定月のみ）
+            return target_date.day in self._days_in_month(target_date.year, target_date.month)
 
         return False
 
+    def _weekdays(self) -> list[int]:
+        """毎週の実行曜日（未指定なら月曜）。"""
+        return self.days_of_week if self.days_of_week else [0]
+
+    def _days_in_month(self, year: int, month: int) -> set[int]:
+        """毎月・毎年の、指定月の実行日（月末日を超える日は月末日に丸める）。"""
+        if self.frequency == 'yearly' and month != (self.month_of_year or 1):
+            return set()
+        days = self.days_of_month if self.days_of_month else [1]
+        last_day = calendar.monthrange(year, month)[1]
+        return {min(d, last_day) for d in days}
+
+    def occurrences_between(self, start_date: date, end_date: date) -> Iterator[date]:
+        """期間内（両端含む）の実行予定日を昇順に返す。
+
+        should_execute_on と同じ規則で、日ごとに判定せず月単位で日付を求める。
+        有効/無効や last_executed は考慮しない。
+        """
+        if start_date > end_date:
+            return
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (end_date.year, end_date.month):
+            last_day = calendar.monthrange(year, month)[1]
+            if self.frequency == 'daily':
+                days: Iterable[int] = range(1, last_day + 1)
+            elif self.frequency == 'weekly':
+                first_weekday = date(year, month, 1).weekday()
+                days = sorted(
+                    day
+                    for weekday in set(self._weekdays())
+                    for day in range((weekday - first_weekday) % 7 + 1, last_day + 1, 7)
+                )
+            elif self.frequency in ('monthly', 'yearly'):
+                days = sorted(self._days_in_month(year, month))
+            else:
+                days = ()
+            for day in days:
+                occurrence = date(year, month, day)
+                if start_date <= occurrence <= end_date:
+                    yield occurrence
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
 
 
 class Budget(models.Model):
@@ -159,6 +225,8 @@ class Budget(models.Model):
         related_name='budgets',
     )
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # True のとき、使い切らなかった分を翌月の予算に繰り越す
+    rollover = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -181,3 +249,136 @@ class Budget(models.Model):
     def __str__(self) -> str:
         target = self.category.name if self.category else '全体'
         return f'{self.user} の予算（{target}）: {self.amount}'
+
+
+class BudgetSnapshot(models.Model):
+    """月ごとの予算額の記録。予算履歴と繰り越しの計算に使う。
+
+    予算を設定・解除した月に1件作る（同じ月に変更すれば上書き）。ある月の予算は
+    その月以前で最も新しいスナップショットの値で、amount=0 は予算なしを表す。
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='budget_snapshots',
+    )
+    # None のときは全体予算
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    # 適用開始月（ローカル日付の月初日）
+    year_month = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    rollover = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'year_month'],
+                name='unique_budget_snapshot_per_month',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'year_month'],
+                condition=models.Q(category__isnull=True),
+                name='unique_overall_budget_snapshot_per_month',
+            ),
+        ]
+        verbose_name = '予算履歴'
+        verbose_name_plural = '予算履歴'
+
+    def __str__(self) -> str:
+        target = self.category.name if self.category else '全体'
+        return f'{self.user} の予算履歴（{target} {self.year_month:%Y-%m}）: {self.amount}'
+
+
+class MonthlyLedgerSummary(models.Model):
+    """ユーザー別・月別の取引集計（Transaction の合計を事前集計したもの）。
+
+    集計カード・カテゴリ別グラフ・予算消化・ダッシュボードはこのテーブルを読むため、
+    表示コストは取引件数ではなくカテゴリ等の組み合わせ数に比例する。
+    Transaction の保存・削除時にシグナルで差分更新し、
+    rebuild_ledger_summary コマンドで全件から再構築できる。
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='monthly_ledger_summaries',
+    )
+    # 集計月（ローカル日付の月初日）
+    year_month = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    payment_method = models.ForeignKey(PaymentMethod, on_delete=models.CASCADE, related_name='+')
+    transaction_type = models.CharField(
+        max_length=10, choices=Transaction.TRANSACTION_TYPE_CHOICES,
+    )
+    major_category = models.CharField(
+        max_length=10, choices=Transaction.MAJOR_CATEGORY_TYPE_CHOICES,
+    )
+    # Transaction と同じ名前にして、集計用のセレクターをどちらのクエリセットにも使えるようにする
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    'user', 'year_month', 'category', 'payment_method',
+                    'transaction_type', 'major_category',
+                ],
+                name='unique_monthly_ledger_summary_key',
+            ),
+        ]
+        verbose_name = '月次集計'
+        verbose_name_plural = '月次集計'
+
+    def __str__(self) -> str:
+        return f'{self.user} {self.year_month:%Y-%m} {self.transaction_type}: {self.amount}'
+
+
+class SpendingCurve(models.Model):
+    """日次の累積支出カーブ。予算の月末支出予測（forecasting）に使う。
+
+    cumulative[d - 1] は、過去の月における「月初から d 日目までの支出」の月平均
+    （支出のない月も 0 として平均する）。短い月の予測では、その月の日数までの値を使う。
+    category=None は全カテゴリの合計。
+    forecast_budgets コマンドで毎晩作り直す。
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='spending_curves',
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    cumulative = ArrayField(models.DecimalField(max_digits=14, decimal_places=2), size=31)
+    # 平均に使った月数（0 なら履歴なし。全体カーブだけが作られる）
+    months = models.IntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category'],
+                name='unique_spending_curve_per_category',
+            ),
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(category__isnull=True),
+                name='unique_overall_spending_curve_per_user',
+            ),
+        ]
+        verbose_name = '支出カーブ'
+        verbose_name_plural = '支出カーブ'
+
+    def __str__(self) -> str:
+        target = self.category.name if self.category else '全体'
+        return f'{self.user} の支出カーブ（{target}）'
@@ -0,0 +1,102 @@
+"""定期支払いの発生見込み（今後 N か月の固定収支の予測）。
+
+有効な定期支払いを1クエリで読み、RecurringPayment.occurrences_between で
+月単位に実行予定日を求めて、日別・月別の見込み合計に積み上げる。
+日ごとに should_execute_on を呼んで期間を走査することはしないので、
+計算量は「定期支払いの件数 × 月数 + 実行予定日の数」に比例する。
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import TYPE_CHECKING
+
+from django.utils.timezone import localdate
+
+from .models import RecurringPayment
+
+if TYPE_CHECKING:
+    from django.contrib.auth.base_user import AbstractBaseUser
+
+PROJECTION_DEFAULT_MONTHS = 3
+PROJECTION_MAX_MONTHS = 24
+
+_ZERO = Decimal('0')
+
+
+def _add_months(month_start: date, months: int) -> date:
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _totals_row(income: Decimal, expense: Decimal) -> dict[str, float]:
+    return {
+        'income': float(income),
+        'expense': float(expense),
+        'net': float(income - expense),
+    }
+
+
+def project_recurring_payments(
+    user: AbstractBaseUser,
+    month_start: date,
+    months: int = PROJECTION_DEFAULT_MONTHS,
+    *,
+    today: date | None = None,
+) -> dict[str, object]:
+    """month_start の月から months か月分の、定期支払いの日別・月別の見込みを返す。
+
+    今日までの分は実行済み（または実行済みになる）として含めず、明日以降だけを数える。
+    対象は有効な定期支払いのうち収入・支出のもので、last_executed 以前の日も除く。
+    days は実行予定のある日だけを日付順に、months は期間内の全ての月を返す。
+    """
+    today = today or localdate()
+    month_start = month_start.replace(day=1)
+    start_date = max(month_start, today + timedelta(days=1))
+    end_date = _add_months(month_start, months) - timedelta(days=1)
+    recurring_payments = (
+        RecurringPayment.objects
+        .filter(user=user, is_active=True, transaction_type__in=('income', 'expense'))
+        .only(
+            'amount', 'transaction_type', 'frequency',
+            'days_of_week', 'days_of_month', 'month_of_year', 'last_executed',
+        )
+    )
+
+    # 日付 → [収入合計, 支出合計, 件数]
+    daily: dict[date, list] = defaultdict(lambda: [_ZERO, _ZERO, 0])
+    for recurring in recurring_payments:
+        index = 0 if recurring.transaction_type == 'income' else 1
+        first_date = start_date
+        if recurring.last_executed and recurring.last_executed >= first_date:
+            first_date = recurring.last_executed + timedelta(days=1)
+        for occurrence in recurring.occurrences_between(first_date, end_date):
+            totals = daily[occurrence]
+            totals[index] += recurring.amount
+            totals[2] += 1
+
+    monthly: dict[date, list[Decimal]] = {
+        _add_months(month_start, offset): [_ZERO, _ZERO] for offset in range(months)
+    }
+    days = []
+    for day in sorted(daily):
+        income, expense, count = daily[day]
+        month_totals = monthly[day.replace(day=1)]
+        month_totals[0] += income
+        month_totals[1] += expense
+        days.append({'date': day.isoformat(), **_totals_row(income, expense), 'count': count})
+
+    return {
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'days': days,
+        'months': [
+            {'month': f'{month:%Y-%m}', **_totals_row(income, expense)}
+            for month, (income, expense) in monthly.items()
+        ],
+        'total': _totals_row(
+            sum((totals[0] for totals in monthly.values()), _ZERO),
+            sum((totals[1] for totals in monthly.values()), _ZERO),
+        ),
+    }
@@ -0,0 +1,74 @@
+"""取引のキーワード検索。
+
+PostgreSQL では、用途・説明の文字 uni-gram / bi-gram を Transaction.search_grams
+（GIN インデックス付き配列）に保存しておき、検索語の n-gram をすべて含む行に
+インデックスで絞り込んでから icontains で確認する。分かち書き不要で日本語の
+部分一致にそのまま使える。カテゴリ名・支払方法名はユーザーごとに高々数件なので、
+該当 ID を先に求めて外部キーで絞り込む（JOIN しない）。
+
+PostgreSQL 以外（SQLite 等）では従来どおり icontains だけで検索する。
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from django.db import connection
+from django.db.models import Q
+
+if TYPE_CHECKING:
+    from django.contrib.auth.base_user import AbstractBaseUser
+
+
+def _text_grams(text: str) -> set[str]:
+    """文字列の uni-gram と bi-gram の集合を返す（大文字小文字は区別しない）。"""
+    text = text.lower()
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def build_search_grams(*texts: str) -> list[str]:
+    """検索用 n-gram 配列（Transaction.search_grams に保存する値）を返す。"""
+    grams: set[str] = set()
+    for text in texts:
+        grams.update(_text_grams(text or ''))
+    return sorted(grams)
+
+
+def query_grams(search: str) -> list[str]:
+    """検索語が含むべき n-gram を返す（1文字なら uni-gram、2文字以上なら bi-gram）。"""
+    search = search.lower()
+    if len(search) < 2:
+        return [search] if search else []
+    return sorted({search[i:i + 2] for i in range(len(search) - 1)})
+
+
+def icontains_search_filter(search: str) -> Q:
+    """全列を icontains で照合する検索条件（n-gram を使えない DB 向け）。"""
+    return (
+        Q(purpose__icontains=search)
+        | Q(purpose_description__icontains=search)
+        | Q(category__name__icontains=search)
+        | Q(payment_method__name__icontains=search)
+    )
+
+
+def transaction_search_filter(user: AbstractBaseUser, search: str) -> Q:
+    """取引の検索条件を返す。結果は icontains_search_filter と同じ行になる。"""
+    if connection.vendor != 'postgresql':
+        return icontains_search_filter(search)
+
+    from .models import Category, PaymentMethod
+
+    text_match = Q(search_grams__contains=query_grams(search)) & (
+        Q(purpose__icontains=search) | Q(purpose_description__icontains=search)
+    )
+    category_ids = Category.objects.filter(user=user, name__icontains=search).values('id')
+    payment_method_ids = (
+        PaymentMethod.objects.filter(user=user, name__icontains=search).values('id')
+    )
+    return (
+        text_match
+        | Q(category_id__in=category_ids)
+        | Q(payment_method_id__in=payment_method_ids)
+    )
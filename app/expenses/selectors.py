@@ -4,19 +4,40 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime, timedelta
+from collections import defaultdict
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+from itertools import accumulate
 from typing import TYPE_CHECKING
 
-from django.db.models import Q, QuerySet, Sum
-from django.utils.timezone import make_aware
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, F, Q, QuerySet, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils.timezone import get_current_timezone, localtime, make_aware
 
 from project.utils import CHART_COLORS, MAJOR_CATEGORY_LABELS
 
-from .models import Budget, Category, PaymentMethod, RecurringPayment, Transaction
+from . import caching
+from .models import (
+    Budget,
+    BudgetSnapshot,
+    Category,
+    MonthlyLedgerSummary,
+    PaymentMethod,
+    RecurringPayment,
+    Transaction,
+)
+from .search import transaction_search_filter
 
 # 予算消化の警告しきい値（%）
 BUDGET_WARNING_PERCENT = 80
+# 内訳グラフで個別に表示する件数（残りは「その他」）
+CHART_TOP_N = 5
+# 予算履歴の表示月数（既定値と選択肢）
+BUDGET_HISTORY_MONTHS = 12
+BUDGET_HISTORY_MONTH_CHOICES = (12, 24)
 
 if TYPE_CHECKING:
     from django.contrib.auth.base_user import AbstractBaseUser
@@ -41,18 +62,21 @@ def get_date_range(year_month: str | None) -> tuple[datetime, datetime, list[str
     return start_date, end_date, date_range
 
 
+# 並び順ごとの ORDER BY。末尾の id はキーセットページネーション用の一意な同順位決定キー
 _SORT_FIELD_MAP: dict[str, tuple[str, ...]] = {
     'date_desc': ('-date', '-id'),
     'date_asc': ('date', 'id'),
-    'amount_desc': ('-amount', '-date'),
-    'amount_asc': ('amount', '-date'),
+    'amount_desc': ('-amount', '-date', '-id'),
+    'amount_asc': ('amount', '-date', '-id'),
 }
 
+_CURSOR_SALT = 'app.expenses.transaction_cursor'
+
 
 def get_transactions(
     user: AbstractBaseUser,
-    start_date: datetime,
-    end_date: datetime,
+    start_date: datetime | None,
+    end_date: datetime | None,
     *,
     search: str = '',
     transaction_type: str = '',
@@ -61,20 +85,150 @@ def get_transactions(
     payment_method_id: str = '',
     sort_by: str = 'date_desc',
 ) -> QuerySet:
-    """フィルタリング済みの取引クエリセットを返す。"""
+    """フィルタリング済みの取引クエリセットを返す。期間が None なら全期間。"""
     order_fields = _SORT_FIELD_MAP.get(sort_by, _SORT_FIELD_MAP['date_desc'])
     qs = (
-        Transaction.objects.filter(user=user, date__range=(start_date, end_date))
+        Transaction.objects.filter(user=user)
         .select_related('payment_method', 'category')
         .order_by(*order_fields)
     )
+    if start_date is not None and end_date is not None:
+        qs = qs.filter(date__range=(start_date, end_date))
     if search:
-        qs = qs.filter(
-            Q(purpose__icontains=search)
-            | Q(purpose_description__icontains=search)
-            | Q(category__name__icontains=search)
-            | Q(payment_method__name__icontains=search)
+        qs = qs.filter(transaction_search_filter(user, search))
+    if transaction_type:
+        qs = qs.filter(transaction_type=transaction_type)
+    if major_category:
+        qs = qs.filter(major_category=major_category)
+    if category_id:
+        qs = qs.filter(category__id=category_id)
+    if payment_method_id:
+        qs = qs.filter(payment_method__id=payment_method_id)
+    return qs
+
+
+def _cursor_value(transaction: Transaction, field: str) -> str | int:
+    """カーソルに埋め込む並び替えキーの値（JSON化できる形）を返す。"""
+    value = getattr(transaction, field)
+    if field == 'date':
+        return value.isoformat()
+    if field == 'amount':
+        return str(value)
+    return value
+
+
+def _parse_cursor_value(field: str, raw: str | int) -> datetime | Decimal | int:
+    """カーソル内の値を並び替えキーの型に戻す。"""
+    if field == 'date':
+        return datetime.fromisoformat(str(raw))
+    if field == 'amount':
+        return Decimal(str(raw))
+    return int(raw)
+
+
+def build_transaction_cursors(
+    transactions: list[Transaction],
+    sort_by: str,
+) -> tuple[str | None, str | None]:
+    """表示中の行から（前ページ用, 次ページ用）のカーソルトークンを返す。
+
+    トークンは署名付きの不透明な文字列で、URL の cursor パラメータに載せる。
+    """
+    if not transactions:
+        return None, None
+    sort_by = sort_by if sort_by in _SORT_FIELD_MAP else 'date_desc'
+    fields = [name.lstrip('-') for name in _SORT_FIELD_MAP[sort_by]]
+
+    def encode(transaction: Transaction, direction: str) -> str:
+        values = [_cursor_value(transaction, field) for field in fields]
+        return signing.dumps(
+            {'s': sort_by, 'd': direction, 'k': values}, salt=_CURSOR_SALT, compress=True,
         )
+
+    return encode(transactions[0], 'prev'), encode(transactions[-1], 'next')
+
+
+def get_transactions_by_cursor(
+    transactions_qs: QuerySet,
+    sort_by: str,
+    cursor: str,
+    limit: int,
+) -> list[Transaction] | None:
+    """カーソルの前後 limit 件をキーセット（WHERE 条件）で取得する。
+
+    OFFSET を使わないため、何ページ目でも先頭ページと同じコストで取得できる。
+    先頭の並び順の項目には単純な範囲条件も加え、インデックスをカーソルの位置から読み始められるようにする。
+    カーソルが不正・並び順と不一致の場合は None を返す。
+    """
+    sort_by = sort_by if sort_by in _SORT_FIELD_MAP else 'date_desc'
+    try:
+        payload = signing.loads(cursor, salt=_CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    if (
+        not isinstance(payload, dict)
+        or payload.get('s') != sort_by
+        or payload.get('d') not in ('next', 'prev')
+    ):
+        return None
+
+    order_fields = _SORT_FIELD_MAP[sort_by]
+    fields = [(name.lstrip('-'), name.startswith('-')) for name in order_fields]
+    raw_values = payload.get('k')
+    if not isinstance(raw_values, list):
+        return None
+    try:
+        # 値の数が並び順の項目数と違う（改ざんされた）カーソルは zip が ValueError にする
+        values = [
+            _parse_cursor_value(name, raw)
+            for (name, _), raw in zip(fields, raw_values, strict=True)
+        ]
+    except (ValueError, ArithmeticError):
+        return None
+
+    forward = payload['d'] == 'next'
+    # (a, b, c) の辞書順比較を「a が先 OR (a が同じ AND b が先) OR ...」に展開する
+    condition = Q()
+    for index, (name, descending) in enumerate(fields):
+        lookup = 'lt' if descending == forward else 'gt'
+        branch = Q(**{f'{name}__{lookup}': values[index]})
+        for (prev_name, _), prev_value in zip(fields[:index], values[:index], strict=True):
+            branch &= Q(**{prev_name: prev_value})
+        condition |= branch
+    # OR の展開だけでは先頭の項目に範囲の条件がなく、インデックスを先頭から読んでしまう
+    leading_name, leading_descending = fields[0]
+    bound = 'lte' if leading_descending == forward else 'gte'
+    condition &= Q(**{f'{leading_name}__{bound}': values[0]})
+
+    if forward:
+        return list(transactions_qs.filter(condition).order_by(*order_fields)[:limit])
+    reversed_fields = [name[1:] if name.startswith('-') else f'-{name}' for name in order_fields]
+    rows = list(transactions_qs.filter(condition).order_by(*reversed_fields)[:limit])
+    rows.reverse()
+    return rows
+
+
+def get_ledger_summary(
+    user: AbstractBaseUser,
+    start_date: datetime,
+    end_date: datetime,
+    *,
+    transaction_type: str = '',
+    major_category: str = '',
+    category_id: str = '',
+    payment_method_id: str = '',
+) -> QuerySet:
+    """期間内の月次集計（MonthlyLedgerSummary）のクエリセットを返す。
+
+    start_date〜end_date は月単位の範囲（月表示・年表示）であること。
+    amount / transaction_type / category / major_category を Transaction と同名で持つため、
+    get_summary や各グラフ生成関数に取引クエリセットの代わりに渡せる。
+    """
+    qs = MonthlyLedgerSummary.objects.filter(
+        user=user,
+        year_month__gte=localtime(start_date).date().replace(day=1),
+        year_month__lte=localtime(end_date).date(),
+    )
     if transaction_type:
         qs = qs.filter(transaction_type=transaction_type)
     if major_category:
@@ -86,85 +240,228 @@ def get_transactions(
     return qs
 
 
-def get_summary(transactions_qs: QuerySet) -> dict[str, Decimal | float]:
-    """月合計の収入・支出・純残高を返す。"""
-    total_income: Decimal = (
-        transactions_qs.filter(transaction_type='income').aggregate(Sum('amount'))['amount__sum']
-        or Decimal('0')
+def get_aggregate_queryset(
+    user: AbstractBaseUser,
+    start_date: datetime,
+    end_date: datetime,
+    transactions_qs: QuerySet,
+    *,
+    search: str = '',
+    transaction_type: str = '',
+    major_category: str = '',
+    category_id: str = '',
+    payment_method_id: str = '',
+) -> QuerySet:
+    """集計カード・カテゴリ別グラフ用のクエリセットを返す。
+
+    検索語がなければ月次集計テーブルを使う。検索語は集計キーに含まれないため、
+    その場合だけフィルタ済みの取引クエリセットをそのまま返す。
+    """
+    if search:
+        return transactions_qs
+    return get_ledger_summary(
+        user, start_date, end_date,
+        transaction_type=transaction_type,
+        major_category=major_category,
+        category_id=category_id,
+        payment_method_id=payment_method_id,
     )
-    total_expense: Decimal = (
-        transactions_qs.filter(transaction_type='expense').aggregate(Sum('amount'))['amount__sum']
-        or Decimal('0')
+
+
+def get_ledger_stats(transactions_qs: QuerySet) -> dict[str, Decimal | int]:
+    """件数と取引種別ごとの合計を1回の aggregate で返す。
+
+    取引・月次集計（get_ledger_summary）のどちらのクエリセットも受け付ける。
+    件数は一覧の Paginator（CountedPaginator）にそのまま渡せる。
+    """
+    if transactions_qs.model is MonthlyLedgerSummary:
+        count_expression = Sum('transaction_count')
+    else:
+        count_expression = Count('id')
+    stats = transactions_qs.order_by().aggregate(
+        count=count_expression,
+        total_income=Sum('amount', filter=Q(transaction_type='income')),
+        total_expense=Sum('amount', filter=Q(transaction_type='expense')),
+        total_no_change=Sum('amount', filter=Q(transaction_type='no_change')),
     )
+    return {
+        'count': stats['count'] or 0,
+        'total_income': stats['total_income'] or Decimal('0'),
+        'total_expense': stats['total_expense'] or Decimal('0'),
+        'total_no_change': stats['total_no_change'] or Decimal('0'),
+    }
+
+
+def get_summary(
+    transactions_qs: QuerySet,
+    *,
+    monthly_totals: dict[date, tuple[Decimal, Decimal]] | None = None,
+    stats: dict[str, Decimal | int] | None = None,
+) -> dict[str, Decimal | float]:
+    """期間合計の収入・支出・純残高を返す。
+
+    monthly_totals（aggregate_monthly_totals の結果）または stats（get_ledger_stats の結果）を
+    渡した場合は、追加のクエリを発行せずにその合計を使う。
+    """
+    if monthly_totals is not None:
+        total_income = sum((income for income, _ in monthly_totals.values()), Decimal('0'))
+        total_expense = sum((expense for _, expense in monthly_totals.values()), Decimal('0'))
+    else:
+        if stats is None:
+            stats = get_ledger_stats(transactions_qs)
+        total_income = stats['total_income']
+        total_expense = stats['total_expense']
     net_balance: float = float(total_income) - float(total_expense)
     return {'total_income': total_income, 'total_expense': total_expense, 'net_balance': net_balance}
 
 
+def aggregate_top_n(
+    transactions_qs: QuerySet,
+    group_fields: Sequence[str],
+    n: int = CHART_TOP_N,
+) -> tuple[list[dict[str, object]], Decimal]:
+    """group_fields ごとの金額合計を多い順に並べ、上位 n 件と残りの合計を返す。
+
+    GROUP BY は1回だけ実行し、上位と残りへの振り分けは取得した行で行う。
+    取引・月次集計（get_ledger_summary）のどちらのクエリセットも受け付ける。
+    """
+    rows = list(
+        transactions_qs.values(*group_fields)
+        .annotate(total=Sum('amount'))
+        .order_by('-total', *group_fields)
+    )
+    other_total = sum((row['total'] for row in rows[n:]), Decimal('0'))
+    return rows[:n], other_total
+
+
+def _truncate_label(label: str) -> str:
+    return label[:10] + ('...' if len(label) > 10 else '')
+
+
+def _build_breakdown_chart_data(
+    top_rows: list[dict[str, object]],
+    other_total: Decimal,
+    labels: list[str],
+    colors: list[str],
+) -> str:
+    """aggregate_top_n の結果から円グラフのデータ（JSON文字列）を作る。
+
+    残りは「その他」にまとめる。
+    """
+    if not top_rows:
+        return json.dumps({
+            'labels': ['データなし'],
+            'datasets': [{'data': [1], 'backgroundColor': [CHART_COLORS['no_data']]}],
+        })
+    amounts = [float(row['total']) for row in top_rows]
+    if other_total > 0:
+        labels = [*labels, 'その他']
+        amounts.append(float(other_total))
+        colors = [*colors, CHART_COLORS['no_data']]
+    return json.dumps({
+        'labels': labels,
+        'datasets': [{'data': amounts, 'backgroundColor': colors}],
+    })
+
+
 def build_category_chart_data(transactions_qs: QuerySet) -> str:
     """カテゴリ別グラフデータ（JSON文字列）を返す。支出のみ、上位5件＋その他。
     カテゴリに色が設定されていればそれを使い、なければIDのmod割り当てで固定色を使う。
     """
-    expense_qs = transactions_qs.filter(transaction_type='expense')
-    category_data = expense_qs.values('category__id', 'category__name', 'category__chart_color').annotate(total=Sum('amount')).order_by('-total')
-
-    if category_data.exists():
-        top_categories = list(category_data[:5])
-        other_total = sum(float(entry['total']) for entry in category_data[5:])
-        labels = [
-            entry['category__name'][:10] + ('...' if len(entry['category__name']) > 10 else '')
-            for entry in top_categories
-        ]
-        amounts = [float(entry['total']) for entry in top_categories]
-        colors: list[str] = [
-            entry['category__chart_color'] if entry['category__chart_color']
-            else get_category_default_color(entry['category__id'])
-            for entry in top_categories
-        ]
-        if other_total > 0:
-            labels.append('その他')
-            amounts.append(other_total)
-            colors.append(CHART_COLORS['no_data'])
-    else:
-        labels = ['データなし']
-        amounts = [1]
-        colors = [CHART_COLORS['no_data']]
+    top_rows, other_total = aggregate_top_n(
+        transactions_qs.filter(transaction_type='expense'),
+        ('category__id', 'category__name', 'category__chart_color'),
+    )
+    return _build_breakdown_chart_data(
+        top_rows,
+        other_total,
+        [_truncate_label(row['category__name']) for row in top_rows],
+        [
+            row['category__chart_color'] or get_category_default_color(row['category__id'])
+            for row in top_rows
+        ],
+    )
 
-    return json.dumps({'labels': labels, 'datasets': [{'data': amounts, 'backgroundColor': colors}]})
+
+def build_payment_method_chart_data(transactions_qs: QuerySet) -> str:
+    """支払方法別グラフデータ（JSON文字列）を返す。支出のみ、上位5件＋その他。"""
+    top_rows, other_total = aggregate_top_n(
+        transactions_qs.filter(transaction_type='expense'),
+        ('payment_method__id', 'payment_method__name'),
+    )
+    return _build_breakdown_chart_data(
+        top_rows,
+        other_total,
+        [_truncate_label(row['payment_method__name']) for row in top_rows],
+        [get_category_default_color(row['payment_method__id']) for row in top_rows],
+    )
+
+
+def build_purpose_chart_data(transactions_qs: QuerySet) -> str:
+    """用途別グラフデータ（JSON文字列）を返す。支出のみ、上位5件＋その他。
+
+    用途は月次集計に含まれないため、取引のクエリセットを渡すこと。
+    """
+    top_rows, other_total = aggregate_top_n(
+        transactions_qs.filter(transaction_type='expense'), ('purpose',),
+    )
+    palette: list[str] = CHART_COLORS['category']
+    return _build_breakdown_chart_data(
+        top_rows,
+        other_total,
+        [_truncate_label(row['purpose']) for row in top_rows],
+        [palette[index % len(palette)] for index in range(len(top_rows))],
+    )
 
 
 def build_major_category_chart_data(transactions_qs: QuerySet) -> str:
     """大分類別グラフデータ（JSON文字列）を返す。支出のみ、固定3色。"""
     expense_qs = transactions_qs.filter(transaction_type='expense')
-    major_data = expense_qs.values('major_category').annotate(total=Sum('amount')).order_by('-total')
+    # 大分類は3種類だけなので、1回の GROUP BY の結果をそのまま使う
+    major_data = list(
+        expense_qs.values('major_category').annotate(total=Sum('amount')).order_by('-total')
+    )
+    return _build_breakdown_chart_data(
+        major_data,
+        Decimal('0'),
+        [MAJOR_CATEGORY_LABELS[entry['major_category']] for entry in major_data],
+        [CHART_COLORS['major_category'][entry['major_category']] for entry in major_data],
+    )
 
-    if major_data.exists():
-        colors = [CHART_COLORS['major_category'][entry['major_category']] for entry in major_data]
-        return json.dumps({
-            'labels': [MAJOR_CATEGORY_LABELS[entry['major_category']] for entry in major_data],
-            'datasets': [{'data': [float(entry['total']) for entry in major_data], 'backgroundColor': colors}],
-        })
-    return json.dumps({
-        'labels': ['データなし'],
-        'datasets': [{'data': [1], 'backgroundColor': [CHART_COLORS['no_data']]}],
-    })
 
+def aggregate_daily_totals(transactions_qs: QuerySet) -> dict[date, tuple[Decimal, Decimal]]:
+    """日別の（収入合計, 支出合計）を1回のGROUP BYで集計して返す。
 
-def build_daily_chart_data(transactions_qs: QuerySet, date_range: list[str]) -> tuple[str, str]:
-    """日別支出グラフ・残高グラフのデータ（JSON文字列のタプル）を返す。"""
-    expense_data: list[float] = []
-    balance_data: list[float] = []
-    current_balance: float = 0.0
-
-    for d in date_range:
-        daily_expense = float(
-            transactions_qs.filter(date__date=d, transaction_type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-        )
-        daily_income = float(
-            transactions_qs.filter(date__date=d, transaction_type='income').aggregate(Sum('amount'))['amount__sum'] or 0
+    日付の区切りは現在のタイムゾーン（Asia/Tokyo）。取引のない日はキーに含まれない。
+    """
+    rows = (
+        transactions_qs.order_by()
+        .annotate(day=TruncDate('date', tzinfo=get_current_timezone()))
+        .values('day')
+        .annotate(
+            income=Sum('amount', filter=Q(transaction_type='income')),
+            expense=Sum('amount', filter=Q(transaction_type='expense')),
         )
-        current_balance += daily_income - daily_expense
-        expense_data.append(daily_expense)
-        balance_data.append(current_balance)
+    )
+    return {
+        row['day']: (row['income'] or Decimal('0'), row['expense'] or Decimal('0'))
+        for row in rows
+    }
+
+
+def build_daily_chart_data(transactions_qs: QuerySet, date_range: list[str]) -> tuple[str, str]:
+    """日別支出グラフ・残高グラフのデータ（JSON文字列のタプル）を返す。
+
+    集計は期間全体で1クエリ。取引のない日は0で埋め、残高は日別収支の累積和で求める。
+    """
+    daily_totals = aggregate_daily_totals(transactions_qs)
+    zero = (Decimal('0'), Decimal('0'))
+    daily_pairs = [daily_totals.get(date.fromisoformat(d), zero) for d in date_range]
+
+    expense_data: list[float] = [float(expense) for _, expense in daily_pairs]
+    balance_data: list[float] = list(accumulate(
+        float(income) - float(expense) for income, expense in daily_pairs
+    ))
 
     expense_json = json.dumps({
         'labels': date_range,
@@ -177,6 +474,35 @@ def build_daily_chart_data(transactions_qs: QuerySet, date_range: list[str]) ->
     return expense_json, balance_json
 
 
+def get_month_chart_payload(
+    user: AbstractBaseUser,
+    year_month: date,
+    filters: dict[str, str],
+    aggregate_qs: QuerySet,
+    transactions_qs: QuerySet,
+    date_range: list[str],
+) -> dict[str, str]:
+    """月表示のグラフデータ（JSON文字列）をまとめて返す。
+
+    (ユーザー, 月, 絞り込み条件, その月のデータバージョン) ごとにキャッシュし、
+    キャッシュにあればクエリセットは評価しない。
+    """
+    key = caching.chart_payload_key(user.pk, year_month, filters)
+    payload = cache.get(key)
+    if payload is None:
+        expense_data_json, balance_data_json = build_daily_chart_data(transactions_qs, date_range)
+        payload = {
+            'category_data_json': build_category_chart_data(aggregate_qs),
+            'major_category_data_json': build_major_category_chart_data(aggregate_qs),
+            'payment_method_data_json': build_payment_method_chart_data(aggregate_qs),
+            'purpose_data_json': build_purpose_chart_data(transactions_qs),
+            'expense_data_json': expense_data_json,
+            'balance_data_json': balance_data_json,
+        }
+        cache.set(key, payload, caching.chart_cache_timeout(year_month))
+    return payload
+
+
 def get_year_date_range(year_str: str | None) -> tuple[datetime, datetime, int]:
     """指定年の開始日・終了日・年を返す。"""
     try:
@@ -188,22 +514,53 @@ def get_year_date_range(year_str: str | None) -> tuple[datetime, datetime, int]:
     return start_date, end_date, year
 
 
-def build_monthly_chart_data(transactions_qs: QuerySet, year: int) -> str:
-    """月別収入・支出グラフデータ（JSON文字列）を返す。"""
-    month_labels = [f'{m}月' for m in range(1, 13)]
-    income_data: list[float] = []
-    expense_data: list[float] = []
-    for m in range(1, 13):
-        monthly_income = float(
-            transactions_qs.filter(date__month=m, transaction_type='income')
-            .aggregate(Sum('amount'))['amount__sum'] or 0
-        )
-        monthly_expense = float(
-            transactions_qs.filter(date__month=m, transaction_type='expense')
-            .aggregate(Sum('amount'))['amount__sum'] or 0
+def aggregate_monthly_totals(transactions_qs: QuerySet) -> dict[date, tuple[Decimal, Decimal]]:
+    """月別の（収入合計, 支出合計）を1回のGROUP BYで集計して返す。
+
+    取引・月次集計（get_ledger_summary）のどちらのクエリセットも受け付ける。
+    キーは各月の1日（現在のタイムゾーン基準）。取引のない月はキーに含まれない。
+    """
+    if transactions_qs.model is MonthlyLedgerSummary:
+        month_expression = F('year_month')
+    else:
+        month_expression = TruncMonth('date', tzinfo=get_current_timezone())
+    rows = (
+        transactions_qs.order_by()
+        .annotate(month=month_expression)
+        .values('month')
+        .annotate(
+            income=Sum('amount', filter=Q(transaction_type='income')),
+            expense=Sum('amount', filter=Q(transaction_type='expense')),
         )
-        income_data.append(monthly_income)
-        expense_data.append(monthly_expense)
+    )
+    return {
+        _as_date(row['month']): (row['income'] or Decimal('0'), row['expense'] or Decimal('0'))
+        for row in rows
+    }
+
+
+def _as_date(value: date | datetime) -> date:
+    """TruncMonth（datetime）と year_month（date）の双方を date に揃える。"""
+    return value.date() if isinstance(value, datetime) else value
+
+
+def build_monthly_chart_data(
+    transactions_qs: QuerySet,
+    year: int,
+    *,
+    monthly_totals: dict[date, tuple[Decimal, Decimal]] | None = None,
+) -> str:
+    """月別収入・支出グラフデータ（JSON文字列）を返す。
+
+    monthly_totals を渡した場合はそれを使い、未指定なら1クエリで集計する。
+    """
+    if monthly_totals is None:
+        monthly_totals = aggregate_monthly_totals(transactions_qs)
+    month_labels = [f'{m}月' for m in range(1, 13)]
+    zero = (Decimal('0'), Decimal('0'))
+    monthly_pairs = [monthly_totals.get(date(year, m, 1), zero) for m in range(1, 13)]
+    income_data: list[float] = [float(income) for income, _ in monthly_pairs]
+    expense_data: list[float] = [float(expense) for _, expense in monthly_pairs]
 
     return json.dumps({
         'labels': month_labels,
@@ -251,25 +608,149 @@ def get_recurring_payments(user: AbstractBaseUser) -> QuerySet:
 # 予算
 # ==========================================================================
 
-def _month_range(year: int, month: int) -> tuple[datetime, datetime]:
-    """指定年月の開始（含む）と翌月開始（含まない）のawareなdatetimeを返す。"""
-    start = make_aware(datetime(year, month, 1))
-    end = make_aware(datetime(year + (month // 12), (month % 12) + 1, 1))
-    return start, end
+def get_month_totals(user: AbstractBaseUser, year: int, month: int) -> tuple[Decimal, Decimal]:
+    """指定月の（収入合計, 支出合計）を月次集計から1クエリで返す。"""
+    totals = MonthlyLedgerSummary.objects.filter(
+        user=user, year_month=date(year, month, 1),
+    ).aggregate(
+        income=Sum('amount', filter=Q(transaction_type='income')),
+        expense=Sum('amount', filter=Q(transaction_type='expense')),
+    )
+    return totals['income'] or Decimal('0'), totals['expense'] or Decimal('0')
 
 
 def get_month_expense_by_category(user: 'AbstractBaseUser', year: int, month: int) -> dict[int, Decimal]:
-    """当月のカテゴリ別支出合計（category_id -> 合計）を返す。"""
-    start, end = _month_range(year, month)
+    """当月のカテゴリ別支出合計（category_id -> 合計）を月次集計から返す。"""
     rows = (
-        Transaction.objects
-        .filter(user=user, transaction_type='expense', date__gte=start, date__lt=end)
+        MonthlyLedgerSummary.objects
+        .filter(user=user, transaction_type='expense', year_month=date(year, month, 1))
         .values('category_id')
         .annotate(total=Sum('amount'))
+        .order_by()
     )
     return {row['category_id']: row['total'] or Decimal('0') for row in rows}
 
 
+def get_monthly_expense_by_category(
+    user: AbstractBaseUser,
+    start_month: date,
+    end_month: date,
+) -> dict[date, dict[int, Decimal]]:
+    """start_month〜end_month（両端を含む月初日）の月別・カテゴリ別支出を1クエリで返す。"""
+    rows = (
+        MonthlyLedgerSummary.objects
+        .filter(
+            user=user, transaction_type='expense',
+            year_month__gte=start_month, year_month__lte=end_month,
+        )
+        .values('year_month', 'category_id')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    spending: dict[date, dict[int, Decimal]] = defaultdict(dict)
+    for row in rows:
+        spending[row['year_month']][row['category_id']] = row['total'] or Decimal('0')
+    return spending
+
+
+def _add_months(month_start: date, months: int) -> date:
+    """month_start の months か月後（負なら前）の月初日。"""
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _budget_timelines(
+    user: AbstractBaseUser,
+    budgets: dict[int | None, Budget],
+) -> dict[int | None, list[BudgetSnapshot]]:
+    """予算キー（カテゴリID、全体は None）ごとのスナップショットを古い月から順に返す。
+
+    スナップショットのない予算は、作成した月から適用されているものとして扱う。
+    """
+    timelines: dict[int | None, list[BudgetSnapshot]] = defaultdict(list)
+    for snapshot in BudgetSnapshot.objects.filter(user=user).order_by('year_month'):
+        timelines[snapshot.category_id].append(snapshot)
+    for category_id, budget in budgets.items():
+        if category_id not in timelines:
+            timelines[category_id].append(BudgetSnapshot(
+                category_id=category_id,
+                year_month=localtime(budget.created_at).date().replace(day=1),
+                amount=budget.amount,
+                rollover=budget.rollover,
+            ))
+    return timelines
+
+
+def _rollover_start(timelines: dict[int | None, list[BudgetSnapshot]], start_month: date) -> date:
+    """繰越額の計算を始める月（繰り越し設定のある最も古いスナップショットの月）。"""
+    months = [
+        snapshot.year_month
+        for snapshots in timelines.values()
+        for snapshot in snapshots
+        if snapshot.rollover
+    ]
+    return min([start_month, *months])
+
+
+def _budget_limits_by_month(
+    timelines: dict[int | None, list[BudgetSnapshot]],
+    spending: dict[date, dict[int, Decimal]],
+    walk_start: date,
+    start_month: date,
+    end_month: date,
+) -> dict[date, dict[int | None, tuple[Decimal, Decimal]]]:
+    """start_month〜end_month の各月・各予算キーの (予算額, 繰越額) を返す。
+
+    ある月の予算額は、その月以前で最も新しいスナップショットの額。繰り越し設定のある月に
+    使い切らなかった分（予算額 + 繰越額 - 支出、マイナスは 0）を翌月に繰り越す。
+    spending には walk_start 以降の支出が含まれていること。
+    """
+    limits: dict[date, dict[int | None, tuple[Decimal, Decimal]]] = defaultdict(dict)
+    zero = Decimal('0')
+    for key, snapshots in timelines.items():
+        index = -1
+        carryover = zero
+        month = walk_start
+        while month <= end_month:
+            while index + 1 < len(snapshots) and snapshots[index + 1].year_month <= month:
+                index += 1
+            snapshot = snapshots[index] if index >= 0 else None
+            amount = snapshot.amount if snapshot is not None else zero
+            if month >= start_month:
+                limits[month][key] = (amount, carryover)
+
+            month_spending = spending.get(month, {})
+            if key is None:
+                used = sum(month_spending.values(), zero)
+            else:
+                used = month_spending.get(key, zero)
+            if snapshot is not None and snapshot.rollover and amount > 0:
+                carryover = max(amount + carryover - used, zero)
+            else:
+                carryover = zero
+            month = _add_months(month, 1)
+    return limits
+
+
+def get_budget_carryovers(
+    user: AbstractBaseUser,
+    year: int,
+    month: int,
+    budgets: dict[int | None, Budget] | None = None,
+) -> dict[int | None, Decimal]:
+    """指定月に前月から繰り越される予算額（予算キー -> 繰越額）を返す。繰り越しがなければ空。"""
+    if budgets is None:
+        budgets = {b.category_id: b for b in Budget.objects.filter(user=user)}
+    month_start = date(year, month, 1)
+    timelines = _budget_timelines(user, budgets)
+    walk_start = _rollover_start(timelines, month_start)
+    if walk_start == month_start:
+        return {}
+    spending = get_monthly_expense_by_category(user, walk_start, _add_months(month_start, -1))
+    limits = _budget_limits_by_month(timelines, spending, walk_start, month_start, month_start)
+    return {key: carryover for key, (_, carryover) in limits[month_start].items() if carryover}
+
+
 def _budget_status(used: Decimal, limit: Decimal) -> str:
     """予算消化状況を 'over' / 'warning' / 'ok' で返す。"""
     if limit <= 0:
@@ -280,39 +761,60 @@ def _budget_status(used: Decimal, limit: Decimal) -> str:
     if percent >= BUDGET_WARNING_PERCENT:
         return 'warning'
     return 'ok'
+
+
+def _budget_row(
+    limit: Decimal, used: Decimal, carryover: Decimal = Decimal('0'),
+) -> dict[str, object]:
+    """予算額と支出から、消化率・残額・状態をまとめた表示用の行を作る。"""
+    percent = float(used / limit * 100) if limit > 0 else 0.0
+    return {
+        'limit': limit,
+        'carryover': carryover,
+        'used': used,
+        'remaining': limit - used,
+        'percent': round(percent, 1),
+        'percent_bar': min(round(percent, 1), 100.0),
+        'status': _budget_status(used, limit),
+    }
 
 
+def get_budget_overview(user: AbstractBaseUser, year: int, month: int) -> dict[str, object]:
+    """build_budget_overview の結果をユーザー・月ごとにキャッシュして返す。
+
+    取引・予算・カテゴリの変更時にシグナル等で無効化される（caching を参照）。
+    """
+    key = caching.budget_overview_key(user.pk, year, month)
+    overview = cache.get(key)
+    if overview is None:
+        overview = build_budget_overview(user, year, month)
+        cache.set(key, overview, caching.BUDGET_OVERVIEW_CACHE_TIMEOUT)
+    return overview
+
+
 def build_budget_overview(user: 'AbstractBaseUser', year: int, month: int) -> dict[str, object]:
     """予算画面・ダッシュボード用の予算消化サマリーを構築する。"""
     budgets = {b.category_id: b for b in Budget.objects.filter(user=user)}
     spending = get_month_expense_by_category(user, year, month)
     categories = list(Category.objects.filter(user=user).order_by('name'))
+    carryovers = get_budget_carryovers(user, year, month, budgets) if budgets else {}
 
-    def make_row(limit: Decimal, used: Decimal) -> dict[str, object]:
-        remaining = limit - used
-        percent = float(used / limit * 100) if limit > 0 else 0.0
-        return {
-            'limit': limit,
-            'used': used,
-            'remaining': remaining,
-            'percent': round(percent, 1),
-            'percent_bar': min(round(percent, 1), 100.0),
-            'status': _budget_status(used, limit),
-        }
-
-    # カテゴリ別
+    # カテゴリ別（予算額は前月からの繰越額を含む）
     category_rows: list[dict[str, object]] = []
     total_budgeted = Decimal('0')
     for category in categories:
         budget = budgets.get(category.id)
         used = spending.get(category.id, Decimal('0'))
-        limit = budget.amount if budget else Decimal('0')
+        carryover = carryovers.get(category.id, Decimal('0')) if budget else Decimal('0')
+        limit = budget.amount + carryover if budget else Decimal('0')
         if budget:
             total_budgeted += limit
         row = {
             'category': category,
             'has_budget': budget is not None,
-            **make_row(limit, used),
+            'amount': budget.amount if budget else Decimal('0'),
+            'rollover': budget.rollover if budget else False,
+            **_budget_row(limit, used, carryover),
         }
         category_rows.append(row)
 
@@ -320,9 +822,20 @@ def build_budget_overview(user: 'AbstractBaseUser', year: int, month: int) -> di
     overall_budget = budgets.get(None)
     total_used = sum(spending.values(), Decimal('0'))
     if overall_budget is not None:
-        overall = {'has_budget': True, **make_row(overall_budget.amount, total_used)}
+        carryover = carryovers.get(None, Decimal('0'))
+        overall = {
+            'has_budget': True,
+            'amount': overall_budget.amount,
+            'rollover': overall_budget.rollover,
+            **_budget_row(overall_budget.amount + carryover, total_used, carryover),
+        }
     else:
-        overall = {'has_budget': False, **make_row(total_budgeted, total_used)}
+        overall = {
+            'has_budget': False,
+            'amount': Decimal('0'),
+            'rollover': False,
+            **_budget_row(total_budgeted, total_used),
+        }
 
     over_count = sum(1 for row in category_rows if row['has_budget'] and row['status'] == 'over')
 
@@ -332,3 +845,51 @@ def build_budget_overview(user: 'AbstractBaseUser', year: int, month: int) -> di
         'over_count': over_count,
         'has_any_budget': bool(budgets),
     }
+
+
+def build_budget_history(
+    user: AbstractBaseUser,
+    end_month: date,
+    months: int = BUDGET_HISTORY_MONTHS,
+) -> dict[str, object]:
+    """予算と実績の月別推移（end_month までの months か月分、古い月から）を構築する。
+
+    支出は期間全体を月 × カテゴリで1回だけ集計し、月ごとに集計し直すことはしない。
+    各月の categories はカテゴリID -> 行の辞書。
+    """
+    start_month = _add_months(end_month, -(months - 1))
+    budgets = {b.category_id: b for b in Budget.objects.filter(user=user)}
+    timelines = _budget_timelines(user, budgets)
+    walk_start = _rollover_start(timelines, start_month)
+    spending = get_monthly_expense_by_category(user, walk_start, end_month)
+    limits = _budget_limits_by_month(timelines, spending, walk_start, start_month, end_month)
+    categories = list(Category.objects.filter(user=user).order_by('name'))
+
+    zero = Decimal('0')
+    history: list[dict[str, object]] = []
+    month = start_month
+    while month <= end_month:
+        month_spending = spending.get(month, {})
+        month_limits = limits.get(month, {})
+        category_rows: dict[int, dict[str, object]] = {}
+        total_budgeted = zero
+        for category in categories:
+            amount, carryover = month_limits.get(category.id, (zero, zero))
+            if amount > 0:
+                total_budgeted += amount + carryover
+            category_rows[category.id] = {
+                'has_budget': amount > 0,
+                **_budget_row(amount + carryover, month_spending.get(category.id, zero), carryover),
+            }
+
+        total_used = sum(month_spending.values(), zero)
+        amount, carryover = month_limits.get(None, (zero, zero))
+        if amount > 0:
+            overall = {'has_budget': True, **_budget_row(amount + carryover, total_used, carryover)}
+        else:
+            overall = {'has_budget': False, **_budget_row(total_budgeted, total_used)}
+
+        history.append({'month': month, 'overall': overall, 'categories': category_rows})
+        month = _add_months(month, 1)
+
+    return {'months': history, 'categories': categories}
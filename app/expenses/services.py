@@ -3,12 +3,30 @@
 """
 from __future__ import annotations
 
-from datetime import date, datetime
+import calendar
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from typing import TYPE_CHECKING
 
-from django.utils.timezone import make_aware
+from django.db import IntegrityError
+from django.db import transaction as db_transaction
+from django.db.models import Case, Count, F, Q, QuerySet, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils.timezone import get_current_timezone, is_naive, localdate, localtime, make_aware
 
-from .models import Category, PaymentMethod, RecurringPayment, Transaction
+from ..bulk_edit import BulkTarget
+from . import caching, selectors
+from .models import (
+    Budget,
+    BudgetSnapshot,
+    Category,
+    MonthlyLedgerSummary,
+    PaymentMethod,
+    RecurringPayment,
+    Transaction,
+)
 
 if TYPE_CHECKING:
     from django.contrib.auth.base_user import AbstractBaseUser
@@ -27,19 +45,352 @@ def is_category_limit_reached(user: AbstractBaseUser) -> bool:
     return Category.objects.filter(user=user).count() >= CATEGORY_LIMIT
 
 
-def execute_recurring_payment(recurring: RecurringPayment, target_date: date) -> Transaction:
-    """定期支払いを実行し、Transaction を作成して返す。last_executed を更新する。"""
-    transaction = Transaction.objects.create(
-        user=recurring.user,
+def _build_recurring_transaction(recurring: RecurringPayment, target_date: date) -> Transaction:
+    """定期支払いから target_date 付けの（未保存の）Transaction を作る。"""
+    transaction = Transaction(
+        user_id=recurring.user_id,
         amount=recurring.amount,
         date=make_aware(datetime.combine(target_date, datetime.min.time())),
         transaction_type=recurring.transaction_type,
-        payment_method=recurring.payment_method,
+        payment_method_id=recurring.payment_method_id,
         purpose=recurring.purpose,
         major_category=recurring.major_category,
-        category=recurring.category,
+        category_id=recurring.category_id,
         purpose_description=recurring.purpose_description or f'定期支払い（{recurring.get_frequency_display()}）',
     )
+    transaction.refresh_search_grams()
+    return transaction
+
+
+def execute_recurring_payment(recurring: RecurringPayment, target_date: date) -> Transaction:
+    """定期支払いを実行し、Transaction を作成して返す。last_executed を更新する。"""
+    transaction = _build_recurring_transaction(recurring, target_date)
+    transaction.save()
     recurring.last_executed = target_date
     recurring.save(update_fields=['last_executed'])
     return transaction
+
+
+def create_transactions(transactions: list[Transaction]) -> list[Transaction]:
+    """未保存の取引を1回の INSERT でまとめて登録する（全件か0件か）。
+
+    bulk_create はシグナルも save() も通らないので、検索用 n-gram と月次集計はここで更新する。
+    """
+    for transaction in transactions:
+        transaction.refresh_search_grams()
+    with db_transaction.atomic():
+        Transaction.objects.bulk_create(transactions)
+        adjust_ledger_summary(added=transactions)
+    return transactions
+
+
+# ==========================================================================
+# 予算の設定
+# ==========================================================================
+
+def _record_budget_snapshot(
+    user: AbstractBaseUser,
+    category: Category | None,
+    amount: Decimal,
+    rollover: bool,
+) -> None:
+    """今月以降に適用する予算額をスナップショットとして記録する（同じ月なら上書き）。"""
+    BudgetSnapshot.objects.update_or_create(
+        user=user,
+        category=category,
+        year_month=localdate().replace(day=1),
+        defaults={'amount': amount, 'rollover': rollover},
+    )
+
+
+def set_budget(
+    user: AbstractBaseUser,
+    category: Category | None,
+    amount: Decimal,
+    *,
+    rollover: bool = False,
+) -> Budget:
+    """予算を設定（更新）し、今月のスナップショットを記録する。category=None は全体予算。"""
+    with db_transaction.atomic():
+        budget, _ = Budget.objects.update_or_create(
+            user=user, category=category, defaults={'amount': amount, 'rollover': rollover},
+        )
+        _record_budget_snapshot(user, category, amount, rollover)
+    return budget
+
+
+def clear_budget(user: AbstractBaseUser, category: Category | None) -> None:
+    """予算を解除する。今月以降は予算なし（amount=0）として記録する。"""
+    with db_transaction.atomic():
+        Budget.objects.filter(user=user, category=category).delete()
+        _record_budget_snapshot(user, category, Decimal('0'), False)
+
+
+# ==========================================================================
+# 定期支払いの一括実行
+# ==========================================================================
+
+def _scheduled_day_filter(target_date: date) -> Q:
+    """days_of_month に target_date の日が含まれる条件（月末調整あり、空なら1日）。
+
+    月末日には、その日以降の日（例: 2月28日なら 28〜31）の指定も一致させる。
+    """
+    last_day = calendar.monthrange(target_date.year, target_date.month)[1]
+    if target_date.day == last_day:
+        condition = Q(days_of_month__overlap=list(range(last_day, 32)))
+    else:
+        condition = Q(days_of_month__contains=[target_date.day])
+    if target_date.day == 1:
+        condition |= Q(days_of_month=[])
+    return condition
+
+
+def get_recurring_payments_due_on(target_date: date) -> QuerySet:
+    """target_date に実行すべき定期支払いを返す。
+
+    RecurringPayment.should_execute_on と同じ判定を、曜日・日・月の条件を
+    配列演算子で組み立てて DB 側で行う（1クエリ）。
+    """
+    weekly = Q(frequency='weekly', days_of_week__contains=[target_date.weekday()])
+    if target_date.weekday() == 0:
+        weekly |= Q(frequency='weekly', days_of_week=[])
+    yearly_month = Q(month_of_year=target_date.month)
+    if target_date.month == 1:
+        yearly_month |= Q(month_of_year__isnull=True)
+    day = _scheduled_day_filter(target_date)
+    due = (
+        Q(frequency='daily')
+        | weekly
+        | (Q(frequency='monthly') & day)
+        | (Q(frequency='yearly') & yearly_month & day)
+    )
+    return (
+        RecurringPayment.objects
+        .filter(is_active=True)
+        .filter(Q(last_executed__isnull=True) | Q(last_executed__lt=target_date))
+        .filter(due)
+    )
+
+
+def execute_recurring_payments(start_date: date, end_date: date | None = None) -> list[Transaction]:
+    """期間内（両端含む）に実行すべき定期支払いをまとめて実行し、作成した取引を返す。
+
+    取引は1回の bulk_create、last_executed は1回の UPDATE で更新する。
+    last_executed 以前の日付は対象外なので、同じ期間で再実行しても二重に作成しない。
+    """
+    end_date = end_date or start_date
+    transactions: list[Transaction] = []
+    last_executed: dict[int, date] = {}
+
+    with db_transaction.atomic():
+        target_date = start_date
+        while target_date <= end_date:
+            # 同時実行された場合は行ロック解放後に last_executed で再判定される
+            for recurring in get_recurring_payments_due_on(target_date).select_for_update():
+                transactions.append(_build_recurring_transaction(recurring, target_date))
+                last_executed[recurring.id] = target_date
+            target_date += timedelta(days=1)
+        _save_recurring_transactions(transactions, last_executed)
+    return transactions
+
+
+def backfill_recurring_payments(since: date, until: date) -> list[Transaction]:
+    """since から until まで（両端含む）の未実行分を、定期支払いごとにまとめて実行する。
+
+    手動の復旧用。各定期支払いは前回実行日の翌日（未実行なら登録日）より前には遡らない。
+    実行日は occurrences_between で月単位に求めるので、期間が長くても日ごとの判定は行わない。
+    """
+    transactions: list[Transaction] = []
+    last_executed: dict[int, date] = {}
+
+    with db_transaction.atomic():
+        recurring_payments = (
+            RecurringPayment.objects
+            .filter(is_active=True)
+            .filter(Q(last_executed__isnull=True) | Q(last_executed__lt=until))
+            .select_for_update()
+        )
+        for recurring in recurring_payments:
+            if recurring.last_executed:
+                start_date = recurring.last_executed + timedelta(days=1)
+            else:
+                start_date = localtime(recurring.created_at).date()
+            for occurrence in recurring.occurrences_between(max(start_date, since), until):
+                transactions.append(_build_recurring_transaction(recurring, occurrence))
+                last_executed[recurring.id] = occurrence
+        _save_recurring_transactions(transactions, last_executed)
+    return transactions
+
+
+def _save_recurring_transactions(
+    transactions: list[Transaction], last_executed: dict[int, date],
+) -> None:
+    """定期支払いの取引を1回の INSERT で作成し、last_executed を1回の UPDATE で更新する。"""
+    if not transactions:
+        return
+    Transaction.objects.bulk_create(transactions)
+    adjust_ledger_summary(added=transactions)
+    RecurringPayment.objects.filter(id__in=list(last_executed)).update(
+        last_executed=Case(
+            *(
+                When(id=recurring_id, then=Value(executed))
+                for recurring_id, executed in last_executed.items()
+            ),
+        ),
+    )
+
+
+# ==========================================================================
+# 月次集計（MonthlyLedgerSummary）の維持
+# ==========================================================================
+
+LEDGER_REBUILD_BATCH_SIZE = 1000
+
+# 集計キー: (user_id, year_month, category_id, payment_method_id, transaction_type, major_category)
+LedgerKey = tuple[int, date, int, int, str, str]
+
+
+def ledger_month(value: datetime) -> date:
+    """取引日時から集計月（ローカル日付の月初日）を返す。"""
+    if is_naive(value):
+        value = make_aware(value)
+    return localtime(value).date().replace(day=1)
+
+
+def ledger_key(transaction: Transaction) -> LedgerKey:
+    """取引の月次集計キーを返す。"""
+    return (
+        transaction.user_id,
+        ledger_month(transaction.date),
+        transaction.category_id,
+        transaction.payment_method_id,
+        transaction.transaction_type,
+        transaction.major_category,
+    )
+
+
+def _apply_ledger_delta(key: LedgerKey, amount: Decimal, count: int) -> None:
+    """1つの集計キーに金額・件数の差分を加算する（行がなければ作成、0件になれば削除）。"""
+    user_id, year_month, category_id, payment_method_id, transaction_type, major_category = key
+    lookup = {
+        'user_id': user_id,
+        'year_month': year_month,
+        'category_id': category_id,
+        'payment_method_id': payment_method_id,
+        'transaction_type': transaction_type,
+        'major_category': major_category,
+    }
+    rows = MonthlyLedgerSummary.objects.filter(**lookup)
+    updated = rows.update(
+        amount=F('amount') + amount, transaction_count=F('transaction_count') + count,
+    )
+    if not updated:
+        if count <= 0:
+            return
+        try:
+            with db_transaction.atomic():
+                MonthlyLedgerSummary.objects.create(
+                    **lookup, amount=amount, transaction_count=count,
+                )
+        except IntegrityError:
+            # 同時に同じキーの行が作られた場合は加算し直す
+            rows.update(
+                amount=F('amount') + amount, transaction_count=F('transaction_count') + count,
+            )
+    elif count < 0:
+        rows.filter(transaction_count__lte=0).delete()
+
+
+def adjust_ledger_summary(
+    added: Iterable[Transaction] = (),
+    removed: Iterable[Transaction] = (),
+) -> None:
+    """追加・削除された取引の分だけ月次集計を差分更新する。
+
+    bulk_create など、シグナルが発火しない一括処理の後に呼び出す。
+    同じ集計キーの取引はまとめて1回の UPDATE にする。
+    """
+    deltas: dict[LedgerKey, list] = defaultdict(lambda: [Decimal('0'), 0])
+    for transaction in added:
+        delta = deltas[ledger_key(transaction)]
+        delta[0] += transaction.amount
+        delta[1] += 1
+    for transaction in removed:
+        delta = deltas[ledger_key(transaction)]
+        delta[0] -= transaction.amount
+        delta[1] -= 1
+    if not deltas:
+        return
+    with db_transaction.atomic():
+        for key, (amount, count) in deltas.items():
+            if amount or count:
+                _apply_ledger_delta(key, amount, count)
+    # 取引の変更はすべてここを通るので、影響する月の予算サマリー・グラフデータもここで無効化する
+    months = {(key[0], key[1]) for key in deltas}
+    caching.invalidate_budget_overview_months(months)
+    caching.record_transaction_changes(months)
+
+
+def rebuild_monthly_ledger_summary(user: AbstractBaseUser | None = None) -> int:
+    """取引から月次集計を再構築し、作成した集計行数を返す。user 未指定なら全ユーザー。"""
+    transactions = Transaction.objects.all()
+    summaries = MonthlyLedgerSummary.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+        summaries = summaries.filter(user=user)
+
+    rows = (
+        transactions.order_by()
+        .annotate(month=TruncMonth('date', tzinfo=get_current_timezone()))
+        .values(
+            'user_id', 'month', 'category_id', 'payment_method_id',
+            'transaction_type', 'major_category',
+        )
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    with db_transaction.atomic():
+        summaries.delete()
+        created = MonthlyLedgerSummary.objects.bulk_create(
+            [
+                MonthlyLedgerSummary(
+                    user_id=row['user_id'],
+                    year_month=row['month'].date(),
+                    category_id=row['category_id'],
+                    payment_method_id=row['payment_method_id'],
+                    transaction_type=row['transaction_type'],
+                    major_category=row['major_category'],
+                    amount=row['total'],
+                    transaction_count=row['count'],
+                )
+                for row in rows
+            ],
+            batch_size=LEDGER_REBUILD_BATCH_SIZE,
+        )
+    return len(created)
+
+
+# ==========================================================================
+# 一括編集・一括削除（選択モード）
+# ==========================================================================
+
+def _sync_bulk_ledger(before: list[Transaction], after: list[Transaction]) -> None:
+    """一括編集・一括削除はシグナルを通らないので、変更前後の差分で月次集計を更新する。"""
+    adjust_ledger_summary(added=after, removed=before)
+
+
+TRANSACTION_BULK_TARGET = BulkTarget(
+    Transaction,
+    choice_fields={
+        'major_category': tuple(value for value, _ in Transaction.MAJOR_CATEGORY_TYPE_CHOICES),
+    },
+    owned_fields={
+        'category': selectors.get_categories,
+        'payment_method': selectors.get_payment_methods,
+    },
+    date_fields=('date',),
+    sync=_sync_bulk_ledger,
+    sync_fields=(
+        'user_id', 'date', 'category_id', 'payment_method_id',
+        'transaction_type', 'major_category', 'amount',
+    ),
+)
@@ -0,0 +1,81 @@
+"""家計簿シグナル：Transaction の変更を月次集計（MonthlyLedgerSummary）へ反映する。
+
+予算サマリー・グラフデータのキャッシュは、取引の変更では adjust_ledger_summary の中で、
+予算・カテゴリ・支払方法の変更ではここで無効化する。
+
+QuerySet.delete()（一括削除・カテゴリ削除のカスケード含む）も post_delete が
+1件ずつ発火するため、ここで差分更新される。bulk_create / QuerySet.update() は
+シグナルが発火しないので、呼び出し側で services.adjust_ledger_summary を使うこと。
+"""
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, services
+from .models import Budget, Category, PaymentMethod, Transaction
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_ledger_state(
+    sender: type[Transaction], instance: Transaction, **kwargs: object,
+) -> None:
+    """更新前の取引内容を保持し、post_save で旧集計キーから差し引けるようにする。"""
+    instance._ledger_previous = None
+    if instance.pk is None or kwargs.get('raw'):
+        return
+    instance._ledger_previous = Transaction.objects.filter(pk=instance.pk).only(
+        'user_id', 'date', 'category_id', 'payment_method_id',
+        'transaction_type', 'major_category', 'amount',
+    ).first()
+
+
+@receiver(post_save, sender=Transaction)
+def update_ledger_on_save(
+    sender: type[Transaction], instance: Transaction, created: bool, **kwargs: object,
+) -> None:
+    """取引の作成・更新を月次集計へ反映する。"""
+    if kwargs.get('raw'):
+        return
+    previous = getattr(instance, '_ledger_previous', None)
+    instance._ledger_previous = None
+    removed = [previous] if previous is not None else []
+    services.adjust_ledger_summary(added=[instance], removed=removed)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_ledger_on_delete(
+    sender: type[Transaction], instance: Transaction, **kwargs: object,
+) -> None:
+    """取引の削除を月次集計へ反映する。"""
+    services.adjust_ledger_summary(removed=[instance])
+
+
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=PaymentMethod)
+@receiver(post_delete, sender=PaymentMethod)
+def invalidate_budget_overview(
+    sender: type[Budget | Category | PaymentMethod],
+    instance: Budget | Category | PaymentMethod,
+    **kwargs: object,
+) -> None:
+    """予算・カテゴリ・支払方法の変更で、そのユーザーの予算サマリーのキャッシュを無効化する。"""
+    if kwargs.get('raw'):
+        return
+    caching.invalidate_budget_overview(instance.user_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=PaymentMethod)
+@receiver(post_delete, sender=PaymentMethod)
+def record_category_change(
+    sender: type[Category | PaymentMethod], instance: Category | PaymentMethod, **kwargs: object,
+) -> None:
+    """カテゴリ・支払方法の名前（カテゴリは色も）はグラフデータに含まれるため、全月分のデータバージョンを上げる。"""
+    if kwargs.get('raw'):
+        return
+    caching.record_category_change(instance.user_id)
@@ -1,16 +1,31 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 
+import io
+import json
+from datetime import date, datetime, timedelta
 from decimal import Decimal, InvalidOperation
+from typing import TYPE_CHECKING
 
 from django.contrib import messages
 from django.utils import timezone
 
-from .forms import CategoryForm, PaymentMethodForm, RecurringPaymentForm, TransactionForm
-from .models import Budget, Category, PaymentMethod, RecurringPayment, Transaction
-from . import selectors, services
+from ..pagination import CountedPaginator
+from .forms import (
+    CategoryForm, PaymentMethodForm, RecurringPaymentForm, TransactionBatchRowForm, TransactionForm,
+    TransactionImportForm,
+)
+from .models import Category, PaymentMethod, RecurringPayment, Transaction
+from . import (
+    analytics, caching, exporters, forecasting, importers, projections, selectors, services,
+)
+
+if TYPE_CHECKING:
+    from django.db.models import QuerySet
 
 
 def _parse_budget_amount(raw: str) -> Decimal | None:
@@ -30,14 +45,14 @@ def budget_view(request: HttpRequest) -> HttpResponse:
     if request.method == 'POST':
         action = request.POST.get('action')
 
+        rollover = request.POST.get('rollover') == 'on'
+
         if action == 'set_overall':
             amount = _parse_budget_amount(request.POST.get('amount', ''))
             if amount is None:
                 messages.error(request, '予算額は1以上の数値で入力してください。')
             else:
-                Budget.objects.update_or_create(
-                    user=request.user, category=None, defaults={'amount': amount},
-                )
+                services.set_budget(request.user, None, amount, rollover=rollover)
                 messages.success(request, '全体予算を設定しました。')
             return redirect('budget')
 
@@ -47,25 +62,24 @@ def budget_view(request: HttpRequest) -> HttpResponse:
             if amount is None:
                 messages.error(request, '予算額は1以上の数値で入力してください。')
             else:
-                Budget.objects.update_or_create(
-                    user=request.user, category=category, defaults={'amount': amount},
-                )
+                services.set_budget(request.user, category, amount, rollover=rollover)
                 messages.success(request, f'「{category.name}」の予算を設定しました。')
             return redirect('budget')
 
         if action == 'delete_overall':
-            Budget.objects.filter(user=request.user, category=None).delete()
+            services.clear_budget(request.user, None)
             messages.success(request, '全体予算を解除しました。')
             return redirect('budget')
 
         if action == 'delete_category':
             category = get_object_or_404(Category, id=request.POST.get('category_id'), user=request.user)
-            Budget.objects.filter(user=request.user, category=category).delete()
+            services.clear_budget(request.user, category)
             messages.success(request, f'「{category.name}」の予算を解除しました。')
             return redirect('budget')
 
     today = timezone.localdate()
-    overview = selectors.build_budget_overview(request.user, today.year, today.month)
+    overview = selectors.get_budget_overview(request.user, today.year, today.month)
+    overview = forecasting.attach_budget_forecast(overview, request.user, today)
     context = {
         'target_month': today.strftime('%Y年%m月'),
         **overview,
@@ -73,6 +87,84 @@ def budget_view(request: HttpRequest) -> HttpResponse:
     return render(request, 'app/expenses/budget.html', context)
 
 
+@login_required
+def budget_history_view(request: HttpRequest) -> HttpResponse:
+    """予算履歴画面。全体またはカテゴリの予算と実績を月ごとに並べて比較する。"""
+    try:
+        months = int(request.GET.get('months', selectors.BUDGET_HISTORY_MONTHS))
+    except ValueError:
+        months = selectors.BUDGET_HISTORY_MONTHS
+    if months not in selectors.BUDGET_HISTORY_MONTH_CHOICES:
+        months = selectors.BUDGET_HISTORY_MONTHS
+
+    today = timezone.localdate()
+    history = selectors.build_budget_history(request.user, today.replace(day=1), months)
+
+    selected_category = None
+    category_id = request.GET.get('category', '')
+    if category_id:
+        selected_category = next(
+            (c for c in history['categories'] if str(c.id) == category_id), None,
+        )
+
+    # 新しい月を上にして表示する
+    rows = [
+        {
+            'month': month['month'],
+            **(
+                month['categories'][selected_category.id]
+                if selected_category else month['overall']
+            ),
+        }
+        for month in reversed(history['months'])
+    ]
+    context = {
+        'rows': rows,
+        'categories': history['categories'],
+        'selected_category': selected_category,
+        'months': months,
+        'month_choices': selectors.BUDGET_HISTORY_MONTH_CHOICES,
+    }
+    return render(request, 'app/expenses/budget_history.html', context)
+
+
+def _get_transactions_page(
+    request: HttpRequest,
+    transactions_qs: 'QuerySet',
+    paginator: CountedPaginator,
+    sort_by: str,
+) -> Page:
+    """取引一覧の表示ページを返す。
+
+    「前へ」「次へ」リンクの cursor があればキーセットで行を取得し（OFFSET なし）、
+    ページ番号は表示用にそのまま使う。cursor がない・不正な場合は通常のページ番号指定。
+    """
+    cursor = request.GET.get('cursor', '')
+    if cursor:
+        try:
+            number = paginator.validate_number(request.GET.get('page'))
+        except (PageNotAnInteger, EmptyPage):
+            number = None
+        if number is not None:
+            rows = selectors.get_transactions_by_cursor(
+                transactions_qs, sort_by, cursor, paginator.per_page,
+            )
+            if rows:
+                return Page(rows, number, paginator)
+    return paginator.get_page(request.GET.get('page'))
+
+
+def _get_filter_kwargs(request: HttpRequest) -> dict[str, str]:
+    """一覧・エクスポート共通の絞り込み条件（get_transactions の引数）を返す。"""
+    return {
+        'search': request.GET.get('search', ''),
+        'transaction_type': request.GET.get('transaction_type', ''),
+        'major_category': request.GET.get('major_category', ''),
+        'category_id': request.GET.get('category', ''),
+        'payment_method_id': request.GET.get('payment_method', ''),
+    }
+
+
 @login_required
 def expenses_list(request: HttpRequest) -> HttpResponse:
     from datetime import datetime as dt
@@ -84,28 +176,28 @@ def expenses_list(request: HttpRequest) -> HttpResponse:
     per_page = int(per_page_raw) if per_page_raw in per_page_options else 20
     sort_by = request.GET.get('sort_by', 'date_desc')
 
-    filter_transaction_type = request.GET.get('transaction_type', '')
-    filter_major_category = request.GET.get('major_category', '')
-    filter_category = request.GET.get('category', '')
-    filter_payment_method = request.GET.get('payment_method', '')
-
-    common_filter_kwargs = {
-        'search': search_query,
-        'transaction_type': filter_transaction_type,
-        'major_category': filter_major_category,
-        'category_id': filter_category,
-        'payment_method_id': filter_payment_method,
-        'sort_by': sort_by,
-    }
+    aggregate_filter_kwargs = _get_filter_kwargs(request)
+    filter_transaction_type = aggregate_filter_kwargs['transaction_type']
+    filter_major_category = aggregate_filter_kwargs['major_category']
+    filter_category = aggregate_filter_kwargs['category_id']
+    filter_payment_method = aggregate_filter_kwargs['payment_method_id']
+    common_filter_kwargs = {**aggregate_filter_kwargs, 'sort_by': sort_by}
 
     if view_mode == 'year':
         start_date, end_date, current_year = selectors.get_year_date_range(target_date_str)
         transactions_qs = selectors.get_transactions(request.user, start_date, end_date, **common_filter_kwargs)
-        transactions_count = transactions_qs.count()
-        paginator = Paginator(transactions_qs, per_page)
-        transactions_page = paginator.get_page(request.GET.get('page'))
-        summary = selectors.get_summary(transactions_qs)
-        monthly_chart_data_json = selectors.build_monthly_chart_data(transactions_qs, current_year)
+        aggregate_qs = selectors.get_aggregate_queryset(
+            request.user, start_date, end_date, transactions_qs, **aggregate_filter_kwargs,
+        )
+        # 件数と年合計は1回の集計で求め、Paginator には件数を渡して COUNT を省く
+        stats = selectors.get_ledger_stats(aggregate_qs)
+        transactions_count = stats['count']
+        paginator = CountedPaginator(transactions_qs, per_page, count=transactions_count)
+        transactions_page = _get_transactions_page(request, transactions_qs, paginator, sort_by)
+        previous_cursor, next_cursor = selectors.build_transaction_cursors(
+            list(transactions_page.object_list), sort_by,
+        )
+        summary = selectors.get_summary(aggregate_qs, stats=stats)
         current_month_str = dt.now().strftime('%Y-%m')
         year_range = list(range(current_year - 5, current_year + 3))
 
@@ -113,8 +205,10 @@ def expenses_list(request: HttpRequest) -> HttpResponse:
             'view_mode': 'year',
             'current_year': current_year,
             'year_range': year_range,
-            'monthly_chart_data_json': monthly_chart_data_json,
+            'chart_query': _get_chart_query(request),
             'transactions_page': transactions_page,
+            'previous_cursor': previous_cursor,
+            'next_cursor': next_cursor,
             'transactions_count': transactions_count,
             'total_income': summary['total_income'],
             'total_expense': summary['total_expense'],
@@ -139,25 +233,28 @@ def expenses_list(request: HttpRequest) -> HttpResponse:
         })
 
     # 月表示モード
-    start_date, end_date, date_range = selectors.get_date_range(target_date_str)
+    start_date, end_date, _ = selectors.get_date_range(target_date_str)
     transactions_qs = selectors.get_transactions(request.user, start_date, end_date, **common_filter_kwargs)
-    transactions_count = transactions_qs.count()
-    paginator = Paginator(transactions_qs, per_page)
-    transactions_page = paginator.get_page(request.GET.get('page'))
-    summary = selectors.get_summary(transactions_qs)
-
-    category_data_json = selectors.build_category_chart_data(transactions_qs)
-    major_category_data_json = selectors.build_major_category_chart_data(transactions_qs)
-    expense_data_json, balance_data_json = selectors.build_daily_chart_data(transactions_qs, date_range)
+    # 件数・合計は月次集計から集計する（グラフは expense_chart_data から非同期に取得）
+    aggregate_qs = selectors.get_aggregate_queryset(
+        request.user, start_date, end_date, transactions_qs, **aggregate_filter_kwargs,
+    )
+    stats = selectors.get_ledger_stats(aggregate_qs)
+    transactions_count = stats['count']
+    paginator = CountedPaginator(transactions_qs, per_page, count=transactions_count)
+    transactions_page = _get_transactions_page(request, transactions_qs, paginator, sort_by)
+    previous_cursor, next_cursor = selectors.build_transaction_cursors(
+        list(transactions_page.object_list), sort_by,
+    )
+    summary = selectors.get_summary(aggregate_qs, stats=stats)
 
     return render(request, 'app/expenses/list.html', {
         'view_mode': 'month',
         'transactions_page': transactions_page,
+        'previous_cursor': previous_cursor,
+        'next_cursor': next_cursor,
         'transactions_count': transactions_count,
-        'category_data_json': category_data_json,
-        'major_category_data_json': major_category_data_json,
-        'expense_data_json': expense_data_json,
-        'balance_data_json': balance_data_json,
+        'chart_query': _get_chart_query(request),
         'total_income': summary['total_income'],
         'total_expense': summary['total_expense'],
         'net_balance': summary['net_balance'],
@@ -181,6 +278,158 @@ def expenses_list(request: HttpRequest) -> HttpResponse:
     })
 
 
+# グラフデータ API の種類（URL の chart）
+CHART_TYPES = ('category', 'major_category', 'payment_method', 'purpose', 'daily', 'monthly')
+# グラフの対象に影響しない一覧画面のパラメーター（表の表示だけに使う）
+_TABLE_ONLY_PARAMS = ('page', 'cursor', 'per_page', 'sort_by')
+
+
+def _get_chart_query(request: HttpRequest) -> str:
+    """グラフデータ API に渡すクエリ文字列（表のページ・並び順を除いた一覧の条件）。"""
+    query = request.GET.copy()
+    for name in _TABLE_ONLY_PARAMS:
+        query.pop(name, None)
+    return query.urlencode()
+
+
+def _chart_version(request: HttpRequest, chart: str) -> int | None:
+    """グラフデータのバージョン。年表示はユーザー全体、月表示はその月のデータバージョン。"""
+    if not request.user.is_authenticated or chart not in CHART_TYPES:
+        return None
+    if chart == 'monthly':
+        return caching.data_version(request.user.pk)
+    start_date, _, _ = selectors.get_date_range(request.GET.get('target_date'))
+    year_month = timezone.localtime(start_date).date().replace(day=1)
+    return caching.month_data_version(request.user.pk, year_month)
+
+
+def _chart_etag(request: HttpRequest, chart: str) -> str | None:
+    version = _chart_version(request, chart)
+    if version is None:
+        return None
+    params = {
+        **_get_filter_kwargs(request),
+        'target_date': request.GET.get('target_date', ''),
+    }
+    return f'{chart}-{caching.filter_hash(params)}-{version}'
+
+
+def _chart_last_modified(request: HttpRequest, chart: str) -> datetime | None:
+    version = _chart_version(request, chart)
+    return caching.data_version_modified(version) if version is not None else None
+
+
+@login_required
+@condition(etag_func=_chart_etag, last_modified_func=_chart_last_modified)
+def expense_chart_data(request: HttpRequest, chart: str) -> HttpResponse:
+    """一覧画面のグラフデータ（JSON）。画面から非同期に取得する。
+
+    ETag / Last-Modified はデータバージョンから作るため、取引が変わっていなければ
+    304 を返す。月表示のグラフは get_month_chart_payload のキャッシュを使う。
+    """
+    if chart not in CHART_TYPES:
+        raise Http404
+    filter_kwargs = _get_filter_kwargs(request)
+    target_date_str = request.GET.get('target_date')
+
+    if chart == 'monthly':
+        start_date, end_date, year = selectors.get_year_date_range(target_date_str)
+        transactions_qs = selectors.get_transactions(
+            request.user, start_date, end_date, **filter_kwargs,
+        )
+        aggregate_qs = selectors.get_aggregate_queryset(
+            request.user, start_date, end_date, transactions_qs, **filter_kwargs,
+        )
+        body = selectors.build_monthly_chart_data(aggregate_qs, year)
+    else:
+        start_date, end_date, date_range = selectors.get_date_range(target_date_str)
+        transactions_qs = selectors.get_transactions(
+            request.user, start_date, end_date, **filter_kwargs,
+        )
+        aggregate_qs = selectors.get_aggregate_queryset(
+            request.user, start_date, end_date, transactions_qs, **filter_kwargs,
+        )
+        payload = selectors.get_month_chart_payload(
+            request.user, timezone.localtime(start_date).date().replace(day=1), filter_kwargs,
+            aggregate_qs, transactions_qs, date_range,
+        )
+        if chart == 'daily':
+            body = (
+                f'{{"expense": {payload["expense_data_json"]}, '
+                f'"balance": {payload["balance_data_json"]}}}'
+            )
+        else:
+            body = payload[f'{chart}_data_json']
+
+    response = HttpResponse(body, content_type='application/json')
+    # ブラウザには保存させつつ、毎回 ETag で再検証させる
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _analytics_month(request: HttpRequest) -> date:
+    start_date, _, _ = selectors.get_date_range(request.GET.get('target_date'))
+    return timezone.localtime(start_date).date().replace(day=1)
+
+
+def _analytics_etag(request: HttpRequest) -> str | None:
+    if not request.user.is_authenticated:
+        return None
+    year_month = _analytics_month(request)
+    return f'analytics-{year_month:%Y-%m}-{analytics.analytics_version(request.user, year_month)}'
+
+
+@login_required
+@condition(etag_func=_analytics_etag)
+def expense_analytics(request: HttpRequest) -> JsonResponse:
+    """前月比・前年同月比（カテゴリ・支払方法・費用タイプ別）の JSON。
+
+    target_date（YYYY-MM）の月を、前月・前年同月と比較する。未指定なら今月。
+    """
+    comparison = analytics.get_period_comparison(request.user, _analytics_month(request))
+    response = JsonResponse(comparison)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@login_required
+def export_expenses(request: HttpRequest) -> StreamingHttpResponse:
+    """一覧と同じ絞り込み条件で取引を CSV / NDJSON としてストリーミング出力する。
+
+    view_mode が month / year ならその期間、それ以外は全期間を対象にする。
+    """
+    view_mode = request.GET.get('view_mode', 'all')
+    target_date_str = request.GET.get('target_date')
+    if view_mode == 'year':
+        start_date, end_date, year = selectors.get_year_date_range(target_date_str)
+        period_label = str(year)
+    elif view_mode == 'month':
+        start_date, end_date, _ = selectors.get_date_range(target_date_str)
+        period_label = start_date.strftime('%Y-%m')
+    else:
+        start_date = end_date = None
+        period_label = 'all'
+
+    transactions_qs = selectors.get_transactions(
+        request.user, start_date, end_date,
+        **_get_filter_kwargs(request), sort_by=request.GET.get('sort_by', 'date_asc'),
+    )
+    if request.GET.get('format') == 'ndjson':
+        response = StreamingHttpResponse(
+            exporters.stream_ndjson(transactions_qs),
+            content_type='application/x-ndjson; charset=utf-8',
+        )
+        extension = 'ndjson'
+    else:
+        response = StreamingHttpResponse(
+            exporters.stream_csv(transactions_qs), content_type='text/csv; charset=utf-8',
+        )
+        extension = 'csv'
+    filename = f'transactions_{period_label}.{extension}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def create_expenses(request: HttpRequest) -> HttpResponse:
     if request.method == 'POST':
@@ -201,6 +450,56 @@ def create_expenses(request: HttpRequest) -> HttpResponse:
     return render(request, 'app/expenses/create_modal.html', {'form': form})
 
 
+# 一括登録で一度に受け付ける行数
+BATCH_CREATE_MAX_ROWS = 100
+
+
+@login_required
+def batch_create_expenses(request: HttpRequest) -> JsonResponse:
+    """取引の一括登録（レシートの複数行の入力など）。
+
+    POST の JSON ボディ {"rows": [{...}, ...]} の各行を TransactionBatchRowForm で検証し、
+    全行が正しければ1回の bulk_create で登録する。1行でも誤りがあれば何も登録せず、
+    行番号（0始まり）ごとのエラーを返す。カテゴリ・支払方法は最初に1回だけ読み込む。
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'method_not_allowed'}, status=405)
+
+    try:
+        payload = json.loads(request.body or '{}')
+    except (json.JSONDecodeError, ValueError):
+        return JsonResponse({'success': False, 'error': 'invalid_json'}, status=400)
+
+    rows = payload.get('rows') if isinstance(payload, dict) else None
+    if not isinstance(rows, list) or not rows:
+        return JsonResponse({'success': False, 'error': 'invalid_rows'}, status=400)
+    if len(rows) > BATCH_CREATE_MAX_ROWS:
+        return JsonResponse({'success': False, 'error': 'too_many_rows'}, status=400)
+
+    categories = {category.pk: category for category in selectors.get_categories(request.user)}
+    payment_methods = {method.pk: method for method in selectors.get_payment_methods(request.user)}
+    transactions = []
+    errors = []
+    for index, row in enumerate(rows):
+        form = TransactionBatchRowForm(
+            row if isinstance(row, dict) else {},
+            categories=categories, payment_methods=payment_methods,
+        )
+        if form.is_valid():
+            transactions.append(form.build_transaction(request.user))
+        else:
+            errors.append({'row': index, 'errors': form.errors})
+    if errors:
+        return JsonResponse({'success': False, 'errors': errors}, status=400)
+
+    services.create_transactions(transactions)
+    return JsonResponse({
+        'success': True,
+        'created': len(transactions),
+        'ids': [transaction.pk for transaction in transactions],
+    })
+
+
 @login_required
 def expenses_settings(request: HttpRequest) -> HttpResponse:
     payments = selectors.get_payment_methods(request.user)
@@ -306,16 +605,82 @@ def delete_expenses(request: HttpRequest, transaction_id: int) -> HttpResponse:
 def bulk_delete_expenses(request: HttpRequest) -> JsonResponse:
     """取引の一括削除（選択モード用）"""
     from ..bulk_delete import bulk_delete_response
-    return bulk_delete_response(request, Transaction)
+    return bulk_delete_response(request, services.TRANSACTION_BULK_TARGET)
+
+
+@login_required
+def bulk_edit_expenses(request: HttpRequest) -> JsonResponse:
+    """取引の一括編集（カテゴリ・支払方法・費用タイプの変更、日付の移動）"""
+    from ..bulk_edit import bulk_edit_response
+    return bulk_edit_response(request, services.TRANSACTION_BULK_TARGET)
+
+
+@login_required
+def import_expenses(request: HttpRequest) -> HttpResponse:
+    """CSV / OFX ファイルから取引を一括インポートする。"""
+    if request.method == 'POST':
+        form = TransactionImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            file_format = form.cleaned_data['file_format']
+            if file_format == 'auto':
+                file_format = importers.detect_format(upload.name)
+            stream = io.TextIOWrapper(
+                upload.file, encoding=form.cleaned_data['encoding'], newline='',
+            )
+            try:
+                result = importers.import_transactions(
+                    request.user, importers.parse_file(stream, file_format),
+                )
+            except UnicodeDecodeError:
+                messages.error(
+                    request, 'ファイルを読み込めませんでした。文字コードを確認してください。',
+                )
+                return redirect('import_expenses')
+            messages.success(
+                request,
+                f'{result.created}件を登録しました。'
+                f'（重複 {result.duplicates}件、エラー {result.error_count}件）',
+            )
+            for error in result.errors:
+                messages.warning(request, error)
+            return redirect('expense_list')
+    else:
+        form = TransactionImportForm()
+
+    return render(request, 'app/expenses/import.html', {'form': form})
 
 
 @login_required
 def recurring_payment_list(request: HttpRequest) -> HttpResponse:
     return render(request, 'app/expenses/recurring_list.html', {
         'recurring_payments': selectors.get_recurring_payments(request.user),
+        'projection': projections.project_recurring_payments(request.user, timezone.localdate()),
     })
 
 
+def _projection_months(request: HttpRequest) -> int:
+    try:
+        months = int(request.GET.get('months', projections.PROJECTION_DEFAULT_MONTHS))
+    except (TypeError, ValueError):
+        months = projections.PROJECTION_DEFAULT_MONTHS
+    return min(max(months, 1), projections.PROJECTION_MAX_MONTHS)
+
+
+@login_required
+def recurring_payment_projection(request: HttpRequest) -> JsonResponse:
+    """定期支払いの今後の見込み（日別・月別の合計）の JSON。
+
+    target_date（YYYY-MM）の月から months か月分。今日までの分は含めない。
+    """
+    start_date, _, _ = selectors.get_date_range(request.GET.get('target_date'))
+    response = JsonResponse(projections.project_recurring_payments(
+        request.user, timezone.localtime(start_date).date(), _projection_months(request),
+    ))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 @login_required
 def create_recurring_payment(request: HttpRequest) -> HttpResponse:
     if request.method == 'POST':
@@ -365,5 +730,12 @@ def toggle_recurring_payment(request: HttpRequest, recurring_id: int) -> HttpRes
     recurring = get_object_or_404(RecurringPayment, id=recurring_id, user=request.user)
     if request.method == 'POST':
         recurring.is_active = not recurring.is_active
-        recurring.save(update_fields=['is_active'])
+        update_fields = ['is_active']
+        if recurring.is_active:
+            # 停止していた期間の分は実行しない（再開日の分から実行する）
+            resumed_from = timezone.localdate() - timedelta(days=1)
+            if recurring.last_executed is None or recurring.last_executed < resumed_from:
+                recurring.last_executed = resumed_from
+                update_fields.append('last_executed')
+        recurring.save(update_fields=update_fields)
     return redirect('recurring_payment_list')
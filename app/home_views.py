@@ -1,18 +1,16 @@
 """統合ダッシュボード（ログイン後のホーム画面）"""
 from __future__ import annotations
 
-from datetime import datetime, time, timedelta
-from decimal import Decimal
+from datetime import datetime, time
 from typing import Any
 
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 from django.utils import timezone
 from django.utils.timezone import make_aware
 
-from .expenses.models import Transaction
+from .expenses import selectors as expense_selectors
 from .habit import selectors as habit_selectors
 from .memo.models import Memo
 from .shopping.models import ShoppingItem
@@ -29,14 +27,15 @@ def build_dashboard_context(user: Any) -> dict[str, Any]:
     day_start = make_aware(datetime.combine(today, time.min))
     day_end = make_aware(datetime.combine(today, time.max))
 
-    # 今日のタスク（外部カレンダーのイベントもマージ）
+    # 今日のタスク（繰り返しの仮想の回・外部カレンダーのイベントもマージ）
     today_tasks_qs = (
         task_selectors.get_day_view_tasks(user, day_start, day_end)
         .order_by('-all_day', 'start_date')
     )
     today_externals = task_selectors.get_external_events(user, day_start, day_end)
     today_items = task_selectors.merge_tasks_and_external_events(
-        list(today_tasks_qs), today_externals,
+        task_selectors.include_occurrences(today_tasks_qs, user, day_start, day_end),
+        today_externals,
     )
     today_tasks_count = len(today_items)
     today_tasks = today_items[:DASHBOARD_TASK_LIMIT]
@@ -45,24 +44,11 @@ def build_dashboard_context(user: Any) -> dict[str, Any]:
     habit_status = habit_selectors.get_today_status(user, today)
     habits_completed = sum(1 for habit in habit_status if habit['completed'])
 
-    # 今月の収支
-    month_start = make_aware(datetime(today.year, today.month, 1))
-    next_month = (month_start + timedelta(days=32)).replace(day=1)
-    month_transactions = Transaction.objects.filter(
-        user=user, date__gte=month_start, date__lt=next_month,
-    )
-    income_total = (
-        month_transactions.filter(transaction_type='income')
-        .aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    )
-    expense_total = (
-        month_transactions.filter(transaction_type='expense')
-        .aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    )
+    # 今月の収支（月次集計から）
+    income_total, expense_total = expense_selectors.get_month_totals(user, today.year, today.month)
 
     # 今月の予算消化（全体予算が設定されている場合のみカード表示）
-    from .expenses import selectors as expense_selectors
-    budget_overview = expense_selectors.build_budget_overview(user, today.year, today.month)
+    budget_overview = expense_selectors.get_budget_overview(user, today.year, today.month)
 
     # 買い物リスト（未購入）
     shopping_qs = ShoppingItem.objects.filter(user=user, is_checked=False)
@@ -0,0 +1,131 @@
+"""タスクの期間検索のベンチマークコマンド。
+
+合成データを一時的に投入し、日表示・月表示のタスク取得について、time_range の
+重なり（&&）による検索と、開始・終了日時の OR 条件による従来の検索の所要時間を比較する。
+データはトランザクションごとロールバックするので残らない。
+"""
+from __future__ import annotations
+
+import random
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db import transaction as db_transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from app.task import selectors
+from app.task.models import Task
+
+if TYPE_CHECKING:
+    from argparse import ArgumentParser
+
+    from django.contrib.auth.base_user import AbstractBaseUser
+
+# 従来の検索で繰り返しの回を表す条件
+_OCCURRENCE_Q = ~Q(frequency='') | Q(parent_task__isnull=False)
+
+
+def _legacy_day_filter(day_start: datetime, day_end: datetime) -> Q:
+    return (
+        Q(start_date__lte=day_end, end_date__gte=day_start) |
+        (Q(start_date__lte=day_end, end_date__isnull=True) & ~_OCCURRENCE_Q) |
+        (Q(start_date__range=(day_start, day_end), end_date__isnull=True) & _OCCURRENCE_Q) |
+        Q(start_date__isnull=True, end_date__gte=day_start)
+    )
+
+
+def _legacy_month_filter(range_start: datetime, range_end: datetime) -> Q:
+    return (
+        Q(start_date__range=(range_start, range_end)) |
+        Q(end_date__range=(range_start, range_end)) |
+        Q(start_date__lte=range_start, end_date__gte=range_end)
+    )
+
+
+class Command(BaseCommand):
+    help = 'タスクの期間検索（time_range の重なり / 開始・終了日時の OR 条件）の速度を比較する'
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            '--rows', type=int, default=50000, help='ユーザーごとに投入するタスク件数',
+        )
+        parser.add_argument('--users', type=int, default=3, help='タスクを投入するユーザー数')
+        parser.add_argument('--repeat', type=int, default=5, help='各検索の繰り返し回数')
+
+    def handle(self, *args: object, **options: object) -> None:
+        rows = options['rows']
+        repeat = options['repeat']
+
+        with db_transaction.atomic():
+            users = [
+                get_user_model().objects.create_user(
+                    username=f'task-range-benchmark-{index}',
+                    email=f'task-range-benchmark-{index}@example.com',
+                    password=None,
+                )
+                for index in range(options['users'])
+            ]
+            today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+            for index, user in enumerate(users):
+                self._populate(user, rows, today, seed=index)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE app_task')
+            self.stdout.write(f'{len(users)}人 × {rows}件のタスクを投入しました。')
+
+            user = users[0]
+            base_qs = Task.objects.filter(user=user, is_cancelled=False).filter(
+                Q(parent_task__isnull=True) | Q(recurrence_id__isnull=False)
+            )
+            day_end = today + timedelta(days=1, microseconds=-1)
+            month_start = today.replace(day=1) - timedelta(days=7)
+            month_end = month_start + timedelta(days=42, microseconds=-1)
+            cases = [
+                ('日表示', selectors.get_day_view_tasks(user, today, day_end),
+                 base_qs.filter(_legacy_day_filter(today, day_end))),
+                ('月表示', selectors.get_month_tasks(user, month_start, month_end),
+                 base_qs.filter(_legacy_month_filter(month_start, month_end))),
+            ]
+            for name, overlap_qs, legacy_qs in cases:
+                overlap_time, overlap_count = self._measure(overlap_qs, repeat)
+                legacy_time, legacy_count = self._measure(legacy_qs, repeat)
+                self.stdout.write(
+                    f'{name} &&: {overlap_time * 1000:.1f}ms（{overlap_count}件） / '
+                    f'OR 条件: {legacy_time * 1000:.1f}ms（{legacy_count}件）'
+                )
+
+            db_transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('ベンチマークが完了しました。'))
+
+    def _populate(self, user: AbstractBaseUser, rows: int, today: datetime, seed: int) -> None:
+        """前後2年に散らばるタスクを投入する（2%は終了日時なし、0.5%は開始日時なし）。"""
+        rng = random.Random(seed)  # noqa: S311 - 合成データ用（暗号用途ではない）
+        batch = []
+        for index in range(rows):
+            start = today + timedelta(minutes=rng.randrange(-730 * 24 * 60, 730 * 24 * 60))
+            end = start + timedelta(minutes=rng.choice([30, 60, 120, 24 * 60, 3 * 24 * 60]))
+            roll = rng.random()
+            if roll < 0.02:
+                end = None
+            elif roll < 0.025:
+                start = None
+            batch.append(Task(user=user, title=f'タスク{index}', start_date=start, end_date=end))
+            if len(batch) >= 5000:
+                Task.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Task.objects.bulk_create(batch)
+
+    def _measure(self, queryset: QuerySet, repeat: int) -> tuple[float, int]:
+        best = float('inf')
+        count = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = len(list(queryset.values_list('id', flat=True)))
+            best = min(best, time.perf_counter() - started)
+        return best, count
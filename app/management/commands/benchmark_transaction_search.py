@@ -0,0 +1,115 @@
+"""取引キーワード検索のベンチマークコマンド。
+
+合成データを一時的に投入し、n-gram インデックス検索と icontains 検索の
+所要時間を比較する。データはトランザクションごとロールバックするので残らない。
+"""
+from __future__ import annotations
+
+import random
+import time
+from datetime import datetime, timedelta
+from datetime import time as time_cls
+from decimal import Decimal
+from typing import TYPE_CHECKING
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from app.expenses.models import Category, PaymentMethod, Transaction
+from app.expenses.search import icontains_search_filter, transaction_search_filter
+
+if TYPE_CHECKING:
+    from argparse import ArgumentParser
+
+    from django.contrib.auth.base_user import AbstractBaseUser
+
+_WORDS = [
+    'スーパー', 'コンビニ', 'ランチ', '電気代', '水道代', 'ガス代', '家賃', '書籍',
+    '映画', 'カフェ', 'タクシー', '電車', 'ドラッグストア', '美容院', 'ジム', 'Amazon',
+]
+_QUERIES = ['スーパー', 'カフェ', '代', 'amazon', '見つからない語']
+
+
+class Command(BaseCommand):
+    help = '取引キーワード検索（n-gram インデックス / icontains）の速度を比較する'
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument('--rows', type=int, default=100000, help='投入する取引件数')
+        parser.add_argument('--repeat', type=int, default=5, help='各検索の繰り返し回数')
+
+    def handle(self, *args: object, **options: object) -> None:
+        rows = options['rows']
+        repeat = options['repeat']
+
+        with db_transaction.atomic():
+            user = get_user_model().objects.create_user(
+                username='search-benchmark', email='search-benchmark@example.com', password=None,
+            )
+            categories = Category.objects.bulk_create(
+                Category(user=user, name=name) for name in ['食費', '光熱費', '交通費', '娯楽']
+            )
+            payment_methods = PaymentMethod.objects.bulk_create(
+                PaymentMethod(user=user, name=name) for name in ['現金', 'カード']
+            )
+            self._populate(user, rows, categories, payment_methods)
+            self.stdout.write(f'{rows}件の取引を投入しました。')
+
+            base_qs = Transaction.objects.filter(user=user)
+            for search in _QUERIES:
+                gram_time, gram_count = self._measure(
+                    base_qs, transaction_search_filter(user, search), repeat,
+                )
+                like_time, like_count = self._measure(
+                    base_qs, icontains_search_filter(search), repeat,
+                )
+                self.stdout.write(
+                    f'「{search}」 n-gram: {gram_time * 1000:.1f}ms（{gram_count}件） / '
+                    f'icontains: {like_time * 1000:.1f}ms（{like_count}件）'
+                )
+
+            db_transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('ベンチマークが完了しました。'))
+
+    def _populate(
+        self,
+        user: AbstractBaseUser,
+        rows: int,
+        categories: list[Category],
+        payment_methods: list[PaymentMethod],
+    ) -> None:
+        rng = random.Random(0)  # noqa: S311 - 合成データ用（暗号用途ではない）
+        first_day = timezone.localdate() - timedelta(days=730)
+        start = timezone.make_aware(datetime.combine(first_day, time_cls(12)))
+        batch = []
+        for index in range(rows):
+            transaction = Transaction(
+                user=user,
+                date=start + timedelta(days=rng.randrange(730)),
+                amount=Decimal(rng.randrange(100, 20000)),
+                transaction_type='expense',
+                category=rng.choice(categories),
+                payment_method=rng.choice(payment_methods),
+                major_category='variable',
+                purpose=f'{rng.choice(_WORDS)}{index % 100}',
+                purpose_description=rng.choice(_WORDS),
+            )
+            transaction.refresh_search_grams()
+            batch.append(transaction)
+            if len(batch) >= 5000:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Transaction.objects.bulk_create(batch)
+
+    def _measure(self, base_qs: QuerySet, condition: Q, repeat: int) -> tuple[float, int]:
+        best = float('inf')
+        count = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = base_qs.filter(condition).count()
+            best = min(best, time.perf_counter() - started)
+        return best, count
@@ -1,10 +1,14 @@
 from datetime import date
+from typing import TYPE_CHECKING
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import localdate, localtime
 
-from app.expenses.models import RecurringPayment
 from app.expenses import services
 
+if TYPE_CHECKING:
+    from argparse import ArgumentParser
+
 
 class Command(BaseCommand):
     help = '定期支払いを実行し、該当する取引を自動作成する'
@@ -15,27 +19,49 @@ class Command(BaseCommand):
             type=str,
             help='実行日（YYYY-MM-DD形式）。未指定の場合は本日',
         )
+        parser.add_argument(
+            '--date-range',
+            nargs=2,
+            metavar=('START', 'END'),
+            help='実行期間（YYYY-MM-DD形式、両端含む）。停止期間の取りこぼしを実行する',
+        )
+        parser.add_argument(
+            '--backfill',
+            metavar='START',
+            help='START（YYYY-MM-DD形式）から実行日（--date、未指定なら本日）までの未実行分を'
+                 '定期支払いごとにまとめて実行する（手動の復旧用）',
+        )
 
     def handle(self, *args: object, **options: object) -> None:
         date_str = options.get('date')
-        if date_str:
-            target_date = date.fromisoformat(str(date_str))
+        date_range = options.get('date_range')
+        if date_str and date_range:
+            raise CommandError('--date と --date-range は同時に指定できません。')
+        backfill = options.get('backfill')
+        if date_range and backfill:
+            raise CommandError('--backfill と --date-range は同時に指定できません。')
+        if date_range:
+            start_date, end_date = (date.fromisoformat(value) for value in date_range)
+            if start_date > end_date:
+                raise CommandError('--date-range の開始日は終了日以前にしてください。')
         else:
-            target_date = date.today()
-
-        recurring_payments = RecurringPayment.objects.filter(
-            is_active=True,
-        ).select_related('category', 'payment_method', 'user')
-
-        executed_count = 0
-        for recurring in recurring_payments:
-            if recurring.should_execute_on(target_date):
-                services.execute_recurring_payment(recurring, target_date)
-                executed_count += 1
-                self.stdout.write(
-                    f'  実行: {recurring.user.username} - {recurring.purpose} (¥{recurring.amount})'
-                )
-
-        self.stdout.write(
-            self.style.SUCCESS(f'{executed_count}件の定期支払いを実行しました。（対象日: {target_date}）')
-        )
+            start_date = end_date = date.fromisoformat(str(date_str)) if date_str else localdate()
+        if backfill:
+            start_date = date.fromisoformat(str(backfill))
+            if start_date > end_date:
+                raise CommandError('--backfill の開始日は実行日以前にしてください。')
+
+        if backfill:
+            transactions = services.backfill_recurring_payments(start_date, end_date)
+        else:
+            transactions = services.execute_recurring_payments(start_date, end_date)
+        for transaction in transactions:
+            executed_on = localtime(transaction.date).date()
+            self.stdout.write(
+                f'  実行: {executed_on} - {transaction.purpose} (¥{transaction.amount})'
+            )
+
+        target = str(start_date) if start_date == end_date else f'{start_date}〜{end_date}'
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(transactions)}件の定期支払いを実行しました。（対象日: {target}）'
+        ))
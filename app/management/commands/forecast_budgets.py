@@ -0,0 +1,43 @@
+"""予算の月末予測に使う支出カーブ（SpendingCurve）を作り直すコマンド。
+
+毎晩実行し、予算画面の表示時に履歴を集計しなくて済むようにする。
+"""
+from typing import TYPE_CHECKING
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from app.expenses import forecasting
+
+if TYPE_CHECKING:
+    from argparse import ArgumentParser
+
+
+class Command(BaseCommand):
+    help = '過去の支出から予算の月末予測用カーブを作り直す'
+
+    def add_arguments(self, parser: 'ArgumentParser') -> None:
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='対象ユーザーID。未指定の場合は全ユーザー',
+        )
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=forecasting.FORECAST_HISTORY_MONTHS,
+            help='予測に使う過去の月数',
+        )
+
+    def handle(self, *args: object, **options: object) -> None:
+        user = None
+        user_id = options.get('user_id')
+        if user_id is not None:
+            user = get_user_model().objects.filter(pk=user_id).first()
+            if user is None:
+                raise CommandError(f'ユーザーが見つかりません（id={user_id}）。')
+        if options['months'] < 1:
+            raise CommandError('--months は1以上を指定してください。')
+
+        curve_count = forecasting.refresh_spending_curves(user, months=options['months'])
+        self.stdout.write(self.style.SUCCESS(f'支出カーブを作り直しました。（{curve_count}件）'))
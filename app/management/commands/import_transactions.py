@@ -0,0 +1,65 @@
+"""CSV / OFX ファイルから取引を一括インポートするコマンド。
+
+例: python manage.py import_transactions --user-id 1 statement.csv
+"""
+from typing import TYPE_CHECKING
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from app.expenses import importers
+
+if TYPE_CHECKING:
+    from argparse import ArgumentParser
+
+
+class Command(BaseCommand):
+    help = 'CSV / OFX ファイルから取引を一括インポートする'
+
+    def add_arguments(self, parser: 'ArgumentParser') -> None:
+        parser.add_argument('path', help='インポートするファイルのパス')
+        parser.add_argument('--user-id', type=int, required=True, help='取り込み先のユーザーID')
+        parser.add_argument(
+            '--format', dest='file_format', choices=['csv', 'ofx'],
+            help='ファイル形式。未指定の場合は拡張子から判定',
+        )
+        parser.add_argument('--encoding', default='utf-8-sig', help='文字コード（既定: utf-8-sig）')
+        parser.add_argument(
+            '--category', default=importers.DEFAULT_CATEGORY_NAME,
+            help='カテゴリ列がない行に使うカテゴリ名',
+        )
+        parser.add_argument(
+            '--payment-method', default=importers.DEFAULT_PAYMENT_METHOD_NAME,
+            help='支払方法列がない行に使う支払方法名',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importers.IMPORT_BATCH_SIZE,
+            help='一度に登録する件数',
+        )
+
+    def handle(self, *args: object, **options: object) -> None:
+        user = get_user_model().objects.filter(pk=options['user_id']).first()
+        if user is None:
+            raise CommandError(f'ユーザーが見つかりません（id={options["user_id"]}）。')
+
+        path = options['path']
+        file_format = options['file_format'] or importers.detect_format(path)
+        try:
+            with open(path, encoding=options['encoding'], newline='') as stream:
+                result = importers.import_transactions(
+                    user,
+                    importers.parse_file(stream, file_format),
+                    default_category=options['category'],
+                    default_payment_method=options['payment_method'],
+                    batch_size=options['batch_size'],
+                )
+        except (OSError, UnicodeDecodeError) as exc:
+            raise CommandError(f'ファイルを読み込めませんでした: {exc}') from exc
+
+        for error in result.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created}件を登録しました。'
+            f'（重複 {result.duplicates}件、エラー {result.error_count}件、'
+            f'{result.elapsed:.1f}秒、{result.rows_per_second:,.0f}行/秒）'
+        ))
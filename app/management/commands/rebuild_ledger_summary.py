@@ -0,0 +1,35 @@
+"""月次集計（MonthlyLedgerSummary）を取引から再構築するコマンド。
+
+差分更新が漏れた場合（SQL での直接修正など）の復旧用。
+"""
+from typing import TYPE_CHECKING
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from app.expenses import services
+
+if TYPE_CHECKING:
+    from argparse import ArgumentParser
+
+
+class Command(BaseCommand):
+    help = '取引データから月次集計を再構築する'
+
+    def add_arguments(self, parser: 'ArgumentParser') -> None:
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='対象ユーザーID。未指定の場合は全ユーザー',
+        )
+
+    def handle(self, *args: object, **options: object) -> None:
+        user = None
+        user_id = options.get('user_id')
+        if user_id is not None:
+            user = get_user_model().objects.filter(pk=user_id).first()
+            if user is None:
+                raise CommandError(f'ユーザーが見つかりません（id={user_id}）。')
+
+        row_count = services.rebuild_monthly_ledger_summary(user)
+        self.stdout.write(self.style.SUCCESS(f'月次集計を再構築しました。（{row_count}行）'))
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from .models import MemoType
+from ..bulk_edit import BulkTarget
+from . import selectors
+from .models import Memo, MemoType
 
 
 def ensure_default_memo_types() -> None:
@@ -12,3 +14,11 @@ def ensure_default_memo_types() -> None:
     ]
     for name, color in defaults:
         MemoType.objects.get_or_create(user=None, name=name, defaults={'color': color})
+
+
+# 選択モードの一括編集・一括削除の対象
+MEMO_BULK_TARGET = BulkTarget(
+    Memo,
+    choice_fields={'is_favorite': (True, False)},
+    owned_fields={'memo_type': selectors.get_memo_types},
+)
@@ -95,7 +95,14 @@ def delete_memo(request: HttpRequest, memo_id: int) -> HttpResponse:
 def bulk_delete_memos(request: HttpRequest) -> JsonResponse:
     """メモの一括削除（選択モード用）"""
     from ..bulk_delete import bulk_delete_response
-    return bulk_delete_response(request, Memo)
+    return bulk_delete_response(request, services.MEMO_BULK_TARGET)
+
+
+@login_required
+def bulk_edit_memos(request: HttpRequest) -> JsonResponse:
+    """メモの一括編集（種別・お気に入りの変更）"""
+    from ..bulk_edit import bulk_edit_response
+    return bulk_edit_response(request, services.MEMO_BULK_TARGET)
 
 
 @login_required
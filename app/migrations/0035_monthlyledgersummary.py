@@ -0,0 +1,68 @@
+# Generated by Django 5.2 on 2026-10-17 11:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils.timezone import get_current_timezone
+
+
+def populate_monthly_ledger_summary(apps, schema_editor):
+    Transaction = apps.get_model('app', 'Transaction')
+    MonthlyLedgerSummary = apps.get_model('app', 'MonthlyLedgerSummary')
+
+    rows = (
+        Transaction.objects
+        .annotate(month=TruncMonth('date', tzinfo=get_current_timezone()))
+        .values('user_id', 'month', 'category_id', 'payment_method_id', 'transaction_type', 'major_category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    MonthlyLedgerSummary.objects.bulk_create(
+        (
+            MonthlyLedgerSummary(
+                user_id=row['user_id'],
+                year_month=row['month'].date(),
+                category_id=row['category_id'],
+                payment_method_id=row['payment_method_id'],
+                transaction_type=row['transaction_type'],
+                major_category=row['major_category'],
+                amount=row['total'],
+                transaction_count=row['count'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0034_budget'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyLedgerSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year_month', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('expense', '支出'), ('income', '収入'), ('no_change', '変動なし')], max_length=10)),
+                ('major_category', models.CharField(choices=[('variable', '変動費'), ('fixed', '固定費'), ('special', '特別費')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.category')),
+                ('payment_method', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.paymentmethod')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_ledger_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '月次集計',
+                'verbose_name_plural': '月次集計',
+                'constraints': [models.UniqueConstraint(fields=('user', 'year_month', 'category', 'payment_method', 'transaction_type', 'major_category'), name='unique_monthly_ledger_summary_key')],
+            },
+        ),
+        migrations.RunPython(populate_monthly_ledger_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-17 11:38
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+from app.expenses.search import build_search_grams
+
+
+def populate_search_grams(apps, schema_editor):
+    Transaction = apps.get_model('app', 'Transaction')
+
+    batch = []
+    for transaction in Transaction.objects.only('id', 'purpose', 'purpose_description').iterator(chunk_size=1000):
+        transaction.search_grams = build_search_grams(transaction.purpose, transaction.purpose_description)
+        batch.append(transaction)
+        if len(batch) >= 1000:
+            Transaction.objects.bulk_update(batch, ['search_grams'])
+            batch = []
+    if batch:
+        Transaction.objects.bulk_update(batch, ['search_grams'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0036_transaction_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='search_grams',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_grams'], name='transaction_search_grams_idx'),
+        ),
+        migrations.RunPython(populate_search_grams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-17 11:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0037_transaction_search_grams'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='import_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('import_hash', ''), _negated=True), fields=['user', 'import_hash'], name='transaction_import_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-17 11:57
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0038_transaction_import_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingCurve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cumulative', django.contrib.postgres.fields.ArrayField(base_field=models.DecimalField(decimal_places=2, max_digits=14), size=31)),
+                ('months', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spending_curves', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '支出カーブ',
+                'verbose_name_plural': '支出カーブ',
+                'constraints': [models.UniqueConstraint(fields=('user', 'category'), name='unique_spending_curve_per_category'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user',), name='unique_overall_spending_curve_per_user')],
+            },
+        ),
+    ]
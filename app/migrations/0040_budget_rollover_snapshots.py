@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-17 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.timezone import localtime
+
+
+def create_initial_snapshots(apps, schema_editor):
+    """既存の予算を、作成した月からのスナップショットとして記録する。"""
+    Budget = apps.get_model('app', 'Budget')
+    BudgetSnapshot = apps.get_model('app', 'BudgetSnapshot')
+
+    BudgetSnapshot.objects.bulk_create([
+        BudgetSnapshot(
+            user_id=budget.user_id,
+            category_id=budget.category_id,
+            year_month=localtime(budget.created_at).date().replace(day=1),
+            amount=budget.amount,
+        )
+        for budget in Budget.objects.all()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0039_spendingcurve'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='rollover',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='BudgetSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year_month', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('rollover', models.BooleanField(default=False)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '予算履歴',
+                'verbose_name_plural': '予算履歴',
+                'constraints': [models.UniqueConstraint(fields=('user', 'category', 'year_month'), name='unique_budget_snapshot_per_month'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'year_month'), name='unique_overall_budget_snapshot_per_month')],
+            },
+        ),
+        migrations.RunPython(create_initial_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,146 @@
+# Generated by Django 5.2 on 2026-10-17 12:28
+
+from bisect import bisect_left
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.timezone import localtime
+
+_OFFSETS = {
+    'daily': lambda n: timedelta(days=n),
+    'weekly': lambda n: timedelta(weeks=n),
+    'monthly': lambda n: relativedelta(months=n),
+    'yearly': lambda n: relativedelta(years=n),
+}
+_COPIED_FIELDS = ('title', 'priority', 'label_id', 'all_day', 'description')
+
+
+def _rule_dates(parent):
+    """規則上の 1〜repeat_count 回目の (開始, 終了)。recurrence.occurrence_dates と同じ計算。"""
+    start = localtime(parent.start_date)
+    end = localtime(parent.end_date) if parent.end_date else None
+    dates = []
+    for index in range(1, parent.repeat_count + 1):
+        offset = _OFFSETS[parent.frequency]((parent.repeat_interval or 1) * index)
+        dates.append((start + offset, end + offset if end else None))
+    return dates
+
+
+def _match_children(children, starts):
+    """子タスク → 回の番号（starts の位置）。開始日時が最も近い回に、近い組から1対1で対応付ける。
+
+    以前は前の子タスクの日時に間隔を足して作っていたため、月末の回は短い月で日付がずれたまま
+    （1/31 → 2/28 → 3/28）になっている。順番ではなく日付で対応付ける。
+    """
+    candidates = []
+    for child in children:
+        if child.start_date is None:
+            continue
+        position = bisect_left(starts, child.start_date)
+        for index in range(max(position - 2, 0), min(position + 2, len(starts))):
+            candidates.append((abs(child.start_date - starts[index]), child.pk, index))
+    matched = {}
+    used_indexes = set()
+    for _, child_pk, index in sorted(candidates):
+        if child_pk not in matched and index not in used_indexes:
+            matched[child_pk] = index
+            used_indexes.add(index)
+    return matched
+
+
+def convert_children_to_exceptions(apps, schema_editor):
+    """作成済みの子タスクを、規則上の回（recurrence_id）に対応付ける。
+
+    親の内容から変わっていない子タスクは仮想の回で置き換えられるので削除し、
+    ステータスや内容・日時を変更したものだけを例外として残す。
+    子タスクの残っていない回（削除済みの回）は、削除した回（is_cancelled）の例外にする。
+    どの回にも対応しない子タスクは、表示されなくならないよう独立したタスクにする。
+    """
+    Task = apps.get_model('app', 'Task')
+    parents = Task.objects.filter(
+        parent_task__isnull=True,
+        frequency__in=list(_OFFSETS),
+        start_date__isnull=False,
+        repeat_count__gt=0,
+    )
+    redundant_ids: list[int] = []
+    detached_ids: list[int] = []
+    exceptions = []
+    cancelled = []
+    for parent in parents.iterator():
+        dates = _rule_dates(parent)
+        children = list(Task.objects.filter(parent_task=parent))
+        matched = _match_children(children, [start for start, _ in dates])
+        for child in children:
+            if child.pk not in matched:
+                detached_ids.append(child.pk)
+                continue
+            start, end = dates[matched[child.pk]]
+            unchanged = (
+                child.status == 'not_started'
+                and child.start_date == start
+                and child.end_date == end
+                and all(getattr(child, name) == getattr(parent, name) for name in _COPIED_FIELDS)
+            )
+            if unchanged:
+                redundant_ids.append(child.pk)
+            else:
+                child.recurrence_id = start
+                exceptions.append(child)
+        used_indexes = set(matched.values())
+        cancelled.extend(
+            Task(
+                user_id=parent.user_id,
+                title=parent.title,
+                frequency='',
+                repeat_interval=1,
+                priority=parent.priority,
+                status='not_started',
+                label_id=parent.label_id,
+                start_date=start,
+                end_date=end,
+                all_day=parent.all_day,
+                description=parent.description,
+                parent_task_id=parent.pk,
+                recurrence_id=start,
+                is_cancelled=True,
+            )
+            for index, (start, end) in enumerate(dates)
+            if index not in used_indexes
+        )
+    Task.objects.filter(pk__in=redundant_ids).delete()
+    Task.objects.filter(pk__in=detached_ids).update(parent_task=None)
+    Task.objects.bulk_update(exceptions, ['recurrence_id'], batch_size=1000)
+    Task.objects.bulk_create(cancelled, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0040_budget_rollover_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='is_cancelled',
+            field=models.BooleanField(default=False, verbose_name='削除した回'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_id',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='繰り返しの元の開始日時'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('recurrence_id__isnull', False)),
+                fields=('parent_task', 'recurrence_id'),
+                name='unique_task_occurrence_exception',
+            ),
+        ),
+        migrations.RunPython(convert_children_to_exceptions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-17 12:42
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0041_task_recurrence_exceptions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='time_range',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(end_date__isnull=True, start_date__isnull=True, then=models.Value(None)), default=models.Func(models.F('start_date'), models.Case(models.When(end_date__lt=models.F('start_date'), then=models.F('start_date')), models.When(end_date__isnull=False, then=models.F('end_date')), models.When(models.Q(models.Q(('frequency', ''), _negated=True), ('parent_task__isnull', False), _connector='OR'), then=models.F('start_date')), default=models.Value(None), output_field=models.DateTimeField()), models.Value('[]'), function='TSTZRANGE'), output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=django.contrib.postgres.indexes.GistIndex(models.Func(models.F('user'), django.db.models.expressions.CombinedExpression(models.F('user'), '+', models.Value(1)), function='INT8RANGE', output_field=django.contrib.postgres.fields.ranges.BigIntegerRangeField()), models.F('time_range'), name='task_user_time_range_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0042_task_time_range'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='externalcalendar',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='ICSのハッシュ'),
+        ),
+        migrations.AddField(
+            model_name='externalcalendar',
+            name='content_synced_on',
+            field=models.DateField(blank=True, null=True, verbose_name='ICSを取り込んだ日'),
+        ),
+        migrations.AddField(
+            model_name='externalcalendar',
+            name='etag',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='ETag'),
+        ),
+        migrations.AddField(
+            model_name='externalcalendar',
+            name='last_modified',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Last-Modified'),
+        ),
+        migrations.AddField(
+            model_name='externalevent',
+            name='recurrence_id',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='RECURRENCE-ID'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-17 14:10
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # settings.CACHES の DatabaseCache 用テーブル（作成済みなら何もしない）
+    call_command('createcachetable', database=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0044_transaction_amount_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
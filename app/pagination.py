@@ -0,0 +1,22 @@
+"""ページネーションの共通ヘルパー。
+
+一覧画面で件数を別の集計クエリ（合計値など）と同時に求めている場合に、
+Paginator が改めて COUNT(*) を発行しないようにする。
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.paginator import Paginator
+
+
+class CountedPaginator(Paginator):
+    """件数を事前に受け取り、COUNT クエリを発行しない Paginator。"""
+
+    def __init__(self, object_list: Any, per_page: int, *, count: int, **kwargs: Any) -> None:
+        super().__init__(object_list, per_page, **kwargs)
+        self._precomputed_count = count
+
+    @property
+    def count(self) -> int:
+        return self._precomputed_count
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from ..bulk_edit import BulkTarget
 from .models import ShoppingItem
 
 
@@ -26,3 +27,13 @@ def update_item_count(shopping_item: ShoppingItem, field_type: str, action: str)
         elif action == 'decrease10':
             shopping_item.threshold_count = max(0, shopping_item.threshold_count - 10)
     shopping_item.save()
+
+
+# 選択モードの一括編集・一括削除の対象
+SHOPPING_ITEM_BULK_TARGET = BulkTarget(
+    ShoppingItem,
+    choice_fields={
+        'frequency': tuple(value for value, _ in ShoppingItem.FREQUENCY_CHOICES),
+        'is_checked': (True, False),
+    },
+)
@@ -119,4 +119,11 @@ def clear_checked_shopping_items(request: HttpRequest) -> HttpResponse:
 def bulk_delete_shopping_items(request: HttpRequest) -> JsonResponse:
     """買い物アイテムの一括削除（選択モード用）"""
     from ..bulk_delete import bulk_delete_response
-    return bulk_delete_response(request, ShoppingItem)
+    return bulk_delete_response(request, services.SHOPPING_ITEM_BULK_TARGET)
+
+
+@login_required
+def bulk_edit_shopping_items(request: HttpRequest) -> JsonResponse:
+    """買い物アイテムの一括編集（頻度・購入済みの変更）"""
+    from ..bulk_edit import bulk_edit_response
+    return bulk_edit_response(request, services.SHOPPING_ITEM_BULK_TARGET)
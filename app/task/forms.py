@@ -106,8 +106,9 @@ class TaskForm(forms.ModelForm):
             self.fields['label'].empty_label = 'ラベルなし'
             self.fields['label'].required = False
         
-        # 既存のインスタンスがある場合、時刻フィールドを初期化（ローカル時刻で表示）
-        if self.instance.pk:
+        # 既存のインスタンス（仮想の繰り返しの回を含む）がある場合、
+        # 時刻フィールドを初期化（ローカル時刻で表示）
+        if self.instance.pk or self.instance.recurrence_id:
             if self.instance.start_date and not self.instance.all_day:
                 self.fields['start_time'].initial = timezone.localtime(self.instance.start_date).time()
             if self.instance.end_date and not self.instance.all_day:
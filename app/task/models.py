@@ -1,5 +1,7 @@
 import uuid
 
+from django.contrib.postgres.fields import BigIntegerRangeField, DateTimeRangeField
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
 from django.conf import settings
 
@@ -19,6 +21,14 @@ class TaskLabel(models.Model):
         verbose_name_plural = 'タスクラベル'
 
 
+# user_id だけを含む範囲。btree_gist 拡張なしで user_id を time_range と同じ GiST インデックスに
+# 載せるための式で、検索では alias して「@> user_id」で絞り込む（インデックスの式と同じものを使う）
+TASK_USER_RANGE = models.Func(
+    models.F('user'), models.F('user') + 1,
+    function='INT8RANGE', output_field=BigIntegerRangeField(),
+)
+
+
 class Task(models.Model):
     FREQUENCY_CHOICES = [
         ('', '---'),
@@ -54,12 +64,67 @@ class Task(models.Model):
     all_day = models.BooleanField(default=False, verbose_name="終日")
     description = models.TextField(blank=True, verbose_name="詳細")
     parent_task = models.ForeignKey('self', on_delete=models.CASCADE, blank=True, null=True, related_name='recurring_instances', verbose_name="親タスク")
+    # 繰り返しの例外（ユーザーが変更・削除した回）が、規則上のどの回か（元の開始日時）
+    recurrence_id = models.DateTimeField(
+        blank=True, null=True, verbose_name="繰り返しの元の開始日時",
+    )
+    is_cancelled = models.BooleanField(default=False, verbose_name="削除した回")
+    # 表示期間（両端含む）。開始・終了日時の空の側は無限に続くものとする（両方空なら NULL）。
+    # 繰り返しの回は終了日時がなければ開始日時だけの期間にする（is_occurrence と同じ扱い）
+    time_range = models.GeneratedField(
+        expression=models.Case(
+            models.When(start_date__isnull=True, end_date__isnull=True, then=models.Value(None)),
+            default=models.Func(
+                models.F('start_date'),
+                models.Case(
+                    # 終了が開始より前の不正な期間は開始日時だけにする（範囲の作成でエラーにしない）
+                    models.When(end_date__lt=models.F('start_date'), then=models.F('start_date')),
+                    models.When(end_date__isnull=False, then=models.F('end_date')),
+                    models.When(
+                        ~models.Q(frequency='') | models.Q(parent_task__isnull=False),
+                        then=models.F('start_date'),
+                    ),
+                    default=models.Value(None),
+                    output_field=models.DateTimeField(),
+                ),
+                models.Value('[]'),
+                function='TSTZRANGE',
+            ),
+            output_field=DateTimeRangeField(),
+        ),
+        output_field=DateTimeRangeField(),
+        db_persist=True,
+    )
 
     def __str__(self) -> str:
         return f"{self.title} - {self.get_status_display()}"
 
+    @property
+    def is_occurrence(self) -> bool:
+        """繰り返しの回（親タスク自身・仮想の回・例外）か。終了日時がなければ開始日時だけの予定になる。"""
+        return bool(self.frequency) or self.parent_task_id is not None
+
+    @property
+    def occurrence_key(self) -> str:
+        """編集・削除URLでタスクを指すキー。保存していない仮想の回は「親タスクID/元の開始日時」。"""
+        if self.pk is None and self.recurrence_id is not None:
+            from .recurrence import format_occurrence_key
+            return f'{self.parent_task_id}/{format_occurrence_key(self.recurrence_id)}'
+        return str(self.pk)
+
     class Meta:
         ordering = ['-created_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['parent_task', 'recurrence_id'],
+                condition=models.Q(recurrence_id__isnull=False),
+                name='unique_task_occurrence_exception',
+            ),
+        ]
+        indexes = [
+            # ユーザーごとの期間の重なり（time_range && 表示範囲）の検索用
+            GistIndex(TASK_USER_RANGE, models.F('time_range'), name='task_user_time_range_idx'),
+        ]
 
 
 class TempTaskSet(models.Model):
@@ -148,6 +213,12 @@ class ExternalCalendar(models.Model):
     color = models.CharField('色', max_length=7, default='#6c8ebf')
     last_synced_at = models.DateTimeField('最終同期日時', null=True, blank=True)
     last_error = models.CharField('最終同期エラー', max_length=200, blank=True, default='')
+    # 条件付き取得（If-None-Match / If-Modified-Since）用に、前回の応答の検証子を保存する
+    etag = models.CharField('ETag', max_length=255, blank=True, default='')
+    last_modified = models.CharField('Last-Modified', max_length=100, blank=True, default='')
+    # 前回取り込んだICSの SHA-256 と、取り込んだ日（購読範囲の基準日）
+    content_hash = models.CharField('ICSのハッシュ', max_length=64, blank=True, default='')
+    content_synced_on = models.DateField('ICSを取り込んだ日', null=True, blank=True)
     created_at = models.DateTimeField('作成日時', auto_now_add=True)
 
     class Meta:
@@ -165,7 +236,8 @@ class ExternalCalendar(models.Model):
 class ExternalEvent(models.Model):
     """外部カレンダーから取り込んだイベント（読み取り専用）。
 
-    同期のたびに購読範囲内のイベントを洗い替えする。
+    同期では (uid, recurrence_id, start_date) で前回のイベントと突き合わせ、
+    追加・変更・削除されたイベントだけを書き込む。
     テンプレートで Task と混在表示できるよう、start_date / end_date /
     all_day / label（=カレンダー）等の互換プロパティを持つ。
     """
@@ -176,6 +248,8 @@ class ExternalEvent(models.Model):
         verbose_name='外部カレンダー',
     )
     uid = models.CharField('UID', max_length=500, blank=True, default='')
+    # 繰り返しの回を指す RECURRENCE-ID（展開した回と単発のイベントは元の開始日時）
+    recurrence_id = models.DateTimeField('RECURRENCE-ID', null=True, blank=True)
     title = models.CharField('タイトル', max_length=300)
     start_date = models.DateTimeField('開始日時')
     end_date = models.DateTimeField('終了日時', null=True, blank=True)
@@ -0,0 +1,166 @@
+"""繰り返しタスクの仮想展開。
+
+繰り返しの規則（frequency / repeat_interval / repeat_count）は親タスクにだけ保存し、
+2回目以降の各回は表示する範囲の分だけ読み込み時に展開する（COUNT 付きの RRULE と同じ考え方）。
+n 回目の開始日時は「親の開始日時 + n × 間隔」で直接求めるので、範囲の手前の回を
+順にたどる必要はない（月・年単位は relativedelta で月末に丸める）。
+
+ユーザーが変更した回（ステータス変更・編集・削除）だけを、recurrence_id（元の開始日時）を
+持つ子タスク（例外）として保存し、その回は仮想の回の代わりに例外を使う。
+削除した回は is_cancelled の例外として残し、仮想の回が再び現れないようにする。
+"""
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+
+from dateutil.relativedelta import relativedelta
+from django.utils.timezone import localtime
+
+from .models import Task
+
+if TYPE_CHECKING:
+    from django.contrib.auth.base_user import AbstractBaseUser
+
+# 頻度 → 1間隔あたりの最長の日数（範囲の手前の回を飛ばすときの見積もり用）
+_MAX_STEP_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 31, 'yearly': 366}
+
+# 編集・削除URLで回を指すキーの書式（元の開始日時の UTC 表記）
+OCCURRENCE_KEY_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+def _offset(frequency: str, amount: int) -> timedelta | relativedelta:
+    if frequency == 'daily':
+        return timedelta(days=amount)
+    if frequency == 'weekly':
+        return timedelta(weeks=amount)
+    if frequency == 'monthly':
+        return relativedelta(months=amount)
+    return relativedelta(years=amount)
+
+
+def is_recurring(task: Task) -> bool:
+    """仮想の回を展開する親タスクか（開始日時と繰り返し回数があるもの）。"""
+    return (
+        task.parent_task_id is None
+        and task.frequency in _MAX_STEP_DAYS
+        and task.start_date is not None
+        and bool(task.repeat_count and task.repeat_count > 0)
+    )
+
+
+def occurrence_dates(task: Task, index: int) -> tuple[datetime, datetime | None]:
+    """index 回目（親タスク自身が 0 回目）の開始・終了日時。ローカル時刻で間隔を加える。"""
+    offset = _offset(task.frequency, (task.repeat_interval or 1) * index)
+    start = localtime(task.start_date) + offset
+    end = localtime(task.end_date) + offset if task.end_date else None
+    return start, end
+
+
+def _first_index(task: Task, range_start: datetime) -> int:
+    """range_start に重なりうる最初の回の番号の下限（1以上）。"""
+    max_step = timedelta(days=_MAX_STEP_DAYS[task.frequency] * (task.repeat_interval or 1))
+    span = task.end_date - task.start_date if task.end_date else timedelta(0)
+    # 月末の丸めで期間が数日ずれても取りこぼさないよう、1回分手前から調べる
+    return max(1, (range_start - task.start_date - span) // max_step - 1)
+
+
+def occurrence_indexes(task: Task, range_start: datetime, range_end: datetime) -> list[int]:
+    """範囲に重なる回の番号（1〜repeat_count）。
+
+    終了日時のない回は開始日時だけの予定として扱う。
+    """
+    if not is_recurring(task):
+        return []
+    indexes: list[int] = []
+    for index in range(_first_index(task, range_start), task.repeat_count + 1):
+        start, end = occurrence_dates(task, index)
+        if start > range_end:
+            break
+        if (end or start) >= range_start:
+            indexes.append(index)
+    return indexes
+
+
+def build_occurrence(parent: Task, index: int) -> Task:
+    """index 回目の仮想の回（保存していない Task）を親タスクから作る。"""
+    start, end = occurrence_dates(parent, index)
+    return Task(
+        user_id=parent.user_id,
+        title=parent.title,
+        frequency='',
+        repeat_interval=1,
+        priority=parent.priority,
+        status='not_started',
+        label=parent.label,
+        start_date=start,
+        end_date=end,
+        all_day=parent.all_day,
+        description=parent.description,
+        parent_task=parent,
+        recurrence_id=start,
+    )
+
+
+def find_occurrence(parent: Task, recurrence_id: datetime) -> Task | None:
+    """元の開始日時が recurrence_id の仮想の回。その回が規則にない場合は None。
+
+    キー（秒単位）から戻した日時でも探せるよう、秒未満は比べない。
+    """
+    window_end = recurrence_id + timedelta(seconds=1)
+    for index in occurrence_indexes(parent, recurrence_id, window_end):
+        occurrence = build_occurrence(parent, index)
+        if recurrence_id <= occurrence.recurrence_id < window_end:
+            return occurrence
+    return None
+
+
+def expand_occurrences(
+    user: AbstractBaseUser,
+    range_start: datetime,
+    range_end: datetime,
+) -> list[Task]:
+    """範囲に重なる繰り返しタスクの仮想の回を返す（例外として保存済みの回は除く）。
+
+    親タスクと例外の recurrence_id をそれぞれ1クエリで読む。親タスク自身（0回目）と
+    保存済みの例外は通常のタスクとして取得されるので含めない。
+    """
+    parents = [
+        task for task in (
+            Task.objects
+            .filter(
+                user=user, parent_task__isnull=True, start_date__lte=range_end,
+                repeat_count__gt=0,
+            )
+            .exclude(frequency='')
+            .select_related('label')
+        )
+        if is_recurring(task)
+    ]
+    if not parents:
+        return []
+
+    overridden = set(
+        Task.objects
+        .filter(parent_task__in=parents, recurrence_id__lte=range_end)
+        .values_list('parent_task_id', 'recurrence_id')
+    )
+    occurrences: list[Task] = []
+    for parent in parents:
+        for index in occurrence_indexes(parent, range_start, range_end):
+            occurrence = build_occurrence(parent, index)
+            if (parent.pk, occurrence.recurrence_id) not in overridden:
+                occurrences.append(occurrence)
+    return occurrences
+
+
+def format_occurrence_key(recurrence_id: datetime) -> str:
+    return recurrence_id.astimezone(UTC).strftime(OCCURRENCE_KEY_FORMAT)
+
+
+def parse_occurrence_key(value: str) -> datetime | None:
+    """format_occurrence_key の逆変換。書式が違えば None。"""
+    try:
+        return datetime.strptime(value, OCCURRENCE_KEY_FORMAT).replace(tzinfo=UTC)
+    except ValueError:
+        return None
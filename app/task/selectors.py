@@ -5,10 +5,12 @@ from datetime import date, datetime
 from datetime import timezone as dt_timezone
 from typing import TYPE_CHECKING
 
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
 from django.db.models import Q, QuerySet
-from django.utils.timezone import localtime, make_aware
+from django.utils.timezone import localtime
 
-from .models import ExternalEvent, Task, TaskLabel
+from . import recurrence
+from .models import TASK_USER_RANGE, ExternalEvent, Task, TaskLabel
 
 if TYPE_CHECKING:
     from django.contrib.auth.base_user import AbstractBaseUser
@@ -45,16 +47,54 @@ def merge_tasks_and_external_events(
     return combined
 
 
+# 保存済みの表示対象タスク（親タスクと、削除していない繰り返しの例外）
+_STORED_Q = Q(is_cancelled=False) & (Q(parent_task__isnull=True) | Q(recurrence_id__isnull=False))
+
+
+def _overlapping_tasks(
+    user: AbstractBaseUser, range_start: datetime, range_end: datetime,
+) -> QuerySet:
+    """期間（time_range）が範囲に重なる保存済みのタスク。
+
+    開始・終了日時の空の側は無限に続くものとし、繰り返しの回は終了日時がなければ
+    開始日時だけの予定として扱う（どちらも time_range の生成式で済ませてある）。
+    ユーザーの絞り込みも (user_range, time_range) の GiST インデックスで引けるよう、
+    user_id の等号ではなく TASK_USER_RANGE で行う。
+    """
+    return (
+        Task.objects
+        .alias(user_range=TASK_USER_RANGE)
+        .filter(
+            _STORED_Q,
+            user_range__contains=user.pk,
+            time_range__overlap=DateTimeTZRange(range_start, range_end, '[]'),
+        )
+        .select_related('label')
+    )
+
+
 def get_day_view_tasks(user: AbstractBaseUser, day_start: datetime, day_end: datetime) -> QuerySet:
-    """日表示用タスク一覧を取得"""
-    return Task.objects.filter(
-        user=user,
-        parent_task__isnull=True,
-    ).filter(
-        Q(start_date__lte=day_end, end_date__gte=day_start) |
-        Q(start_date__lte=day_end, end_date__isnull=True) |
-        Q(start_date__isnull=True, end_date__gte=day_start)
-    ).select_related('label')
+    """日表示用タスク一覧を取得（仮想の繰り返しの回は include_occurrences で加える）"""
+    return _overlapping_tasks(user, day_start, day_end)
+
+
+def get_recurring_occurrences(
+    user: AbstractBaseUser, range_start: datetime, range_end: datetime,
+) -> list[Task]:
+    """範囲に重なる繰り返しタスクの仮想の回（保存していない Task）を取得"""
+    return recurrence.expand_occurrences(user, range_start, range_end)
+
+
+def include_occurrences(
+    tasks_qs: QuerySet,
+    user: AbstractBaseUser,
+    range_start: datetime,
+    range_end: datetime,
+) -> list[Task]:
+    """保存済みのタスクに範囲内の仮想の回を加え、開始日時順に並べる（同時刻はクエリの順）"""
+    tasks = list(tasks_qs) + get_recurring_occurrences(user, range_start, range_end)
+    tasks.sort(key=lambda task: task.start_date or _FAR_FUTURE)
+    return tasks
 
 
 def apply_filters(
@@ -122,15 +162,85 @@ def get_all_user_tasks(user: AbstractBaseUser) -> QuerySet:
 
 
 def get_month_tasks(user: AbstractBaseUser, start_date: datetime, end_date: datetime) -> QuerySet:
-    """月表示用の月範囲内タスクを取得"""
-    return Task.objects.filter(
-        user=user,
-        parent_task__isnull=True,
-    ).filter(
-        Q(start_date__range=(start_date, end_date)) |
-        Q(end_date__range=(start_date, end_date)) |
-        Q(start_date__lte=start_date, end_date__gte=end_date)
-    ).select_related('label')
+    """月表示用の月範囲内タスクを取得（仮想の繰り返しの回は含まない）"""
+    return _overlapping_tasks(user, start_date, end_date)
+
+
+def _day_index_span(
+    start: datetime | None,
+    end: datetime | None,
+    first_day: date,
+    day_count: int,
+) -> tuple[int, int] | None:
+    """期間がかかるカレンダーの日の範囲（first_day からの日数, 両端含む）をグリッド内に収めて返す。
+
+    start / end が空の側は期間の端まで続くものとして扱う（両方空なら対象外）。
+    """
+    if start is None and end is None:
+        return None
+    first = 0 if start is None else (localtime(start).date() - first_day).days
+    last = day_count - 1 if end is None else (localtime(end).date() - first_day).days
+    first, last = max(first, 0), min(last, day_count - 1)
+    if first > last:
+        return None
+    return first, last
+
+
+def _span_end(item: Task | ExternalEvent) -> datetime | None:
+    """表示上の終了日時。終了日時のない外部イベントと繰り返しの回は開始日時だけにかかる"""
+    if item.end_date or not (isinstance(item, ExternalEvent) or item.is_occurrence):
+        return item.end_date
+    return item.start_date
+
+
+def _bucket_by_day(
+    items: list,
+    spans: list[tuple[int, int] | None],
+    day_count: int,
+    limit: int,
+) -> tuple[list[list], list[int]]:
+    """表示順に並んだ項目を、spans（_day_index_span の結果）の日ごとに振り分ける。
+
+    各日に入れるのは先頭 limit 件までで、件数は差分配列で数える。
+    埋まった日は「次の空きのある日」へのポインタで飛ばすので、
+    長い期間の項目が多くても計算量はおよそ「項目数 + 日数 × limit」になる。
+    """
+    buckets: list[list] = [[] for _ in range(day_count)]
+    diff = [0] * (day_count + 1)
+    # next_open[i]: i 日目以降で最初の空きのある日（day_count は番兵）
+    next_open = list(range(day_count + 1))
+
+    def find_open(index: int) -> int:
+        root = index
+        while next_open[root] != root:
+            root = next_open[root]
+        while next_open[index] != root:
+            next_open[index], index = root, next_open[index]
+        return root
+
+    for item, span in zip(items, spans, strict=True):
+        if span is None:
+            continue
+        first, last = span
+        diff[first] += 1
+        diff[last + 1] -= 1
+        index = find_open(first)
+        while index <= last:
+            buckets[index].append(item)
+            if len(buckets[index]) >= limit:
+                next_open[index] = index + 1
+            index = find_open(index + 1)
+
+    counts: list[int] = []
+    running = 0
+    for delta in diff[:day_count]:
+        running += delta
+        counts.append(running)
+    return buckets, counts
+
+
+# 月表示の1日のセルに表示する項目数
+CALENDAR_DAY_ITEM_LIMIT = 5
 
 
 def build_calendar_data(
@@ -139,8 +249,13 @@ def build_calendar_data(
     month: int,
     week_start: str,
     external_events: list[ExternalEvent] | None = None,
+    occurrences: list[Task] | None = None,
 ) -> tuple[list[list[dict[str, object]]], list[str]]:
-    """カレンダーデータと曜日ラベルを生成（外部イベントも日別にマージする）"""
+    """カレンダーデータと曜日ラベルを生成（外部イベント・仮想の繰り返しの回も日別にマージする）
+
+    月範囲のタスクは1クエリで読み、外部イベント・仮想の回とまとめて表示順に並べてから
+    各項目の期間がかかる日に振り分ける（日ごとにクエリや全件走査はしない）。
+    """
     firstweekday = 6 if week_start == 'sunday' else 0
     cal = calendar.Calendar(firstweekday=firstweekday).monthdatescalendar(year, month)
     weekday_labels = (
@@ -148,35 +263,29 @@ def build_calendar_data(
         if week_start == 'sunday'
         else ['月', '火', '水', '木', '金', '土', '日']
     )
-    external_events = external_events or []
+    tasks = list(month_tasks.order_by('start_date')) + list(occurrences or [])
+    items = merge_tasks_and_external_events(tasks, external_events or [])
+    first_day = cal[0][0]
+    day_count = len(cal) * 7
+    spans = [
+        _day_index_span(item.start_date, _span_end(item), first_day, day_count) for item in items
+    ]
+    buckets, counts = _bucket_by_day(items, spans, day_count, CALENDAR_DAY_ITEM_LIMIT)
 
     today = date.today()
     calendar_data: list[list[dict[str, object]]] = []
     for week in cal:
         week_data: list[dict[str, object]] = []
         for d in week:
-            is_current_month = (d.month == month)
-            is_today = (d == today)
-            day_start = make_aware(datetime(d.year, d.month, d.day, 0, 0, 0))
-            day_end = make_aware(datetime(d.year, d.month, d.day, 23, 59, 59))
-            day_tasks = list(month_tasks.filter(
-                Q(start_date__lte=day_end, end_date__gte=day_start) |
-                Q(start_date__lte=day_end, end_date__isnull=True) |
-                Q(start_date__isnull=True, end_date__gte=day_start)
-            ).order_by('start_date'))
-            day_externals = [
-                event for event in external_events
-                if event.start_date <= day_end and (event.end_date or event.start_date) >= day_start
-            ]
-            day_items = merge_tasks_and_external_events(day_tasks, day_externals)
+            index = (d - first_day).days
             week_data.append({
                 'day': d.day,
                 'month': d.month,
                 'year': d.year,
-                'tasks': day_items[:5],
-                'task_count': len(day_items),
-                'is_current_month': is_current_month,
-                'is_today': is_today,
+                'tasks': buckets[index],
+                'task_count': counts[index],
+                'is_current_month': d.month == month,
+                'is_today': d == today,
             })
         calendar_data.append(week_data)
     return calendar_data, weekday_labels
@@ -202,6 +311,7 @@ def build_task_api_json(tasks: QuerySet) -> list[dict[str, object]]:
 
         tasks_data.append({
             'id': task.id,
+            'key': task.occurrence_key,
             'title': task.title,
             'description': task.description[:100] if task.description else '',
             'status': task.status,
@@ -1,60 +1,168 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
+import copy
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING
 
+from django.utils.timezone import is_naive, localtime, make_aware
+
+from ..bulk_edit import BulkTarget, bulk_delete
+from . import recurrence, selectors
 from .models import Task
 
+if TYPE_CHECKING:
+    from icalendar import Component
 
-def create_recurring_tasks(parent_task: Task) -> None:
-    """繰り返しタスクの子タスクを作成"""
-    from dateutil.relativedelta import relativedelta
+    from .models import ExternalCalendar, ExternalEvent
 
-    if not parent_task.start_date:
-        return
+# 変更されると繰り返しの各回が変わる項目（変更時は保存済みの例外を新しい規則に合わせる）
+RECURRENCE_FIELDS = frozenset({
+    'frequency', 'repeat_interval', 'repeat_count', 'start_date', 'end_date', 'all_day',
+})
+
+
+def is_recurrence_changed(previous: Task, task: Task) -> bool:
+    """繰り返しの規則（RECURRENCE_FIELDS の値）が変わったか。
+
+    日時の入力欄はフォームの changed_data に毎回含まれるため、保存前後の値で比べる。
+    """
+    return any(getattr(previous, name) != getattr(task, name) for name in RECURRENCE_FIELDS)
 
-    frequency = parent_task.frequency
-    interval = parent_task.repeat_interval or 1
-    count = parent_task.repeat_count
 
-    if not count or count <= 0:
+def sync_occurrence_exceptions(previous: Task, parent_task: Task) -> None:
+    """繰り返しの規則の変更に合わせて、保存済みの例外（子タスク）を差分だけ書き換える。
+
+    変更前後の回を日付（ローカル日付）で突き合わせる。
+    - 変更後も同じ日に回がある例外は、その回に付け替える。日時を変えていない例外は新しい日時に移す
+    - 変更後に同じ日の回がない例外は削除する。ただし完了済みのものは残す
+    追加された日の回は仮想展開されるので書き込まない。
+    """
+    exceptions = list(Task.objects.filter(parent_task=parent_task, recurrence_id__isnull=False))
+    if not exceptions:
         return
 
-    current_start = parent_task.start_date
-    current_end = parent_task.end_date
-
-    for _ in range(count):
-        if frequency == 'daily':
-            next_start = current_start + timedelta(days=interval)
-            next_end = current_end + timedelta(days=interval) if current_end else None
-        elif frequency == 'weekly':
-            next_start = current_start + timedelta(weeks=interval)
-            next_end = current_end + timedelta(weeks=interval) if current_end else None
-        elif frequency == 'monthly':
-            next_start = current_start + relativedelta(months=interval)
-            next_end = current_end + relativedelta(months=interval) if current_end else None
-        elif frequency == 'yearly':
-            next_start = current_start + relativedelta(years=interval)
-            next_end = current_end + relativedelta(years=interval) if current_end else None
-        else:
-            break
-
-        Task.objects.create(
-            user=parent_task.user,
-            title=parent_task.title,
-            frequency='',
-            repeat_interval=1,
-            priority=parent_task.priority,
-            status='not_started',
-            label=parent_task.label,
-            start_date=next_start,
-            end_date=next_end,
-            all_day=parent_task.all_day,
-            description=parent_task.description,
-            parent_task=parent_task,
-        )
+    # 変更後の規則の回（例外のある日の範囲だけ）: ローカル日付 → (開始日時, 終了日時)
+    new_dates: dict[date, tuple[datetime, datetime | None]] = {}
+    if recurrence.is_recurring(parent_task):
+        days = [localtime(exception.recurrence_id).date() for exception in exceptions]
+        range_start = make_aware(datetime.combine(min(days), time.min))
+        range_end = make_aware(datetime.combine(max(days), time.max))
+        for index in recurrence.occurrence_indexes(parent_task, range_start, range_end):
+            start, end = recurrence.occurrence_dates(parent_task, index)
+            new_dates.setdefault(start.date(), (start, end))
+
+    removed_ids: list[int] = []
+    moved: list[Task] = []
+    for exception in exceptions:
+        new = new_dates.get(localtime(exception.recurrence_id).date())
+        if new is None:
+            if exception.status != 'completed':
+                removed_ids.append(exception.pk)
+            continue
+
+        old = recurrence.find_occurrence(previous, exception.recurrence_id)
+        changed = exception.recurrence_id != new[0]
+        exception.recurrence_id = new[0]
+        if (
+            old is not None
+            and (exception.start_date, exception.end_date) == (old.start_date, old.end_date)
+            and (old.start_date, old.end_date) != new
+        ):
+            exception.start_date, exception.end_date = new
+            changed = True
+        if changed:
+            moved.append(exception)
+
+    if removed_ids:
+        Task.objects.filter(pk__in=removed_ids).delete()
+    if moved:
+        Task.objects.bulk_update(moved, ['recurrence_id', 'start_date', 'end_date'])
+
+
+def get_occurrence(parent_task: Task, recurrence_id: datetime) -> Task | None:
+    """繰り返しの回を取得する。保存済みの例外があればそれを、なければ仮想の回を返す。
+
+    規則にない日時なら None。
+    """
+    occurrence = recurrence.find_occurrence(parent_task, recurrence_id)
+    if occurrence is None:
+        return None
+    exception = (
+        Task.objects
+        .filter(parent_task=parent_task, recurrence_id=occurrence.recurrence_id)
+        .first()
+    )
+    return exception or occurrence
 
-        current_start = next_start
-        current_end = next_end
+
+def cancel_occurrence(occurrence: Task) -> None:
+    """繰り返しの回を削除する。
+
+    例外を削除済み（is_cancelled）として残し、同じ回が仮想の回として再び現れないようにする。
+    """
+    occurrence.is_cancelled = True
+    if occurrence.pk is None:
+        occurrence.save()
+    else:
+        occurrence.save(update_fields=['is_cancelled'])
+
+
+# ---------------------------------------------------------------------------
+# 一括編集・一括削除（選択モード）
+# ---------------------------------------------------------------------------
+
+def _sync_bulk_occurrences(before: list[Task], after: list[Task]) -> None:
+    """日時をずらした繰り返しの親タスクについて、保存済みの例外を新しい規則の回に合わせる。"""
+    shifted = {
+        previous.pk: previous
+        for previous, changed in zip(before, after, strict=True)
+        if recurrence.is_recurring(previous)
+        and (previous.start_date, previous.end_date) != (changed.start_date, changed.end_date)
+    }
+    if not shifted:
+        return
+    # 回の組み立てにはタイトル・ラベル等も使うので、変更後の親タスクをまとめて読み込む
+    for parent_task in Task.objects.select_related('label').filter(pk__in=list(shifted)):
+        previous = copy.copy(parent_task)
+        previous.start_date = shifted[parent_task.pk].start_date
+        previous.end_date = shifted[parent_task.pk].end_date
+        sync_occurrence_exceptions(previous, parent_task)
+
+
+# 繰り返しの子タスクは親の削除でカスケード削除されるため、削除は通常の delete() になる
+TASK_BULK_TARGET = BulkTarget(
+    Task,
+    choice_fields={
+        'priority': tuple(value for value, _ in Task.PRIORITY_CHOICES),
+        'status': tuple(value for value, _ in Task.STATUS_CHOICES),
+    },
+    owned_fields={'label': selectors.get_labels},
+    date_fields=('start_date', 'end_date'),
+    sync=_sync_bulk_occurrences,
+    sync_fields=('parent_task_id', 'frequency', 'repeat_count', 'start_date', 'end_date'),
+)
+
+
+def bulk_delete_tasks(user: object, ids: list[int]) -> int:
+    """選んだタスクを削除し、件数を返す。
+
+    繰り返しの回の例外は削除済み（is_cancelled）にする（cancel_occurrence と同じ）。
+    行ごと削除すると、同じ回が仮想の回として再び現れるため。
+    """
+    cancelled = (
+        Task.objects
+        .filter(user=user, id__in=ids, recurrence_id__isnull=False)
+        .update(is_cancelled=True)
+    )
+    remaining = list(
+        Task.objects
+        .filter(user=user, id__in=ids, recurrence_id__isnull=True)
+        .values_list('id', flat=True)
+    )
+    if not remaining:
+        return cancelled
+    return cancelled + bulk_delete(TASK_BULK_TARGET, user, remaining)
 
 
 # ---------------------------------------------------------------------------
@@ -103,26 +211,45 @@ def _format_ics_datetime(value: datetime) -> str:
     return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
 
 
+def _ics_uid(task: Task, domain: str) -> str:
+    """VEVENT の UID。
+
+    繰り返しの回は例外として保存しても変わらないよう、親タスクと元の開始日時から作る。
+    """
+    if task.recurrence_id is not None:
+        occurrence_key = recurrence.format_occurrence_key(task.recurrence_id)
+        return f'task-{task.parent_task_id}-{occurrence_key}@{domain}'
+    return f'task-{task.pk}@{domain}'
+
+
 def build_calendar_feed(user: object) -> str:
-    """ユーザーのタスクからICSカレンダーフィードを生成する。"""
+    """ユーザーのタスク（仮想の繰り返しの回を含む）からICSカレンダーフィードを生成する。"""
     from django.conf import settings
+    from django.db.models import Q
     from django.utils import timezone as django_timezone
 
     now = django_timezone.now()
     range_start = now - timedelta(days=ICS_PAST_DAYS)
     range_end = now + timedelta(days=ICS_FUTURE_DAYS)
 
-    tasks = (
+    stored_tasks = (
         Task.objects
         .filter(
+            Q(parent_task__isnull=True) | Q(recurrence_id__isnull=False),
             user=user,
-            parent_task__isnull=True,
+            is_cancelled=False,
             start_date__isnull=False,
             start_date__gte=range_start,
             start_date__lte=range_end,
         )
         .order_by('start_date')
     )
+    occurrences = [
+        occurrence
+        for occurrence in selectors.get_recurring_occurrences(user, range_start, range_end)
+        if occurrence.start_date >= range_start
+    ]
+    tasks = sorted([*stored_tasks, *occurrences], key=lambda task: task.start_date)
 
     domain = getattr(settings, 'SITE_DOMAIN', 'localhost')
     lines: list[str] = [
@@ -138,7 +265,7 @@ def build_calendar_feed(user: object) -> str:
     dtstamp = _format_ics_datetime(now)
     for task in tasks:
         lines.append('BEGIN:VEVENT')
-        lines.append(f'UID:task-{task.pk}@{domain}')
+        lines.append(f'UID:{_ics_uid(task, domain)}')
         lines.append(f'DTSTAMP:{dtstamp}')
         if task.all_day:
             start_date = django_timezone.localtime(task.start_date).date()
@@ -176,6 +303,14 @@ EXTERNAL_SYNC_PAST_DAYS = 30
 EXTERNAL_SYNC_FUTURE_DAYS = 370
 
 
+@dataclass(frozen=True)
+class IcsFetchResult:
+    """ICSの取得結果。content が None なら前回から変更なし（304 Not Modified）。"""
+    content: bytes | None
+    etag: str = ''
+    last_modified: str = ''
+
+
 def normalize_external_calendar_url(url: str) -> str:
     """外部カレンダーURLを正規化して検証する。
 
@@ -211,12 +346,22 @@ def _assert_public_host(hostname: str) -> None:
             raise ValueError('このURLへのアクセスは許可されていません。')
 
 
-def fetch_external_ics(url: str) -> bytes:
-    """外部カレンダーのICSを取得する（リダイレクトごとにURLを再検証）。"""
+def fetch_external_ics(url: str, *, etag: str = '', last_modified: str = '') -> IcsFetchResult:
+    """外部カレンダーのICSを取得する（リダイレクトごとにURLを再検証）。
+
+    前回の応答の ETag / Last-Modified を渡すと条件付きで取得し、
+    304 が返れば本文を読まずに content=None の結果を返す。
+    """
     from urllib.parse import urljoin, urlparse
 
     import requests
 
+    headers = {'User-Agent': 'carbohydratepro-calendar-sync/1.0'}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
     for _ in range(EXTERNAL_MAX_REDIRECTS + 1):
         url = normalize_external_calendar_url(url)
         _assert_public_host(urlparse(url).hostname or '')
@@ -225,7 +370,7 @@ def fetch_external_ics(url: str) -> bytes:
             timeout=EXTERNAL_FETCH_TIMEOUT_SECONDS,
             allow_redirects=False,
             stream=True,
-            headers={'User-Agent': 'carbohydratepro-calendar-sync/1.0'},
+            headers=headers,
         )
         if response.is_redirect or response.is_permanent_redirect:
             location = response.headers.get('Location')
@@ -233,23 +378,91 @@ def fetch_external_ics(url: str) -> bytes:
                 raise ValueError('不正なリダイレクト応答を受信しました。')
             url = urljoin(url, location)
             continue
+        if response.status_code == 304:
+            return IcsFetchResult(
+                None,
+                response.headers.get('ETag', etag)[:255],
+                response.headers.get('Last-Modified', last_modified)[:100],
+            )
         response.raise_for_status()
         content = b''
         for chunk in response.iter_content(chunk_size=64 * 1024):
             content += chunk
             if len(content) > EXTERNAL_MAX_ICS_BYTES:
                 raise ValueError('ICSファイルが大きすぎます（5MB上限）。')
-        return content
+        return IcsFetchResult(
+            content,
+            response.headers.get('ETag', '')[:255],
+            response.headers.get('Last-Modified', '')[:100],
+        )
     raise ValueError('リダイレクトが多すぎます。')
 
 
+def _aware_ics_datetime(value: date | datetime) -> datetime:
+    """ICSの日時（終日は日付）を aware datetime にする。日付は0時、naive はローカル時刻とみなす。"""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    return make_aware(value) if is_naive(value) else value
+
+
+def _build_external_event(
+    external_calendar: ExternalCalendar, component: Component,
+) -> ExternalEvent | None:
+    """展開済みの VEVENT から保存前の ExternalEvent を作る（DTSTART がなければ None）。"""
+    from .models import ExternalEvent
+
+    dtstart = component.get('DTSTART')
+    if dtstart is None:
+        return None
+    start = dtstart.dt
+    dtend = component.get('DTEND')
+    end = dtend.dt if dtend is not None else None
+
+    all_day = not isinstance(start, datetime)
+    start = _aware_ics_datetime(start)
+    if all_day:
+        if end is not None and not isinstance(end, datetime):
+            # 終日イベントのDTENDは排他的（翌日）なので1秒引いて包含にする
+            end = _aware_ics_datetime(end) - timedelta(seconds=1)
+        else:
+            end = start + timedelta(days=1) - timedelta(seconds=1)
+    elif end is not None:
+        end = _aware_ics_datetime(end)
+
+    recurrence_id = component.get('RECURRENCE-ID')
+    title = str(component.get('SUMMARY', '')).strip() or '（無題）'
+    return ExternalEvent(
+        calendar=external_calendar,
+        uid=str(component.get('UID', ''))[:500],
+        recurrence_id=_aware_ics_datetime(recurrence_id.dt) if recurrence_id is not None else None,
+        title=title[:300],
+        start_date=start,
+        end_date=end,
+        all_day=all_day,
+    )
+
+
+def _external_event_key(event: ExternalEvent) -> tuple[str, datetime | None, datetime]:
+    """前回のイベントと突き合わせるキー (uid, recurrence_id, start_date)。"""
+    return event.uid, event.recurrence_id, event.start_date
+
+
+# キーが同じイベントで変わりうる項目
+_EXTERNAL_EVENT_FIELDS = ('title', 'end_date', 'all_day')
+
+
 def sync_external_calendar(external_calendar: 'ExternalCalendar') -> int:
     """外部カレンダーを同期し、取り込んだイベント数を返す。
 
-    購読範囲（過去30日〜未来370日）のイベントを洗い替えする。
+    購読範囲（過去30日〜未来370日）のイベントを取り込む。
     繰り返し（RRULE）は recurring_ical_events で個別イベントに展開する。
+
+    購読範囲は日ごとに進むので、今日すでに取り込んでいれば前回の ETag / Last-Modified で
+    条件付き取得し、304 か内容のハッシュが同じなら解析も書き込みもしない。
+    内容が変わっていれば (uid, recurrence_id, start_date) で前回のイベントと突き合わせ、
+    追加・変更・削除されたイベントだけを書き込む。
     """
-    from datetime import time as time_cls
+    import hashlib
 
     import recurring_ical_events
     from django.db import transaction
@@ -261,51 +474,63 @@ def sync_external_calendar(external_calendar: 'ExternalCalendar') -> int:
     now_local = django_timezone.localtime()
     range_start = now_local - timedelta(days=EXTERNAL_SYNC_PAST_DAYS)
     range_end = now_local + timedelta(days=EXTERNAL_SYNC_FUTURE_DAYS)
+    synced_today = external_calendar.content_synced_on == now_local.date()
 
-    content = fetch_external_ics(external_calendar.url)
-    ical = ICalCalendar.from_ical(content)
+    fetched = fetch_external_ics(
+        external_calendar.url,
+        etag=external_calendar.etag if synced_today else '',
+        last_modified=external_calendar.last_modified if synced_today else '',
+    )
+    external_calendar.etag = fetched.etag
+    external_calendar.last_modified = fetched.last_modified
+    external_calendar.last_synced_at = django_timezone.now()
+    external_calendar.last_error = ''
+    update_fields = ['etag', 'last_modified', 'last_synced_at', 'last_error']
+
+    content_hash = (
+        hashlib.sha256(fetched.content).hexdigest() if fetched.content is not None else ''
+    )
+    if fetched.content is None or (synced_today and content_hash == external_calendar.content_hash):
+        external_calendar.save(update_fields=update_fields)
+        return external_calendar.events.count()
+
+    ical = ICalCalendar.from_ical(fetched.content)
     occurrences = recurring_ical_events.of(ical).between(range_start, range_end)
 
-    events: list[ExternalEvent] = []
+    # キー → 取り込むイベント（キーが重複すれば先のものを使う）
+    incoming: dict[tuple[str, datetime | None, datetime], ExternalEvent] = {}
     for component in occurrences[:EXTERNAL_MAX_EVENTS]:
-        dtstart = component.get('DTSTART')
-        if dtstart is None:
-            continue
-        start = dtstart.dt
-        dtend = component.get('DTEND')
-        end = dtend.dt if dtend is not None else None
-
-        all_day = not isinstance(start, datetime)
-        if all_day:
-            start = django_timezone.make_aware(datetime.combine(start, time_cls.min))
-            if end is not None and not isinstance(end, datetime):
-                # 終日イベントのDTENDは排他的（翌日）なので1秒引いて包含にする
-                end = django_timezone.make_aware(datetime.combine(end, time_cls.min)) - timedelta(seconds=1)
-            else:
-                end = start + timedelta(days=1) - timedelta(seconds=1)
-        else:
-            if django_timezone.is_naive(start):
-                start = django_timezone.make_aware(start)
-            if end is not None and django_timezone.is_naive(end):
-                end = django_timezone.make_aware(end)
-
-        title = str(component.get('SUMMARY', '')).strip() or '（無題）'
-        events.append(ExternalEvent(
-            calendar=external_calendar,
-            uid=str(component.get('UID', ''))[:500],
-            title=title[:300],
-            start_date=start,
-            end_date=end,
-            all_day=all_day,
-        ))
+        event = _build_external_event(external_calendar, component)
+        if event is not None:
+            incoming.setdefault(_external_event_key(event), event)
+    event_count = len(incoming)
 
     with transaction.atomic():
-        external_calendar.events.all().delete()
-        ExternalEvent.objects.bulk_create(events)
-        external_calendar.last_synced_at = django_timezone.now()
-        external_calendar.last_error = ''
-        external_calendar.save(update_fields=['last_synced_at', 'last_error'])
-    return len(events)
+        changed: list[ExternalEvent] = []
+        removed_ids: list[int] = []
+        for existing in external_calendar.events.all():
+            event = incoming.pop(_external_event_key(existing), None)
+            if event is None:
+                removed_ids.append(existing.pk)
+                continue
+            modified = any(
+                getattr(existing, name) != getattr(event, name) for name in _EXTERNAL_EVENT_FIELDS
+            )
+            if modified:
+                for name in _EXTERNAL_EVENT_FIELDS:
+                    setattr(existing, name, getattr(event, name))
+                changed.append(existing)
+
+        if removed_ids:
+            ExternalEvent.objects.filter(pk__in=removed_ids).delete()
+        if changed:
+            ExternalEvent.objects.bulk_update(changed, list(_EXTERNAL_EVENT_FIELDS))
+        ExternalEvent.objects.bulk_create(incoming.values())
+
+        external_calendar.content_hash = content_hash
+        external_calendar.content_synced_on = now_local.date()
+        external_calendar.save(update_fields=[*update_fields, 'content_hash', 'content_synced_on'])
+    return event_count
 
 
 def sync_external_calendar_safe(external_calendar: 'ExternalCalendar') -> tuple[bool, str]:
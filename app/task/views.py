@@ -1,18 +1,19 @@
+import copy
 import json
 from datetime import datetime, timedelta
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.timezone import make_aware
 
-from django.db import IntegrityError, transaction
-
+from . import selectors, services
 from .forms import ExternalCalendarForm, TaskForm, TaskLabelForm
 from .models import CalendarToken, ExternalCalendar, Task, TaskLabel, TempTaskItem, TempTaskSet
-from . import selectors, services
+from .recurrence import parse_occurrence_key
 
 
 @login_required
@@ -42,7 +43,10 @@ def task_list(request: HttpRequest) -> HttpResponse:
         tasks_qs = tasks_qs.order_by('start_date', 'priority')
 
         external_events = selectors.get_external_events(request.user, day_start, day_end)
-        day_items = list(tasks_qs) + external_events
+        day_items = (
+            selectors.include_occurrences(tasks_qs, request.user, day_start, day_end)
+            + external_events
+        )
         gantt_data = selectors.build_gantt_data(day_items, day_start, day_end)
 
         return render(request, 'app/task/list.html', {
@@ -63,9 +67,10 @@ def task_list(request: HttpRequest) -> HttpResponse:
     extended_end = end_date + timedelta(days=7)
     month_tasks = selectors.get_month_tasks(request.user, extended_start, extended_end)
     external_events = selectors.get_external_events(request.user, extended_start, extended_end)
+    occurrences = selectors.get_recurring_occurrences(request.user, extended_start, extended_end)
     calendar_data, weekday_labels = selectors.build_calendar_data(
         month_tasks, target_date.year, target_date.month, week_start,
-        external_events=external_events,
+        external_events=external_events, occurrences=occurrences,
     )
 
     return render(request, 'app/task/list.html', {
@@ -88,9 +93,6 @@ def create_task(request: HttpRequest) -> HttpResponse:
             task.user = request.user
             task.save()
 
-            if task.frequency and task.frequency != '':
-                services.create_recurring_tasks(task)
-
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({'success': True})
             return redirect('task_list')
@@ -103,19 +105,47 @@ def create_task(request: HttpRequest) -> HttpResponse:
     return render(request, 'app/task/create_modal.html', {'form': form})
 
 
+def _get_occurrence_or_404(request: HttpRequest, task_id: int, occurrence: str) -> Task:
+    """URL の「親タスクID/元の開始日時」が指す繰り返しの回（例外か仮想の回）を取得"""
+    parent_task = get_object_or_404(Task, id=task_id, user=request.user, parent_task__isnull=True)
+    recurrence_id = parse_occurrence_key(occurrence)
+    task = services.get_occurrence(parent_task, recurrence_id) if recurrence_id else None
+    if task is None or task.is_cancelled:
+        raise Http404
+    return task
+
+
 @login_required
 def edit_task(request: HttpRequest, task_id: int) -> HttpResponse:
     """タスク編集"""
     task = get_object_or_404(Task, id=task_id, user=request.user)
+    return _edit_task_response(request, task)
+
+
+@login_required
+def edit_task_occurrence(request: HttpRequest, task_id: int, occurrence: str) -> HttpResponse:
+    """繰り返しタスクの1回分の編集（保存すると、その回だけの例外として保存される）"""
+    task = _get_occurrence_or_404(request, task_id, occurrence)
+    return _edit_task_response(request, task)
 
+
+def _edit_task_response(request: HttpRequest, task: Task) -> HttpResponse:
+    """タスク（または繰り返しの1回分）の編集フォームの表示と保存"""
+    # 規則の変更前の内容（フォームの検証でインスタンスが書き換わるため先に写す）
+    previous = copy.copy(task)
+    is_parent = task.pk is not None and task.parent_task_id is None
     if request.method == 'POST':
         form = TaskForm(request.POST, instance=task, user=request.user)
         if form.is_valid():
-            updated_task = form.save()
+            updated_task = form.save(commit=False)
+            if updated_task.parent_task_id:
+                # 繰り返しの回は規則を持たない
+                updated_task.frequency = ''
+            updated_task.save()
 
-            if updated_task.frequency and updated_task.frequency != '':
-                Task.objects.filter(parent_task=updated_task).delete()
-                services.create_recurring_tasks(updated_task)
+            # 規則が変わったら、保存済みの例外を新しい規則の回に合わせる（差分だけ書き込む）
+            if is_parent and services.is_recurrence_changed(previous, updated_task):
+                services.sync_occurrence_exceptions(previous, updated_task)
 
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({'success': True})
@@ -135,12 +165,49 @@ def delete_task(request: HttpRequest, task_id: int) -> HttpResponse:
     task = get_object_or_404(Task, id=task_id, user=request.user)
 
     if request.method == 'POST':
-        task.delete()
+        if task.recurrence_id is not None:
+            services.cancel_occurrence(task)
+        else:
+            task.delete()
         return redirect('task_list')
 
     return redirect('task_list')
 
 
+@login_required
+def delete_task_occurrence(request: HttpRequest, task_id: int, occurrence: str) -> HttpResponse:
+    """繰り返しタスクの1回分の削除（他の回はそのまま）"""
+    task = _get_occurrence_or_404(request, task_id, occurrence)
+
+    if request.method == 'POST':
+        services.cancel_occurrence(task)
+
+    return redirect('task_list')
+
+
+@login_required
+def bulk_delete_tasks(request: HttpRequest) -> JsonResponse:
+    """タスクの一括削除（繰り返しの子タスクも削除される。繰り返しの回は削除済みにする）"""
+    from ..bulk_edit import load_payload, parse_ids
+    payload, error_response = load_payload(request)
+    if error_response is not None:
+        return error_response
+
+    ids = parse_ids(payload)
+    if ids is None:
+        return JsonResponse({'success': False, 'error': 'invalid_ids'}, status=400)
+    if not ids:
+        return JsonResponse({'success': True, 'deleted': 0})
+    return JsonResponse({'success': True, 'deleted': services.bulk_delete_tasks(request.user, ids)})
+
+
+@login_required
+def bulk_edit_tasks(request: HttpRequest) -> JsonResponse:
+    """タスクの一括編集（ラベル・優先度・ステータスの変更、日時の移動）"""
+    from ..bulk_edit import bulk_edit_response
+    return bulk_edit_response(request, services.TASK_BULK_TARGET)
+
+
 @login_required
 def get_day_tasks(request: HttpRequest, date: str) -> JsonResponse:
     """指定日のタスクを取得（API）"""
@@ -149,7 +216,10 @@ def get_day_tasks(request: HttpRequest, date: str) -> JsonResponse:
         day_start = make_aware(datetime(target_date.year, target_date.month, target_date.day, 0, 0, 0))
         day_end = make_aware(datetime(target_date.year, target_date.month, target_date.day, 23, 59, 59))
 
-        tasks = selectors.get_day_view_tasks(request.user, day_start, day_end).order_by('start_date')
+        tasks_qs = (
+            selectors.get_day_view_tasks(request.user, day_start, day_end).order_by('start_date')
+        )
+        tasks = selectors.include_occurrences(tasks_qs, request.user, day_start, day_end)
         tasks_data = selectors.build_task_api_json(tasks)
         external_events = selectors.get_external_events(request.user, day_start, day_end)
         tasks_data.extend(selectors.build_external_api_json(external_events))
@@ -19,3 +19,4 @@ from .test_dashboard import *
 from .test_calendar_feed import *
 from .test_external_calendar import *
 from .test_bulk_delete import *
+from .test_bulk_edit import *
@@ -0,0 +1,235 @@
+"""
+選択モード＋一括編集エンドポイント（と一括削除のクエリ数）のテスト
+"""
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app.expenses.models import MonthlyLedgerSummary, Transaction
+from app.memo.models import Memo, MemoType
+from app.shopping.models import ShoppingItem
+from app.task.models import Task
+from tests.factories import (
+    CategoryFactory,
+    MemoFactory,
+    PaymentMethodFactory,
+    ShoppingItemFactory,
+    TaskFactory,
+    TaskLabelFactory,
+    TransactionFactory,
+    UserFactory,
+)
+
+
+def _statements(ctx: CaptureQueriesContext, prefix: str) -> int:
+    return sum(query['sql'].startswith(prefix) for query in ctx.captured_queries)
+
+
+class BulkEditTransactionTest(TestCase):
+    """取引の一括編集・一括削除"""
+
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.category = CategoryFactory(user=self.user)
+        self.payment_method = PaymentMethodFactory(user=self.user)
+        self.transactions = [
+            TransactionFactory(
+                user=self.user, category=self.category, payment_method=self.payment_method,
+                amount=Decimal('1000'), transaction_type='expense',
+                date=timezone.make_aware(datetime(2025, 3, 31, 12)),
+            )
+            for _ in range(3)
+        ]
+
+    def _post(self, url_name: str, payload: dict) -> dict:
+        response = self.client.post(
+            reverse(url_name), json.dumps(payload), content_type='application/json',
+        )
+        return response.json()
+
+    def test_recategorize_and_shift_in_one_update(self) -> None:
+        """カテゴリ変更と日付の移動を1回の UPDATE で行い、月次集計を移し替える"""
+        new_category = CategoryFactory(user=self.user)
+        ids = [t.id for t in self.transactions[:2]]
+        with CaptureQueriesContext(connection) as ctx:
+            body = self._post('bulk_edit_expenses', {
+                'ids': ids, 'changes': {'category': new_category.id, 'shift_days': 1},
+            })
+
+        self.assertEqual(body, {'success': True, 'updated': 2})
+        self.assertEqual(_statements(ctx, 'UPDATE "app_transaction"'), 1)
+        moved = Transaction.objects.filter(id__in=ids)
+        self.assertEqual({t.category_id for t in moved}, {new_category.id})
+        self.assertEqual({timezone.localtime(t.date).date() for t in moved}, {date(2025, 4, 1)})
+
+        summaries = {
+            (row.year_month, row.category_id): (row.amount, row.transaction_count)
+            for row in MonthlyLedgerSummary.objects.filter(user=self.user)
+        }
+        self.assertEqual(summaries, {
+            (date(2025, 3, 1), self.category.id): (Decimal('1000'), 1),
+            (date(2025, 4, 1), new_category.id): (Decimal('2000'), 2),
+        })
+
+    def test_rejects_other_users_category(self) -> None:
+        """他ユーザーのカテゴリや未知の項目は指定できない"""
+        other_category = CategoryFactory()
+        body = self._post('bulk_edit_expenses', {
+            'ids': [self.transactions[0].id], 'changes': {'category': other_category.id},
+        })
+        self.assertEqual(body['error'], 'invalid_category')
+        body = self._post('bulk_edit_expenses', {
+            'ids': [self.transactions[0].id], 'changes': {'amount': 1},
+        })
+        self.assertEqual(body['error'], 'unknown_field')
+        self.assertEqual(Transaction.objects.filter(category=self.category).count(), 3)
+
+    def test_other_users_rows_are_not_updated(self) -> None:
+        """他ユーザーの取引は ID を指定しても変更されない"""
+        other = TransactionFactory(major_category='variable')
+        body = self._post('bulk_edit_expenses', {
+            'ids': [other.id, self.transactions[0].id], 'changes': {'major_category': 'special'},
+        })
+        self.assertEqual(body['updated'], 1)
+        other.refresh_from_db()
+        self.assertEqual(other.major_category, 'variable')
+
+    def test_delete_with_single_statement(self) -> None:
+        """削除は DELETE 1回で行い、シグナルの代わりに月次集計を差し引く"""
+        ids = [t.id for t in self.transactions]
+        with CaptureQueriesContext(connection) as ctx:
+            body = self._post('bulk_delete_expenses', {'ids': ids})
+
+        self.assertEqual(body['deleted'], 3)
+        self.assertEqual(_statements(ctx, 'DELETE FROM "app_transaction"'), 1)
+        self.assertFalse(Transaction.objects.filter(id__in=ids).exists())
+        self.assertFalse(MonthlyLedgerSummary.objects.filter(user=self.user).exists())
+
+
+class BulkEditOtherModelsTest(TestCase):
+    """メモ・買い物アイテム・タスクの一括編集・一括削除"""
+
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def _post(self, url_name: str, payload: dict) -> dict:
+        response = self.client.post(
+            reverse(url_name), json.dumps(payload), content_type='application/json',
+        )
+        return response.json()
+
+    def test_memo_type_and_favorite(self) -> None:
+        """共有のメモ種別には変更でき、他ユーザーの種別には変更できない"""
+        memos = [MemoFactory(user=self.user) for _ in range(2)]
+        shared = MemoType.objects.create(user=None, name='共有')
+        body = self._post('bulk_edit_memos', {
+            'ids': [m.id for m in memos], 'changes': {'memo_type': shared.id, 'is_favorite': True},
+        })
+        self.assertEqual(body['updated'], 2)
+        self.assertEqual(
+            set(Memo.objects.values_list('memo_type_id', 'is_favorite')), {(shared.id, True)},
+        )
+
+        other_type = MemoType.objects.create(user=UserFactory(), name='他人')
+        body = self._post(
+            'bulk_edit_memos', {'ids': [memos[0].id], 'changes': {'memo_type': other_type.id}},
+        )
+        self.assertEqual(body['error'], 'invalid_memo_type')
+
+    def test_memo_delete_is_single_statement(self) -> None:
+        """カスケードもシグナルもないモデルは DELETE 1回で削除する"""
+        ids = [MemoFactory(user=self.user).id for _ in range(3)]
+        with CaptureQueriesContext(connection) as ctx:
+            body = self._post('bulk_delete_memos', {'ids': ids})
+        self.assertEqual(body['deleted'], 3)
+        self.assertEqual(_statements(ctx, 'DELETE FROM "app_memo"'), 1)
+        self.assertEqual(_statements(ctx, 'SELECT COUNT'), 0)
+
+    def test_shopping_choices(self) -> None:
+        """選択肢にない値はエラー"""
+        item = ShoppingItemFactory(user=self.user)
+        body = self._post(
+            'bulk_edit_shopping_items', {'ids': [item.id], 'changes': {'is_checked': True}},
+        )
+        self.assertEqual(body['updated'], 1)
+        self.assertTrue(ShoppingItem.objects.get(id=item.id).is_checked)
+        body = self._post(
+            'bulk_edit_shopping_items', {'ids': [item.id], 'changes': {'frequency': 'weekly'}},
+        )
+        self.assertEqual(body['error'], 'invalid_frequency')
+
+    def test_task_shift_and_clear_label(self) -> None:
+        """タスクの開始・終了日時をずらし、ラベルを外せる（日時が空のタスクはそのまま）"""
+        label = TaskLabelFactory(user=self.user)
+        start = timezone.make_aware(datetime(2025, 5, 1, 9))
+        scheduled = TaskFactory(user=self.user, label=label, start_date=start, end_date=start)
+        unscheduled = TaskFactory(user=self.user, label=label)
+        body = self._post('bulk_edit_tasks', {
+            'ids': [scheduled.id, unscheduled.id], 'changes': {'shift_days': -2, 'label': None},
+        })
+        self.assertEqual(body['updated'], 2)
+        scheduled.refresh_from_db()
+        unscheduled.refresh_from_db()
+        self.assertEqual(scheduled.start_date, timezone.make_aware(datetime(2025, 4, 29, 9)))
+        self.assertIsNone(scheduled.label_id)
+        self.assertIsNone(unscheduled.start_date)
+
+    def test_task_delete_cascades_to_children(self) -> None:
+        """繰り返しの子タスクを持つタスクは、子タスクも含めて削除する"""
+        parent = TaskFactory(user=self.user)
+        TaskFactory(user=self.user, parent_task=parent)
+        body = self._post('bulk_delete_tasks', {'ids': [parent.id]})
+        self.assertEqual(body['deleted'], 2)
+        self.assertFalse(Task.objects.filter(user=self.user).exists())
+
+    def _recurring_parent(self) -> Task:
+        start = timezone.make_aware(datetime(2025, 5, 1, 9))
+        return TaskFactory(
+            user=self.user, start_date=start, end_date=start, frequency='weekly', repeat_count=3,
+        )
+
+    def test_task_shift_recurring_parent_syncs_exceptions(self) -> None:
+        """繰り返しの親タスクの日時をずらすと、保存済みの例外も新しい規則の回に合わせる"""
+        from app.task import services
+
+        parent = self._recurring_parent()
+        edited = services.get_occurrence(parent, parent.start_date + timedelta(weeks=1))
+        edited.title = '変更した回'
+        edited.save()
+        completed = services.get_occurrence(parent, parent.start_date + timedelta(weeks=2))
+        completed.status = 'completed'
+        completed.save()
+
+        body = self._post('bulk_edit_tasks', {'ids': [parent.id], 'changes': {'shift_days': 1}})
+        self.assertEqual(body['updated'], 1)
+        # 同じ日の回がなくなった未完了の例外は削除し、完了済みの例外は残す
+        self.assertFalse(Task.objects.filter(id=edited.id).exists())
+        self.assertTrue(Task.objects.filter(id=completed.id).exists())
+
+    def test_task_bulk_delete_cancels_occurrence(self) -> None:
+        """繰り返しの回（例外）は削除済みにし、仮想の回として再び現れないようにする"""
+        from app.task import recurrence, services
+
+        parent = self._recurring_parent()
+        occurrence = services.get_occurrence(parent, parent.start_date + timedelta(weeks=1))
+        occurrence.title = '変更した回'
+        occurrence.save()
+
+        body = self._post('bulk_delete_tasks', {'ids': [occurrence.id]})
+        self.assertEqual(body['deleted'], 1)
+        occurrence.refresh_from_db()
+        self.assertTrue(occurrence.is_cancelled)
+        expanded = recurrence.expand_occurrences(
+            self.user, parent.start_date, parent.start_date + timedelta(weeks=3),
+        )
+        self.assertNotIn(occurrence.recurrence_id, [task.recurrence_id for task in expanded])
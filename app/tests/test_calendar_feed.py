@@ -2,12 +2,13 @@
 ICSカレンダー配信のテスト
 """
 import uuid
-from datetime import datetime, time, timedelta
+from datetime import UTC, datetime, time, timedelta
 
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
+from app.task import services
 from app.task.models import CalendarToken
 from tests.factories import TaskFactory, UserFactory
 
@@ -79,6 +80,26 @@ class CalendarFeedTest(TestCase):
         content = self.client.get(self._feed_url()).content.decode('utf-8')
         self.assertIn('SUMMARY:買い物\\, 銀行\\; 郵便局', content)
 
+    def test_recurring_task_occurrences(self) -> None:
+        """繰り返しの回は個別のイベントになり、削除した回は含まれないこと"""
+        start = aware(1, 9)
+        parent = TaskFactory(
+            user=self.user, title='朝会', frequency='weekly', repeat_interval=1, repeat_count=2,
+            start_date=start, end_date=start + timedelta(hours=1),
+        )
+        second = services.get_occurrence(parent, start + timedelta(weeks=1))
+        second.status = 'completed'
+        second.save()
+        services.cancel_occurrence(services.get_occurrence(parent, start + timedelta(weeks=2)))
+
+        content = self.client.get(self._feed_url()).content.decode('utf-8')
+        self.assertEqual(content.count('SUMMARY:朝会'), 2)
+        self.assertIn(f'UID:task-{parent.pk}@example.com', content)
+        # 例外として保存した回も、仮想の回と同じ UID を使う
+        key = (start + timedelta(weeks=1)).astimezone(UTC).strftime('%Y%m%dT%H%M%SZ')
+        self.assertIn(f'UID:task-{parent.pk}-{key}@example.com', content)
+        self.assertIn('STATUS:COMPLETED', content)
+
     def test_regenerate_invalidates_old_token(self) -> None:
         """再生成後は旧トークンが無効になること"""
         old_token = self.token.token
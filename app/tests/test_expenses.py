@@ -2,14 +2,17 @@
 支出管理機能のテスト
 """
 import json
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+from unittest.mock import patch
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
-from app.expenses.models import Category, PaymentMethod, Transaction, RecurringPayment
+from app.expenses.models import (
+    Category, PaymentMethod, Transaction, RecurringPayment, SpendingCurve,
+)
 from app.expenses.forms import TransactionForm, PaymentMethodForm, CategoryForm, RecurringPaymentForm
 from app.expenses import services
 from tests.factories import UserFactory, PaymentMethodFactory, CategoryFactory, TransactionFactory, RecurringPaymentFactory
@@ -288,6 +291,98 @@ class CategoryChartColorTest(TestCase):
         self.assertIn(selectors.get_category_default_color(category.id), colors)
 
 
+class BreakdownChartTest(TestCase):
+    """上位N件＋その他の内訳グラフ（カテゴリ・支払方法・用途）のテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import selectors
+
+        self.selectors = selectors
+        self.user = UserFactory()
+        self.payment = PaymentMethodFactory(user=self.user, name='現金')
+
+    def _expense(self, amount: str, **kwargs) -> None:
+        kwargs.setdefault('category', CategoryFactory(user=self.user))
+        kwargs.setdefault('payment_method', self.payment)
+        TransactionFactory(
+            user=self.user, transaction_type='expense', amount=Decimal(amount), **kwargs,
+        )
+
+    def test_top_n_and_other_in_one_query(self) -> None:
+        """GROUP BY は1回だけで、上位5件と残りの合計を返す"""
+        for amount in ('700', '600', '500', '400', '300', '200', '100'):
+            self._expense(amount)
+        transactions = Transaction.objects.filter(user=self.user, transaction_type='expense')
+        with self.assertNumQueries(1):
+            top_rows, other_total = self.selectors.aggregate_top_n(transactions, ('category__id',))
+        self.assertEqual(
+            [row['total'] for row in top_rows],
+            [Decimal(a) for a in ('700', '600', '500', '400', '300')],
+        )
+        self.assertEqual(other_total, Decimal('300'))
+
+        transactions = Transaction.objects.filter(user=self.user)
+        with self.assertNumQueries(1):
+            data = json.loads(self.selectors.build_category_chart_data(transactions))
+        self.assertEqual(data['labels'][-1], 'その他')
+        self.assertEqual(data['datasets'][0]['data'], [700.0, 600.0, 500.0, 400.0, 300.0, 300.0])
+
+    def test_payment_method_chart(self) -> None:
+        """支払方法別の支出（収入は含めない）"""
+        card = PaymentMethodFactory(user=self.user, name='カード')
+        self._expense('1000', payment_method=card)
+        self._expense('300')
+        TransactionFactory(
+            user=self.user, payment_method=self.payment,
+            transaction_type='income', amount=Decimal('5000'),
+        )
+        transactions = Transaction.objects.filter(user=self.user)
+        data = json.loads(self.selectors.build_payment_method_chart_data(transactions))
+        self.assertEqual(data['labels'], ['カード', '現金'])
+        self.assertEqual(data['datasets'][0]['data'], [1000.0, 300.0])
+
+    def test_purpose_chart_groups_by_purpose(self) -> None:
+        """同じ用途の支出はカテゴリが違ってもまとめる"""
+        self._expense('400', purpose='ランチ')
+        self._expense('600', purpose='ランチ')
+        self._expense('800', purpose='とても長い用途の名前がここに入る')
+        transactions = Transaction.objects.filter(user=self.user)
+        data = json.loads(self.selectors.build_purpose_chart_data(transactions))
+        self.assertEqual(data['labels'], ['ランチ', 'とても長い用途の名前...'])
+        self.assertEqual(data['datasets'][0]['data'], [1000.0, 800.0])
+
+    def test_empty_breakdown(self) -> None:
+        transactions = Transaction.objects.none()
+        data = json.loads(self.selectors.build_payment_method_chart_data(transactions))
+        self.assertEqual(data['labels'], ['データなし'])
+
+    def test_major_category_chart_in_one_query(self) -> None:
+        """大分類別グラフは1クエリで作り、支出がなければ「データなし」"""
+        self._expense('300', major_category='fixed')
+        self._expense('500', major_category='variable')
+        transactions = Transaction.objects.filter(user=self.user)
+        with self.assertNumQueries(1):
+            data = json.loads(self.selectors.build_major_category_chart_data(transactions))
+        self.assertEqual(data['labels'], ['変動費', '固定費'])
+        self.assertEqual(data['datasets'][0]['data'], [500.0, 300.0])
+
+        with self.assertNumQueries(1):
+            data = json.loads(self.selectors.build_major_category_chart_data(
+                Transaction.objects.filter(user=self.user, transaction_type='income'),
+            ))
+        self.assertEqual(data['labels'], ['データなし'])
+
+    def test_breakdown_endpoints(self) -> None:
+        """グラフデータ API から支払方法別・用途別の内訳を取得できる"""
+        self._expense('1200', purpose='ランチ', date=timezone.now())
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('expense_chart_data', args=['payment_method']))
+        self.assertEqual(response.json()['labels'], ['現金'])
+        response = client.get(reverse('expense_chart_data', args=['purpose']))
+        self.assertEqual(response.json()['datasets'][0]['data'], [1200.0])
+
+
 class ExpensesViewTest(TestCase):
     """支出管理ビューのテスト"""
 
@@ -620,6 +715,103 @@ class ExpensesAjaxViewTest(TestCase):
         self.assertTrue(response.json().get('success'))
 
 
+class TransactionBatchCreateTest(TestCase):
+    """取引の一括登録 API のテスト"""
+
+    def setUp(self) -> None:
+        self.client = Client()
+        self.user = UserFactory()
+        self.payment_method = PaymentMethodFactory(user=self.user)
+        self.category = CategoryFactory(user=self.user)
+        self.client.force_login(self.user)
+
+    def _row(self, **overrides: object) -> dict[str, object]:
+        return {
+            'date': '2025-03-10',
+            'amount': '480',
+            'purpose': 'コーヒー豆',
+            'transaction_type': 'expense',
+            'major_category': 'variable',
+            'category': self.category.id,
+            'payment_method': self.payment_method.id,
+            **overrides,
+        }
+
+    def _post(self, payload: object) -> object:
+        return self.client.post(
+            reverse('batch_create_expenses'), json.dumps(payload), content_type='application/json',
+        )
+
+    def test_creates_rows_with_one_insert(self) -> None:
+        """カテゴリ・支払方法は1回ずつ読み、取引は1回の INSERT で登録する"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from app.expenses.models import MonthlyLedgerSummary
+
+        rows = [self._row(purpose=f'品目{i}', amount=str(100 * (i + 1))) for i in range(10)]
+        rows[0]['purpose_description'] = 'レシート'
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._post({'rows': rows})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['created'], 10)
+        self.assertEqual(
+            sorted(data['ids']), sorted(Transaction.objects.values_list('id', flat=True)),
+        )
+        sqls = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual(sum(sql.startswith('INSERT INTO "app_transaction"') for sql in sqls), 1)
+        self.assertEqual(sum('FROM "app_category"' in sql for sql in sqls), 1)
+        self.assertEqual(sum('FROM "app_paymentmethod"' in sql for sql in sqls), 1)
+
+        first = Transaction.objects.get(purpose='品目0')
+        self.assertEqual(first.purpose_description, 'レシート')
+        self.assertEqual(timezone.localtime(first.date).date(), date(2025, 3, 10))
+        self.assertTrue(first.search_grams)
+        summary = MonthlyLedgerSummary.objects.get(user=self.user, year_month=date(2025, 3, 1))
+        self.assertEqual((summary.amount, summary.transaction_count), (Decimal('5500'), 10))
+
+    def test_reports_errors_per_row_and_creates_nothing(self) -> None:
+        """誤りのある行を行番号付きで返し、正しい行も登録しない"""
+        other_category = CategoryFactory()
+        response = self._post({'rows': [
+            self._row(),
+            self._row(amount='-1'),
+            self._row(category=other_category.id),
+            self._row(purpose='', payment_method='x'),
+        ]})
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual([error['row'] for error in errors], [1, 2, 3])
+        self.assertIn('amount', errors[0]['errors'])
+        self.assertIn('category', errors[1]['errors'])
+        self.assertEqual(set(errors[2]['errors']), {'purpose', 'payment_method'})
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_atomic_when_summary_update_fails(self) -> None:
+        """月次集計の更新に失敗すれば取引も登録されない"""
+        with patch('app.expenses.services.adjust_ledger_summary', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self._post({'rows': [self._row(), self._row()]})
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_rejects_invalid_requests(self) -> None:
+        """GET・不正な JSON・行なし・行数超過はエラー"""
+        from app.expenses.views import BATCH_CREATE_MAX_ROWS
+
+        self.assertEqual(self.client.get(reverse('batch_create_expenses')).status_code, 405)
+        response = self.client.post(
+            reverse('batch_create_expenses'), 'not json', content_type='application/json',
+        )
+        self.assertEqual(response.json()['error'], 'invalid_json')
+        self.assertEqual(self._post({'rows': []}).json()['error'], 'invalid_rows')
+        response = self._post({'rows': [self._row()] * (BATCH_CREATE_MAX_ROWS + 1)})
+        self.assertEqual(response.json()['error'], 'too_many_rows')
+        self.assertFalse(Transaction.objects.exists())
+
+
 class ExpensesChartDataTest(TestCase):
     """支出一覧のグラフデータテスト"""
 
@@ -643,20 +835,22 @@ class ExpensesChartDataTest(TestCase):
             category=self.category,
             purpose_description='説明'
         )
-        response = self.client.get(reverse('expense_list'))
+        response = self.client.get(reverse('expense_chart_data', args=['category']))
         self.assertEqual(response.status_code, 200)
-        self.assertIn('category_data_json', response.context)
-        self.assertIn('major_category_data_json', response.context)
-        self.assertIn('expense_data_json', response.context)
-        self.assertIn('balance_data_json', response.context)
+        self.assertEqual(response.json()['datasets'][0]['data'], [1000.0])
+        response = self.client.get(reverse('expense_chart_data', args=['major_category']))
+        self.assertEqual(response.json()['labels'], ['変動費'])
+        daily = self.client.get(reverse('expense_chart_data', args=['daily'])).json()
+        self.assertEqual(sum(daily['expense']['datasets'][0]['data']), 1000.0)
+        self.assertEqual(daily['balance']['datasets'][0]['data'][-1], -1000.0)
 
     def test_chart_data_without_transactions(self) -> None:
         """取引がない場合のグラフデータテスト"""
-        response = self.client.get(reverse('expense_list'))
-        self.assertEqual(response.status_code, 200)
-        # データがない場合でもグラフ用のJSONデータが存在する
-        self.assertIn('category_data_json', response.context)
-        self.assertIn('major_category_data_json', response.context)
+        # データがない場合でもグラフ用のJSONデータが返る
+        for chart in ('category', 'major_category'):
+            response = self.client.get(reverse('expense_chart_data', args=[chart]))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['labels'], ['データなし'])
 
     def test_summary_values(self) -> None:
         """合計値のテスト"""
@@ -689,6 +883,771 @@ class ExpensesChartDataTest(TestCase):
         self.assertEqual(response.context['net_balance'], 4000.0)
 
 
+class DailyChartAggregationTest(TestCase):
+    """日別グラフ集計（1クエリ集計）のテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import selectors
+
+        self.selectors = selectors
+        self.user = UserFactory()
+        self.payment_method = PaymentMethodFactory(user=self.user)
+        self.category = CategoryFactory(user=self.user)
+        self.start_date, self.end_date, self.date_range = selectors.get_date_range('2025-03')
+
+    def _create(self, when: datetime, amount: str, transaction_type: str) -> None:
+        Transaction.objects.create(
+            user=self.user, amount=Decimal(amount), date=when,
+            transaction_type=transaction_type, payment_method=self.payment_method,
+            purpose='テスト', major_category='variable', category=self.category,
+            purpose_description='',
+        )
+
+    def _build(self) -> tuple[dict, dict]:
+        qs = self.selectors.get_transactions(self.user, self.start_date, self.end_date)
+        expense_json, balance_json = self.selectors.build_daily_chart_data(qs, self.date_range)
+        return json.loads(expense_json), json.loads(balance_json)
+
+    def test_daily_totals_and_running_balance(self) -> None:
+        """取引のない日は0で埋まり、残高は累積和になる"""
+        self._create(timezone.make_aware(datetime(2025, 3, 1, 12)), '10000', 'income')
+        self._create(timezone.make_aware(datetime(2025, 3, 1, 18)), '1500', 'expense')
+        self._create(timezone.make_aware(datetime(2025, 3, 3, 9)), '500', 'expense')
+        self._create(timezone.make_aware(datetime(2025, 3, 3, 10)), '700', 'no_change')
+
+        expense, balance = self._build()
+        self.assertEqual(expense['labels'], self.date_range)
+        expense_data = expense['datasets'][0]['data']
+        balance_data = balance['datasets'][0]['data']
+        self.assertEqual(len(expense_data), 31)
+        self.assertEqual(expense_data[:4], [1500.0, 0.0, 500.0, 0.0])
+        self.assertEqual(balance_data[:4], [8500.0, 8500.0, 8000.0, 8000.0])
+        self.assertEqual(balance_data[-1], 8000.0)
+
+    def test_day_boundary_uses_local_timezone(self) -> None:
+        """日付の区切りはAsia/Tokyo基準（UTCでは前日でも日本時間の当日に計上）"""
+        # 2025-03-05 00:30 JST = 2025-03-04 15:30 UTC
+        self._create(timezone.make_aware(datetime(2025, 3, 5, 0, 30)), '800', 'expense')
+        expense, _ = self._build()
+        expense_data = expense['datasets'][0]['data']
+        self.assertEqual(expense_data[3], 0.0)
+        self.assertEqual(expense_data[4], 800.0)
+
+    def test_query_count_is_constant(self) -> None:
+        """日数や取引件数に関係なく集計クエリは1回"""
+        for day in range(1, 29):
+            self._create(timezone.make_aware(datetime(2025, 3, day, 12)), '100', 'expense')
+            self._create(timezone.make_aware(datetime(2025, 3, day, 13)), '300', 'income')
+        with self.assertNumQueries(1):
+            self._build()
+
+        start_date, end_date, _ = self.selectors.get_year_date_range('2025')
+        qs = self.selectors.get_transactions(self.user, start_date, end_date)
+        year_days = [
+            (date(2025, 1, 1) + timedelta(days=i)).isoformat() for i in range(365)
+        ]
+        with self.assertNumQueries(1):
+            _, balance_json = self.selectors.build_daily_chart_data(qs, year_days)
+        self.assertEqual(json.loads(balance_json)['datasets'][0]['data'][-1], 28 * 200.0)
+
+
+class MonthlyRollupTest(TestCase):
+    """年表示の月別集計（1クエリ集計）のテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import selectors
+
+        self.selectors = selectors
+        self.client = Client()
+        self.user = UserFactory()
+        self.payment_method = PaymentMethodFactory(user=self.user)
+        self.category = CategoryFactory(user=self.user)
+        self.client.login(username=self.user.email, password='testpass123')
+
+    def _create(self, when: datetime, amount: str, transaction_type: str) -> None:
+        Transaction.objects.create(
+            user=self.user, amount=Decimal(amount), date=when,
+            transaction_type=transaction_type, payment_method=self.payment_method,
+            purpose='テスト', major_category='variable', category=self.category,
+            purpose_description='',
+        )
+
+    def test_monthly_chart_and_summary_share_rollup(self) -> None:
+        """月別グラフと年合計が同じ集計結果から求まる"""
+        self._create(timezone.make_aware(datetime(2025, 1, 10)), '200000', 'income')
+        self._create(timezone.make_aware(datetime(2025, 1, 20)), '30000', 'expense')
+        # 2025-04-01 00:10 JST は UTC では3月末だが4月に計上される
+        self._create(timezone.make_aware(datetime(2025, 4, 1, 0, 10)), '5000', 'expense')
+        self._create(timezone.make_aware(datetime(2025, 12, 31, 23, 0)), '1000', 'no_change')
+
+        start_date, end_date, year = self.selectors.get_year_date_range('2025')
+        qs = self.selectors.get_transactions(self.user, start_date, end_date)
+        with self.assertNumQueries(1):
+            monthly_totals = self.selectors.aggregate_monthly_totals(qs)
+            summary = self.selectors.get_summary(qs, monthly_totals=monthly_totals)
+            chart = json.loads(self.selectors.build_monthly_chart_data(
+                qs, year, monthly_totals=monthly_totals,
+            ))
+
+        self.assertEqual(summary['total_income'], Decimal('200000'))
+        self.assertEqual(summary['total_expense'], Decimal('35000'))
+        self.assertEqual(summary['net_balance'], 165000.0)
+        income_data = chart['datasets'][0]['data']
+        expense_data = chart['datasets'][1]['data']
+        self.assertEqual(income_data[0], 200000.0)
+        self.assertEqual(expense_data[0], 30000.0)
+        self.assertEqual(expense_data[2], 0.0)
+        self.assertEqual(expense_data[3], 5000.0)
+        self.assertEqual(sum(expense_data), 35000.0)
+
+    def test_year_view_totals(self) -> None:
+        """年表示の合計値が月別集計と一致する"""
+        self._create(timezone.make_aware(datetime(2025, 2, 1, 12)), '1000', 'expense')
+        self._create(timezone.make_aware(datetime(2025, 8, 1, 12)), '4000', 'income')
+        response = self.client.get(reverse('expense_list'), {'view_mode': 'year', 'target_date': '2025'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_expense'], Decimal('1000'))
+        self.assertEqual(response.context['total_income'], Decimal('4000'))
+        chart = self.client.get(
+            reverse('expense_chart_data', args=['monthly']),
+            {'view_mode': 'year', 'target_date': '2025'},
+        ).json()
+        self.assertEqual(chart['datasets'][0]['data'][7], 4000.0)
+        self.assertEqual(chart['datasets'][1]['data'][1], 1000.0)
+
+
+class MonthlyLedgerSummaryTest(TestCase):
+    """月次集計テーブル（MonthlyLedgerSummary）の差分更新と再構築のテスト"""
+
+    def setUp(self) -> None:
+        self.client = Client()
+        self.user = UserFactory()
+        self.payment_method = PaymentMethodFactory(user=self.user)
+        self.category = CategoryFactory(user=self.user)
+        self.other_category = CategoryFactory(user=self.user)
+        self.client.login(username=self.user.email, password='testpass123')
+
+    def _create(self, when: datetime, amount: str, transaction_type: str = 'expense', **kwargs) -> Transaction:
+        return Transaction.objects.create(
+            user=self.user, amount=Decimal(amount), date=when,
+            transaction_type=transaction_type, payment_method=self.payment_method,
+            purpose='テスト', major_category=kwargs.pop('major_category', 'variable'),
+            category=kwargs.pop('category', self.category), purpose_description='',
+        )
+
+    def _snapshot(self) -> set:
+        from app.expenses.models import MonthlyLedgerSummary
+
+        return set(MonthlyLedgerSummary.objects.filter(user=self.user).values_list(
+            'year_month', 'category_id', 'payment_method_id', 'transaction_type',
+            'major_category', 'amount', 'transaction_count',
+        ))
+
+    def _rebuilt_snapshot(self) -> set:
+        services.rebuild_monthly_ledger_summary(self.user)
+        return self._snapshot()
+
+    def test_create_and_update_keep_summary_current(self) -> None:
+        """作成・金額変更・月またぎの変更が集計に反映される"""
+        march = timezone.make_aware(datetime(2025, 3, 10, 12))
+        first = self._create(march, '1000')
+        self._create(march, '500')
+        self.assertEqual(self._snapshot(), {
+            (date(2025, 3, 1), self.category.id, self.payment_method.id, 'expense', 'variable', Decimal('1500'), 2),
+        })
+
+        first.amount = Decimal('1200')
+        first.save()
+        first.date = timezone.make_aware(datetime(2025, 4, 1, 0, 30))
+        first.category = self.other_category
+        first.save()
+        expected = {
+            (date(2025, 3, 1), self.category.id, self.payment_method.id, 'expense', 'variable', Decimal('500'), 1),
+            (date(2025, 4, 1), self.other_category.id, self.payment_method.id, 'expense', 'variable', Decimal('1200'), 1),
+        }
+        self.assertEqual(self._snapshot(), expected)
+        self.assertEqual(self._rebuilt_snapshot(), expected)
+
+    def test_delete_paths_remove_summary_rows(self) -> None:
+        """単体削除・一括削除・カテゴリ削除で集計行が減り、0件の行は残らない"""
+        when = timezone.make_aware(datetime(2025, 5, 5, 12))
+        single = self._create(when, '100')
+        bulk = [self._create(when, '200', category=self.other_category) for _ in range(2)]
+        self._create(when, '300', transaction_type='income')
+
+        single.delete()
+        response = self.client.post(
+            reverse('bulk_delete_expenses'),
+            data=json.dumps({'ids': [bulk[0].id]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['deleted'], 1)
+        self.assertEqual(self._snapshot(), {
+            (date(2025, 5, 1), self.other_category.id, self.payment_method.id, 'expense', 'variable', Decimal('200'), 1),
+            (date(2025, 5, 1), self.category.id, self.payment_method.id, 'income', 'variable', Decimal('300'), 1),
+        })
+
+        self.other_category.delete()
+        self.assertEqual(self._snapshot(), {
+            (date(2025, 5, 1), self.category.id, self.payment_method.id, 'income', 'variable', Decimal('300'), 1),
+        })
+
+    def test_execute_recurring_payment_updates_summary(self) -> None:
+        """定期支払いの実行結果が集計に反映される"""
+        recurring = RecurringPaymentFactory(
+            user=self.user, category=self.category, payment_method=self.payment_method,
+            amount=Decimal('8000'),
+        )
+        services.execute_recurring_payment(recurring, date(2025, 6, 1))
+        self.assertEqual(self._snapshot(), {
+            (date(2025, 6, 1), self.category.id, self.payment_method.id, 'expense', 'fixed', Decimal('8000'), 1),
+        })
+
+    def test_rebuild_command(self) -> None:
+        """rebuild_ledger_summary コマンドで取引から再構築できる"""
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from app.expenses.models import MonthlyLedgerSummary
+
+        self._create(timezone.make_aware(datetime(2025, 7, 1, 12)), '700')
+        MonthlyLedgerSummary.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_ledger_summary', stdout=out)
+        self.assertIn('1行', out.getvalue())
+        self.assertEqual(self._snapshot(), {
+            (date(2025, 7, 1), self.category.id, self.payment_method.id, 'expense', 'variable', Decimal('700'), 1),
+        })
+
+    def test_read_cost_does_not_depend_on_transaction_count(self) -> None:
+        """予算サマリーと一覧の集計カードは取引件数に関係なく集計テーブルから読む"""
+        from app.expenses import selectors
+
+        today = timezone.localdate()
+        for _ in range(30):
+            self._create(timezone.now(), '100')
+        with self.assertNumQueries(3):
+            overview = selectors.build_budget_overview(self.user, today.year, today.month)
+        self.assertEqual(overview['overall']['used'], Decimal('3000'))
+        self.assertEqual(selectors.get_month_totals(self.user, today.year, today.month), (Decimal('0'), Decimal('3000')))
+
+        response = self.client.get(reverse('expense_list'))
+        self.assertEqual(response.context['total_expense'], Decimal('3000'))
+        # 検索語があるときは取引を直接集計する
+        response = self.client.get(reverse('expense_list'), {'search': 'テスト'})
+        self.assertEqual(response.context['total_expense'], Decimal('3000'))
+
+
+class LedgerStatsTest(TestCase):
+    """件数・合計の一括集計と件数受け渡し Paginator のテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import selectors
+
+        self.selectors = selectors
+        self.client = Client()
+        self.user = UserFactory()
+        self.payment_method = PaymentMethodFactory(user=self.user)
+        self.category = CategoryFactory(user=self.user)
+        self.client.login(username=self.user.email, password='testpass123')
+        when = timezone.now()
+        for amount, transaction_type in [('1000', 'expense'), ('2500', 'expense'), ('9000', 'income'), ('300', 'no_change')]:
+            Transaction.objects.create(
+                user=self.user, amount=Decimal(amount), date=when,
+                transaction_type=transaction_type, payment_method=self.payment_method,
+                purpose='ランチ' if transaction_type == 'expense' else '給与',
+                major_category='variable', category=self.category, purpose_description='',
+            )
+
+    def test_stats_in_single_query(self) -> None:
+        """取引・月次集計のどちらでも件数と種別別合計が1クエリで求まる"""
+        start_date, end_date, _ = self.selectors.get_date_range(None)
+        transactions_qs = self.selectors.get_transactions(self.user, start_date, end_date, search='ランチ')
+        with self.assertNumQueries(1):
+            stats = self.selectors.get_ledger_stats(transactions_qs)
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['total_expense'], Decimal('3500'))
+        self.assertEqual(stats['total_income'], Decimal('0'))
+
+        ledger_qs = self.selectors.get_ledger_summary(self.user, start_date, end_date)
+        with self.assertNumQueries(1):
+            stats = self.selectors.get_ledger_stats(ledger_qs)
+        self.assertEqual(stats, {
+            'count': 4,
+            'total_income': Decimal('9000'),
+            'total_expense': Decimal('3500'),
+            'total_no_change': Decimal('300'),
+        })
+
+    def test_counted_paginator_skips_count_query(self) -> None:
+        """件数を渡した Paginator は COUNT を発行しない"""
+        from app.pagination import CountedPaginator
+
+        paginator = CountedPaginator(Transaction.objects.filter(user=self.user).order_by('id'), 3, count=4)
+        with self.assertNumQueries(1):
+            page = paginator.get_page(2)
+            self.assertEqual(paginator.num_pages, 2)
+            self.assertEqual(len(page.object_list), 1)
+
+    def test_list_view_does_not_count_transactions(self) -> None:
+        """一覧画面は取引テーブルに COUNT を発行しない（件数は集計結果から）"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('expense_list'), {'per_page': '10'})
+        self.assertEqual(response.context['transactions_count'], 4)
+        self.assertEqual(response.context['transactions_page'].paginator.count, 4)
+        count_queries = [q['sql'] for q in captured.captured_queries if 'COUNT(' in q['sql']]
+        self.assertEqual(count_queries, [])
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('expense_list'), {'search': 'ランチ'})
+        self.assertEqual(response.context['transactions_count'], 2)
+        self.assertEqual(response.context['total_expense'], Decimal('3500'))
+        count_queries = [q['sql'] for q in captured.captured_queries if 'COUNT(' in q['sql']]
+        self.assertEqual(len(count_queries), 1)
+
+
+class TransactionCursorPaginationTest(TestCase):
+    """取引一覧のキーセット（カーソル）ページネーションのテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import selectors
+
+        self.selectors = selectors
+        self.client = Client()
+        self.user = UserFactory()
+        self.payment_method = PaymentMethodFactory(user=self.user)
+        self.category = CategoryFactory(user=self.user)
+        self.client.login(username=self.user.email, password='testpass123')
+        base = timezone.make_aware(datetime(2025, 1, 1, 12))
+        # 同じ日時・同じ金額を含めて同順位の扱いを確認する
+        for i in range(23):
+            Transaction.objects.create(
+                user=self.user, amount=Decimal(100 * (i % 4)), date=base + timedelta(days=i // 3),
+                transaction_type='expense', payment_method=self.payment_method,
+                purpose=f'取引{i}', major_category='variable', category=self.category,
+                purpose_description='',
+            )
+        self.start_date, self.end_date, _ = selectors.get_year_date_range('2025')
+
+    def _transactions(self, sort_by: str = 'date_desc') -> object:
+        return self.selectors.get_transactions(
+            self.user, self.start_date, self.end_date, sort_by=sort_by,
+        )
+
+    def _walk(self, sort_by: str, per_page: int) -> list[int]:
+        qs = self._transactions(sort_by)
+        rows = list(qs[:per_page])
+        seen = [t.id for t in rows]
+        while True:
+            _, next_cursor = self.selectors.build_transaction_cursors(rows, sort_by)
+            rows = self.selectors.get_transactions_by_cursor(qs, sort_by, next_cursor, per_page)
+            if not rows:
+                return seen
+            seen.extend(t.id for t in rows)
+
+    def test_cursor_walk_matches_offset_order(self) -> None:
+        """どの並び順でも、カーソルで辿った順序が通常の並び順と一致する"""
+        for sort_by in ('date_desc', 'date_asc', 'amount_desc', 'amount_asc'):
+            with self.subTest(sort_by=sort_by):
+                qs = self._transactions(sort_by)
+                expected = list(qs.values_list('id', flat=True))
+                self.assertEqual(self._walk(sort_by, 5), expected)
+
+    def test_previous_cursor_returns_preceding_rows(self) -> None:
+        """前ページ用カーソルは直前の行を元の並び順で返す"""
+        qs = self._transactions('amount_asc')
+        expected = list(qs.values_list('id', flat=True))
+        page_three = list(qs[10:15])
+        previous_cursor, _ = self.selectors.build_transaction_cursors(page_three, 'amount_asc')
+        rows = self.selectors.get_transactions_by_cursor(qs, 'amount_asc', previous_cursor, 5)
+        self.assertEqual([t.id for t in rows], expected[5:10])
+
+    def test_cursor_query_has_no_offset(self) -> None:
+        """カーソル指定時は OFFSET を使わない"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        qs = self._transactions()
+        _, next_cursor = self.selectors.build_transaction_cursors(list(qs[15:20]), 'date_desc')
+        with CaptureQueriesContext(connection) as captured:
+            rows = self.selectors.get_transactions_by_cursor(qs, 'date_desc', next_cursor, 5)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(len(captured.captured_queries), 1)
+        self.assertNotIn('OFFSET', captured.captured_queries[0]['sql'])
+
+    def test_cursor_query_bounds_leading_sort_field(self) -> None:
+        """先頭の並び順の項目にもカーソルの値での範囲条件を付ける（インデックスを途中から読む）"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        for sort_by, bound in (('amount_desc', '<='), ('amount_asc', '>=')):
+            with self.subTest(sort_by=sort_by):
+                qs = self._transactions(sort_by)
+                page = list(qs[5:10])
+                _, next_cursor = self.selectors.build_transaction_cursors(page, sort_by)
+                with CaptureQueriesContext(connection) as captured:
+                    self.selectors.get_transactions_by_cursor(qs, sort_by, next_cursor, 5)
+                self.assertIn(
+                    f'"app_transaction"."amount" {bound} {int(page[-1].amount)}',
+                    captured.captured_queries[0]['sql'],
+                )
+
+    def test_invalid_or_mismatched_cursor_is_rejected(self) -> None:
+        """改ざん・並び順違いのカーソルは使わない"""
+        from django.core import signing
+
+        qs = self._transactions()
+        _, next_cursor = self.selectors.build_transaction_cursors(list(qs[:5]), 'date_desc')
+        by_cursor = self.selectors.get_transactions_by_cursor
+        self.assertIsNone(by_cursor(qs, 'date_desc', 'broken', 5))
+        self.assertIsNone(by_cursor(qs, 'amount_desc', next_cursor, 5))
+        # 署名が正しくても、値の数が並び順の項目数と合わなければ使わない
+        short_cursor = signing.dumps(
+            {'s': 'date_desc', 'd': 'next', 'k': ['2025-01-01T12:00:00+09:00']},
+            salt=self.selectors._CURSOR_SALT, compress=True,
+        )
+        self.assertIsNone(by_cursor(qs, 'date_desc', short_cursor, 5))
+
+    def test_list_view_follows_next_cursor(self) -> None:
+        """一覧画面の「次へ」リンクのカーソルで次ページが表示される"""
+        from urllib.parse import quote
+
+        params = {'view_mode': 'year', 'target_date': '2025', 'per_page': '10'}
+        first = self.client.get(reverse('expense_list'), params)
+        next_cursor = first.context['next_cursor']
+        self.assertIn(f'cursor={quote(next_cursor)}', first.content.decode())
+        url = reverse('expense_list')
+        second = self.client.get(url, {**params, 'page': '2', 'cursor': next_cursor})
+        page = second.context['transactions_page']
+        self.assertEqual(page.number, 2)
+        self.assertEqual(page.start_index(), 11)
+        offset_page = self.client.get(url, {**params, 'page': '2'}).context['transactions_page']
+        self.assertEqual([t.id for t in page.object_list], [t.id for t in offset_page.object_list])
+
+        fallback = self.client.get(url, {**params, 'page': '2', 'cursor': 'broken'})
+        self.assertEqual(fallback.context['transactions_page'].number, 2)
+
+
+class TransactionSearchTest(TestCase):
+    """取引キーワード検索（n-gram インデックス）のテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import selectors
+
+        self.selectors = selectors
+        self.user = UserFactory()
+        self.cash = PaymentMethodFactory(user=self.user, name='現金')
+        self.card = PaymentMethodFactory(user=self.user, name='VISAカード')
+        self.food = CategoryFactory(user=self.user, name='食費')
+        self.utility = CategoryFactory(user=self.user, name='光熱費')
+        rows = [
+            ('スーパーで買い物', '野菜と肉', self.food, self.cash),
+            ('電気代', '3月分', self.utility, self.card),
+            ('Amazon', '書籍を購入', self.food, self.card),
+            ('ランチ', '', self.food, self.cash),
+        ]
+        for purpose, description, category, payment_method in rows:
+            TransactionFactory(
+                user=self.user, purpose=purpose, purpose_description=description,
+                category=category, payment_method=payment_method,
+            )
+        # 他ユーザーのカテゴリ名には一致させない
+        TransactionFactory(purpose='その他', category=CategoryFactory(name='スーパー'))
+        self.start_date, self.end_date, _ = selectors.get_date_range(None)
+
+    def _search(self, search: str) -> set[str]:
+        qs = self.selectors.get_transactions(
+            self.user, self.start_date, self.end_date, search=search,
+        )
+        return {t.purpose for t in qs}
+
+    def test_search_grams_saved(self) -> None:
+        """保存時に用途・説明の n-gram が作られる"""
+        transaction = Transaction.objects.get(purpose='電気代')
+        self.assertIn('電気', transaction.search_grams)
+        self.assertIn('3', transaction.search_grams)
+        transaction.purpose = 'ガス代'
+        transaction.save(update_fields=['purpose'])
+        transaction.refresh_from_db()
+        self.assertIn('ガス', transaction.search_grams)
+        self.assertNotIn('電気', transaction.search_grams)
+
+    def test_matches_icontains(self) -> None:
+        """検索結果が icontains による照合と一致する"""
+        from app.expenses.search import icontains_search_filter
+
+        searches = [
+            'スーパー', '代', '肉', 'amazon', 'AMAZON', '書籍を',
+            '食費', 'visa', 'カード', 'ーで買', '該当なし',
+        ]
+        for search in searches:
+            with self.subTest(search=search):
+                expected = set(
+                    Transaction.objects.filter(user=self.user)
+                    .filter(icontains_search_filter(search))
+                    .values_list('purpose', flat=True)
+                )
+                self.assertEqual(self._search(search), expected)
+
+    def test_category_and_payment_method_names(self) -> None:
+        """カテゴリ名・支払方法名でも検索できる"""
+        self.assertEqual(self._search('光熱'), {'電気代'})
+        self.assertEqual(self._search('現金'), {'スーパーで買い物', 'ランチ'})
+
+    def test_uses_search_grams_index(self) -> None:
+        """用途・説明は n-gram 配列で絞り込み、カテゴリ等は JOIN しない"""
+        sql = str(self.selectors.get_transactions(
+            self.user, self.start_date, self.end_date, search='スーパー',
+        ).query)
+        self.assertIn('search_grams', sql)
+        self.assertNotIn('UPPER("app_category"."name"', sql)
+
+
+class TransactionImportTest(TestCase):
+    """取引の一括インポート（CSV / OFX）のテスト"""
+
+    CSV_TEXT = (
+        '日付,金額,用途,カテゴリ,支払方法,取引タイプ\n'
+        '2025/01/05,1200,ランチ,外食,現金,支出\n'
+        '2025/01/05,1200,ランチ,外食,現金,支出\n'
+        '2025-01-10,"3,000",書籍,,カード,expense\n'
+        '2025-01-25,280000,給与,給料,銀行,収入\n'
+        'bad,100,不正な日付,,,\n'
+    )
+
+    def setUp(self) -> None:
+        import io
+
+        from app.expenses import importers
+
+        self.io = io
+        self.importers = importers
+        self.user = UserFactory()
+        self.cash = PaymentMethodFactory(user=self.user, name='現金')
+
+    def _import_csv(self, text: str, **kwargs: object) -> object:
+        return self.importers.import_transactions(
+            self.user, self.importers.parse_csv(self.io.StringIO(text)), **kwargs,
+        )
+
+    def test_import_csv(self) -> None:
+        """CSV の行が取引として登録され、カテゴリ等は名前で対応付けられる"""
+        result = self._import_csv(self.CSV_TEXT)
+        self.assertEqual(result.created, 4)
+        self.assertEqual(result.error_count, 1)
+        self.assertIn('6行目', result.errors[0])
+
+        transactions = Transaction.objects.filter(user=self.user)
+        self.assertEqual(transactions.filter(purpose='ランチ', payment_method=self.cash).count(), 2)
+        book = transactions.get(purpose='書籍')
+        self.assertEqual(book.amount, Decimal('3000'))
+        self.assertEqual(book.category.name, self.importers.DEFAULT_CATEGORY_NAME)
+        self.assertEqual(transactions.get(purpose='給与').transaction_type, 'income')
+        self.assertIn('ラン', transactions.filter(purpose='ランチ').first().search_grams)
+        # 未登録の名前だけが作成される
+        self.assertEqual(PaymentMethod.objects.filter(user=self.user).count(), 3)
+
+    def test_reimport_skips_duplicates(self) -> None:
+        """同じファイルを再インポートしても重複して登録されない"""
+        self._import_csv(self.CSV_TEXT)
+        result = self._import_csv(self.CSV_TEXT)
+        self.assertEqual(result.created, 0)
+        self.assertEqual(result.duplicates, 4)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+
+    def test_sign_decides_type_without_type_column(self) -> None:
+        """取引タイプ列がない場合は金額の符号で判定する"""
+        self._import_csv('date,amount,purpose\n2025-02-01,-500,コンビニ\n2025-02-02,1000,返金\n')
+        self.assertEqual(Transaction.objects.get(purpose='コンビニ').transaction_type, 'expense')
+        self.assertEqual(Transaction.objects.get(purpose='コンビニ').amount, Decimal('500'))
+        self.assertEqual(Transaction.objects.get(purpose='返金').transaction_type, 'income')
+
+    def test_missing_required_column(self) -> None:
+        """必須列がなければ何も登録しない"""
+        result = self._import_csv('date,purpose\n2025-02-01,コンビニ\n')
+        self.assertEqual(result.created, 0)
+        self.assertEqual(result.error_count, 1)
+
+    def test_column_count_mismatch_is_row_error(self) -> None:
+        """見出しと列の数が違う行は、値をずらして取り込まずに行エラーにする"""
+        result = self._import_csv('date,amount,purpose\n2025-02-01,100\n2025-02-02,200,a,余分\n')
+        self.assertEqual(result.created, 0)
+        self.assertEqual(result.error_count, 2)
+        self.assertIn('列の数', result.errors[0])
+
+    def test_non_finite_amount_is_row_error(self) -> None:
+        """NaN / Infinity の金額は行エラーとして報告される"""
+        result = self._import_csv('date,amount,purpose\n2025-02-01,NaN,a\n2025-02-02,-Infinity,b\n')
+        self.assertEqual(result.created, 0)
+        self.assertEqual(result.error_count, 2)
+        self.assertIn('金額を解釈できません', result.errors[0])
+
+    def test_names_beyond_limit_are_row_errors(self) -> None:
+        """登録上限を超える未登録のカテゴリ・支払方法は作成せず、行エラーにする"""
+        lines = ['date,amount,purpose,category,payment_method']
+        lines += [f'2025-02-{day:02d},100,取引{day},カテゴリ{day},現金' for day in range(1, 16)]
+        lines += ['2025-03-01,100,既存のカテゴリ,カテゴリ1,現金']
+        lines += [
+            f'2025-03-{day:02d},100,支払{day},カテゴリ1,支払方法{day}' for day in range(2, 16)
+        ]
+        result = self._import_csv('\n'.join(lines) + '\n')
+
+        category_limit = services.CATEGORY_LIMIT
+        payment_method_limit = services.PAYMENT_METHOD_LIMIT
+        self.assertEqual(Category.objects.filter(user=self.user).count(), category_limit)
+        self.assertEqual(PaymentMethod.objects.filter(user=self.user).count(), payment_method_limit)
+        # 「現金」は登録済みなので、新しく作れる支払方法は上限 - 1 件
+        self.assertEqual(result.created, category_limit + 1 + payment_method_limit - 1)
+        self.assertEqual(
+            result.error_count, (15 - category_limit) + (14 - (payment_method_limit - 1)),
+        )
+        self.assertIn('登録上限数', result.errors[0])
+
+    def test_ledger_summary_updated(self) -> None:
+        """インポートした取引が月次集計に反映される"""
+        from app.expenses.models import MonthlyLedgerSummary
+
+        self._import_csv(self.CSV_TEXT)
+        summaries = MonthlyLedgerSummary.objects.filter(user=self.user, year_month=date(2025, 1, 1))
+        self.assertEqual(sum(s.transaction_count for s in summaries), 4)
+        expense = sum(s.amount for s in summaries if s.transaction_type == 'expense')
+        self.assertEqual(expense, Decimal('5400'))
+
+    def test_batches_use_bounded_queries(self) -> None:
+        """クエリ数は行数ではなくバッチ数に比例する"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        lines = ['date,amount,purpose,category,payment_method']
+        lines += [f'2025-03-{i % 28 + 1:02d},-{i + 1},買い物{i},食費,現金' for i in range(200)]
+        CategoryFactory(user=self.user, name='食費')
+        with CaptureQueriesContext(connection) as ctx:
+            result = self._import_csv('\n'.join(lines), batch_size=50)
+        self.assertEqual(result.created, 200)
+        self.assertLess(len(ctx.captured_queries), 60)
+
+    def test_import_ofx(self) -> None:
+        """OFX の STMTTRN を取り込み、FITID で重複を判定する"""
+        ofx = (
+            'OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n'
+            '<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20250115120000\n<TRNAMT>-800\n'
+            '<FITID>A001\n<NAME>カフェ\n<MEMO>打ち合わせ\n</STMTTRN>\n'
+            '<STMTTRN>\n<TRNTYPE>CREDIT\n<DTPOSTED>20250120\n<TRNAMT>5000\n'
+            '<FITID>A002\n<NAME>振込\n</STMTTRN>\n'
+            '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+        )
+        result = self.importers.import_transactions(
+            self.user, self.importers.parse_ofx(self.io.StringIO(ofx)),
+        )
+        self.assertEqual(result.created, 2)
+        cafe = Transaction.objects.get(user=self.user, purpose='カフェ')
+        self.assertEqual(cafe.transaction_type, 'expense')
+        self.assertEqual(cafe.purpose_description, '打ち合わせ')
+
+        again = self.importers.import_transactions(
+            self.user, self.importers.parse_ofx(self.io.StringIO(ofx)),
+        )
+        self.assertEqual(again.duplicates, 2)
+
+    def test_upload_view(self) -> None:
+        """アップロード画面からインポートできる"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        client = Client()
+        client.login(username=self.user.email, password='testpass123')
+        self.assertEqual(client.get(reverse('import_expenses')).status_code, 200)
+        upload = SimpleUploadedFile('statement.csv', self.CSV_TEXT.encode('cp932'))
+        response = client.post(reverse('import_expenses'), {
+            'file': upload, 'file_format': 'auto', 'encoding': 'cp932',
+        })
+        self.assertRedirects(response, reverse('expense_list'), fetch_redirect_response=False)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+
+
+class TransactionExportTest(TestCase):
+    """取引のエクスポート（CSV / NDJSON）のテスト"""
+
+    def setUp(self) -> None:
+        self.client = Client()
+        self.user = UserFactory()
+        self.client.login(username=self.user.email, password='testpass123')
+        self.payment_method = PaymentMethodFactory(user=self.user, name='現金')
+        self.category = CategoryFactory(user=self.user, name='食費')
+        for day, purpose, amount, transaction_type in [
+            (3, 'スーパー', 2500, 'expense'),
+            (10, 'ランチ, 同僚と', 1200, 'expense'),
+            (25, '給与', 300000, 'income'),
+        ]:
+            TransactionFactory(
+                user=self.user, date=timezone.make_aware(datetime(2025, 1, day, 9)),
+                purpose=purpose, amount=Decimal(amount), transaction_type=transaction_type,
+                category=self.category, payment_method=self.payment_method,
+            )
+        TransactionFactory(
+            user=self.user, date=timezone.make_aware(datetime(2025, 2, 1, 9)), purpose='翌月',
+            category=self.category, payment_method=self.payment_method,
+        )
+        TransactionFactory(purpose='他ユーザー')
+
+    def _content(self, response: object) -> str:
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_streams_all_transactions(self) -> None:
+        """期間指定なしなら全期間の取引を日付順に出力する"""
+        response = self.client.get(reverse('export_expenses'), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertIn('transactions_all.csv', response['Content-Disposition'])
+        lines = self._content(response).lstrip('\ufeff').splitlines()
+        self.assertEqual(lines[0], '日付,金額,取引タイプ,費用タイプ,用途,説明,カテゴリ,支払方法')
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[1], '2025-01-03,2500.00,支出,変動費,スーパー,,食費,現金')
+        self.assertIn('"ランチ, 同僚と"', lines[2])
+        self.assertNotIn('他ユーザー', ''.join(lines))
+
+    def test_ndjson_export_with_filters(self) -> None:
+        """一覧と同じ絞り込み条件が適用される"""
+        response = self.client.get(reverse('export_expenses'), {
+            'format': 'ndjson', 'view_mode': 'month', 'target_date': '2025-01',
+            'transaction_type': 'expense',
+        })
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([row['purpose'] for row in rows], ['スーパー', 'ランチ, 同僚と'])
+        self.assertEqual(rows[0]['amount'], '2500.00')
+        self.assertEqual(rows[0]['category'], '食費')
+        self.assertEqual(rows[0]['date'][:10], '2025-01-03')
+
+    def test_export_uses_single_query(self) -> None:
+        """取引・カテゴリ・支払方法を1回のクエリ（カーソル）で読み出す"""
+        response = self.client.get(reverse('export_expenses'), {'format': 'csv'})
+        with self.assertNumQueries(1):
+            self._content(response)
+
+    def test_exported_csv_can_be_imported(self) -> None:
+        """エクスポートした CSV はそのまま再インポートできる"""
+        import io
+
+        from app.expenses import importers
+
+        content = self._content(self.client.get(reverse('export_expenses'), {'format': 'csv'}))
+        other = UserFactory()
+        rows = importers.parse_csv(io.StringIO(content.lstrip('\ufeff')))
+        result = importers.import_transactions(other, rows)
+        self.assertEqual(result.created, 4)
+        self.assertEqual(result.error_count, 0)
+        salary = Transaction.objects.get(user=other, purpose='給与')
+        self.assertEqual((salary.amount, salary.transaction_type), (Decimal('300000'), 'income'))
+
+    def test_requires_login(self) -> None:
+        """未ログインではエクスポートできない"""
+        self.client.logout()
+        response = self.client.get(reverse('export_expenses'))
+        self.assertEqual(response.status_code, 302)
+
+
 class RecurringPaymentModelTest(TestCase):
     """定期支払いモデルのテスト"""
 
@@ -838,6 +1797,269 @@ class RecurringPaymentModelTest(TestCase):
         self.assertEqual(recurring.last_executed, target)
 
 
+class RecurringPaymentSchedulerTest(TestCase):
+    """定期支払いの一括実行のテスト"""
+
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.payment_method = PaymentMethodFactory(user=self.user)
+        self.category = CategoryFactory(user=self.user)
+
+    def _create_recurring(self, **kwargs: object) -> RecurringPayment:
+        return RecurringPaymentFactory(
+            user=self.user, category=self.category, payment_method=self.payment_method, **kwargs,
+        )
+
+    def test_due_query_matches_should_execute_on(self) -> None:
+        """DB 側の判定が should_execute_on と一致する（月末調整・既定値を含む）"""
+        patterns = [
+            {'frequency': 'daily'},
+            {'frequency': 'weekly', 'days_of_week': [0, 3]},
+            {'frequency': 'weekly', 'days_of_week': []},
+            {'frequency': 'monthly', 'days_of_month': [15]},
+            {'frequency': 'monthly', 'days_of_month': [1, 29, 31]},
+            {'frequency': 'monthly', 'days_of_month': []},
+            {'frequency': 'yearly', 'month_of_year': 2, 'days_of_month': [30]},
+            {'frequency': 'yearly', 'month_of_year': None, 'days_of_month': [10]},
+            {'frequency': 'daily', 'last_executed': date(2024, 6, 30)},
+            {'frequency': 'daily', 'is_active': False},
+        ]
+        recurrings = [self._create_recurring(**pattern) for pattern in patterns]
+        target = date(2024, 1, 1)
+        while target <= date(2024, 12, 31):
+            due = services.get_recurring_payments_due_on(target)
+            due_ids = set(due.values_list('id', flat=True))
+            expected = {r.id for r in recurrings if r.should_execute_on(target)}
+            self.assertEqual(due_ids, expected, target)
+            target += timedelta(days=1)
+
+    def test_execute_in_bulk(self) -> None:
+        """取引は1回の INSERT、last_executed は1回の UPDATE でまとめて処理する"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        for _ in range(5):
+            self._create_recurring(frequency='monthly', days_of_month=[15])
+        with CaptureQueriesContext(connection) as ctx:
+            transactions = services.execute_recurring_payments(date(2025, 3, 15))
+        self.assertEqual(len(transactions), 5)
+        sqls = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual(sum(sql.startswith('INSERT INTO "app_transaction"') for sql in sqls), 1)
+        self.assertEqual(sum(sql.startswith('UPDATE "app_recurringpayment"') for sql in sqls), 1)
+        self.assertEqual(
+            set(RecurringPayment.objects.values_list('last_executed', flat=True)),
+            {date(2025, 3, 15)},
+        )
+
+    def test_date_range_is_idempotent(self) -> None:
+        """期間を指定して実行でき、同じ期間を再実行しても二重に作成しない"""
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        weekly = self._create_recurring(frequency='weekly', days_of_week=[0])
+        monthly = self._create_recurring(frequency='monthly', days_of_month=[31])
+        for _ in range(2):
+            call_command(
+                'execute_recurring_payments', '--date-range', '2025-02-01', '2025-03-05',
+                stdout=StringIO(),
+            )
+
+        def executed_dates(purpose: str) -> list[date]:
+            transactions = Transaction.objects.filter(purpose=purpose)
+            return sorted(timezone.localtime(t.date).date() for t in transactions)
+
+        self.assertEqual(executed_dates(weekly.purpose), [
+            date(2025, 2, 3), date(2025, 2, 10), date(2025, 2, 17), date(2025, 2, 24),
+            date(2025, 3, 3),
+        ])
+        self.assertEqual(executed_dates(monthly.purpose), [date(2025, 2, 28)])
+        weekly.refresh_from_db()
+        self.assertEqual(weekly.last_executed, date(2025, 3, 3))
+
+    def test_occurrences_match_should_execute_on(self) -> None:
+        """occurrences_between が日ごとの should_execute_on と同じ日付を返す"""
+        patterns = [
+            {'frequency': 'daily'},
+            {'frequency': 'weekly', 'days_of_week': [6, 2]},
+            {'frequency': 'weekly', 'days_of_week': []},
+            {'frequency': 'monthly', 'days_of_month': [1, 30, 31]},
+            {'frequency': 'yearly', 'month_of_year': 2, 'days_of_month': [29]},
+        ]
+        start, end = date(2023, 12, 20), date(2025, 3, 10)
+        for pattern in patterns:
+            recurring = self._create_recurring(**pattern)
+            expected = []
+            target = start
+            while target <= end:
+                if recurring.should_execute_on(target):
+                    expected.append(target)
+                target += timedelta(days=1)
+            with self.subTest(pattern=pattern):
+                self.assertEqual(list(recurring.occurrences_between(start, end)), expected)
+
+    def test_backfill_missed_runs(self) -> None:
+        """前回実行日以降、指定日までの未実行分をまとめて作成し、再実行しても増えない"""
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        recurring = self._create_recurring(
+            frequency='monthly', days_of_month=[10, 25], last_executed=date(2025, 1, 10),
+        )
+        for _ in range(2):
+            call_command(
+                'execute_recurring_payments', '--backfill', '2025-01-01', '--date', '2025-03-20',
+                stdout=StringIO(),
+            )
+
+        transactions = Transaction.objects.filter(purpose=recurring.purpose)
+        dates = sorted(timezone.localtime(t.date).date() for t in transactions)
+        self.assertEqual(dates, [
+            date(2025, 1, 25), date(2025, 2, 10), date(2025, 2, 25), date(2025, 3, 10),
+        ])
+        recurring.refresh_from_db()
+        self.assertEqual(recurring.last_executed, date(2025, 3, 10))
+
+    def test_backfill_starts_from_created_date(self) -> None:
+        """未実行の定期支払いは登録日以降の分だけ作成する"""
+        recurring = self._create_recurring(frequency='daily')
+        RecurringPayment.objects.filter(pk=recurring.pk).update(
+            created_at=timezone.make_aware(datetime(2025, 3, 18, 15)),
+        )
+        transactions = services.backfill_recurring_payments(date(2025, 3, 1), date(2025, 3, 20))
+        self.assertEqual(len(transactions), 3)
+
+    def test_backfill_starts_from_given_date(self) -> None:
+        """指定した開始日より前の未実行分は作成しない"""
+        self._create_recurring(frequency='daily', last_executed=date(2025, 1, 10))
+        transactions = services.backfill_recurring_payments(date(2025, 3, 18), date(2025, 3, 20))
+        self.assertEqual(
+            [timezone.localtime(t.date).date() for t in transactions],
+            [date(2025, 3, 18), date(2025, 3, 19), date(2025, 3, 20)],
+        )
+
+
+class RecurringPaymentProjectionTest(TestCase):
+    """定期支払いの見込み（日別・月別の合計）のテスト"""
+
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def _create_recurring(self, **kwargs: object) -> RecurringPayment:
+        return RecurringPaymentFactory(user=self.user, **kwargs)
+
+    def test_daily_and_monthly_totals(self) -> None:
+        """明日以降の実行予定日を日別・月別に合計し、収入は収支にプラスで数える"""
+        from app.expenses.projections import project_recurring_payments
+
+        self._create_recurring(frequency='monthly', days_of_month=[10, 31], amount=Decimal('1000'))
+        self._create_recurring(frequency='weekly', days_of_week=[0], amount=Decimal('500'))
+        self._create_recurring(
+            frequency='monthly', days_of_month=[25], amount=Decimal('300000'),
+            transaction_type='income',
+        )
+        # 無効・収支なし・実行済みの日は含めない
+        self._create_recurring(frequency='daily', is_active=False)
+        self._create_recurring(frequency='daily', transaction_type='no_change')
+        self._create_recurring(
+            frequency='monthly', days_of_month=[20], amount=Decimal('7000'),
+            last_executed=date(2025, 3, 20),
+        )
+
+        result = project_recurring_payments(self.user, date(2025, 2, 1), 2, today=date(2025, 2, 10))
+
+        self.assertEqual((result['start'], result['end']), ('2025-02-11', '2025-03-31'))
+        days = {day['date']: day for day in result['days']}
+        self.assertNotIn('2025-02-10', days)
+        self.assertEqual(days['2025-02-28']['expense'], 1000.0)  # 31日は月末に丸める
+        self.assertEqual(days['2025-03-10'], {
+            'date': '2025-03-10', 'income': 0.0, 'expense': 1500.0, 'net': -1500.0, 'count': 2,
+        })
+        self.assertEqual(days['2025-02-25']['net'], 300000.0)
+        self.assertNotIn('2025-03-20', days)
+        self.assertEqual(result['months'], [
+            # 2月: 17・24日の週次、28日の月次、25日の収入
+            {'month': '2025-02', 'income': 300000.0, 'expense': 2000.0, 'net': 298000.0},
+            # 3月: 3・10・17・24・31日の週次、10・31日の月次、25日の収入
+            {'month': '2025-03', 'income': 300000.0, 'expense': 4500.0, 'net': 295500.0},
+        ])
+        self.assertEqual(result['total']['net'], 593500.0)
+
+    def test_matches_should_execute_on(self) -> None:
+        """日別の件数が、日ごとの should_execute_on による判定と一致する"""
+        from app.expenses.projections import project_recurring_payments
+
+        recurrings = [
+            self._create_recurring(frequency='daily', last_executed=date(2025, 1, 5)),
+            self._create_recurring(frequency='weekly', days_of_week=[2, 5]),
+            self._create_recurring(frequency='monthly', days_of_month=[1, 15, 31]),
+            self._create_recurring(frequency='yearly', month_of_year=2, days_of_month=[29]),
+        ]
+        result = project_recurring_payments(self.user, date(2025, 1, 1), 14, today=date(2025, 1, 1))
+
+        expected = {}
+        target = date(2025, 1, 2)
+        while target <= date(2026, 2, 28):
+            count = sum(recurring.should_execute_on(target) for recurring in recurrings)
+            if count:
+                expected[target.isoformat()] = count
+            target += timedelta(days=1)
+        self.assertEqual({day['date']: day['count'] for day in result['days']}, expected)
+
+    def test_single_query_for_many_payments(self) -> None:
+        """定期支払いが多くても読み込みは1クエリ"""
+        from app.expenses.projections import project_recurring_payments
+
+        category = CategoryFactory(user=self.user)
+        payment_method = PaymentMethodFactory(user=self.user)
+        RecurringPayment.objects.bulk_create([
+            RecurringPayment(
+                user=self.user, category=category, payment_method=payment_method,
+                purpose=f'定期{i}', amount=Decimal('100'),
+                frequency=('daily', 'weekly', 'monthly', 'yearly')[i % 4],
+                days_of_week=[i % 7], days_of_month=[i % 28 + 1], month_of_year=i % 12 + 1,
+            )
+            for i in range(100)
+        ])
+        with self.assertNumQueries(1):
+            result = project_recurring_payments(
+                self.user, date(2025, 1, 1), 12, today=date(2024, 12, 31),
+            )
+        self.assertEqual(len(result['months']), 12)
+        expected = sum(
+            len(list(recurring.occurrences_between(date(2025, 1, 1), date(2025, 12, 31))))
+            for recurring in RecurringPayment.objects.filter(user=self.user)
+        )
+        self.assertEqual(sum(day['count'] for day in result['days']), expected)
+
+    def test_projection_api(self) -> None:
+        """JSON で返し、months は上限に丸める"""
+        self._create_recurring(frequency='monthly', days_of_month=[1])
+        next_month = (timezone.localdate().replace(day=1) + timedelta(days=32)).replace(day=1)
+        response = self.client.get(reverse('recurring_payment_projection'), {
+            'target_date': next_month.strftime('%Y-%m'), 'months': '100',
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['months']), 24)
+        self.assertEqual(data['months'][0]['month'], next_month.strftime('%Y-%m'))
+        self.assertEqual(data['days'][0], {
+            'date': next_month.isoformat(),
+            'income': 0.0, 'expense': 1000.0, 'net': -1000.0, 'count': 1,
+        })
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_list_page_shows_projection(self) -> None:
+        """定期支払い一覧に今後の月別見込みを表示する"""
+        self._create_recurring(frequency='daily', amount=Decimal('100'))
+        response = self.client.get(reverse('recurring_payment_list'))
+        self.assertContains(response, '今後3か月の見込み')
+        self.assertEqual(len(response.context['projection']['months']), 3)
+
+
 class RecurringPaymentFormTest(TestCase):
     """定期支払いフォームのテスト"""
 
@@ -1124,6 +2346,21 @@ class RecurringPaymentViewTest(TestCase):
         )
         recurring.refresh_from_db()
         self.assertTrue(recurring.is_active)
+        # 停止していた期間の分は実行されず、再開日の分からは実行される
+        today = timezone.localdate()
+        self.assertEqual(recurring.last_executed, today - timedelta(days=1))
+
+    def test_resumed_recurring_runs_on_resume_day(self) -> None:
+        """再開した日の実行分は取りこぼさず、停止中の分は作成しない"""
+        recurring = self._create_recurring(
+            frequency='daily', is_active=False,
+            last_executed=timezone.localdate() - timedelta(days=10),
+        )
+        self.client.post(reverse('toggle_recurring_payment', kwargs={'recurring_id': recurring.id}))
+
+        today = timezone.localdate()
+        transactions = services.backfill_recurring_payments(today - timedelta(days=30), today)
+        self.assertEqual([timezone.localtime(t.date).date() for t in transactions], [today])
 
 
 class BudgetModelAndSelectorTest(TestCase):
@@ -1273,3 +2510,807 @@ class BudgetViewTest(TestCase):
         anon = Client()
         response = anon.get(reverse('budget'))
         self.assertIn(response.status_code, (302, 403))
+
+
+class BudgetHistoryTest(TestCase):
+    """月別の予算履歴と繰り越しのテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import selectors
+
+        self.selectors = selectors
+        self.user = UserFactory()
+        self.payment = PaymentMethodFactory(user=self.user)
+        self.food = CategoryFactory(user=self.user, name='食費')
+        self.fun = CategoryFactory(user=self.user, name='娯楽')
+        self.this_month = timezone.localdate().replace(day=1)
+
+    def _month(self, offset: int) -> date:
+        return self.selectors._add_months(self.this_month, offset)
+
+    def _spend(self, offset: int, amount: str, category=None) -> None:
+        TransactionFactory(
+            user=self.user, category=category or self.food, payment_method=self.payment,
+            transaction_type='expense', amount=Decimal(amount),
+            date=timezone.make_aware(
+                datetime.combine(self._month(offset).replace(day=15), datetime.min.time()),
+            ),
+        )
+
+    def _snapshot(self, offset: int, amount: str, category=None, rollover: bool = False) -> None:
+        from app.expenses.models import BudgetSnapshot
+
+        BudgetSnapshot.objects.create(
+            user=self.user, category=category, year_month=self._month(offset),
+            amount=Decimal(amount), rollover=rollover,
+        )
+
+    def test_history_uses_budget_in_effect_each_month(self) -> None:
+        """各月の予算はその月以前で最新のスナップショットの額"""
+        self._snapshot(-3, '10000', self.food)
+        self._snapshot(-1, '20000', self.food)
+        self._spend(-2, '8000')
+        self._spend(-1, '25000')
+
+        history = self.selectors.build_budget_history(self.user, self.this_month, 6)
+        months = {row['month']: row for row in history['months']}
+        self.assertEqual(len(history['months']), 6)
+        self.assertFalse(months[self._month(-4)]['categories'][self.food.id]['has_budget'])
+        food_2 = months[self._month(-2)]['categories'][self.food.id]
+        self.assertEqual(
+            (food_2['limit'], food_2['used'], food_2['status']),
+            (Decimal('10000'), Decimal('8000'), 'warning'),
+        )
+        food_1 = months[self._month(-1)]['categories'][self.food.id]
+        self.assertEqual(
+            (food_1['limit'], food_1['remaining'], food_1['status']),
+            (Decimal('20000'), Decimal('-5000'), 'over'),
+        )
+        self.assertEqual(
+            months[self.this_month]['categories'][self.food.id]['limit'], Decimal('20000'),
+        )
+        # 全体予算がなければカテゴリ予算の合計
+        self.assertFalse(months[self._month(-1)]['overall']['has_budget'])
+        self.assertEqual(months[self._month(-1)]['overall']['limit'], Decimal('20000'))
+
+    def test_cleared_budget_ends_history(self) -> None:
+        """amount=0 のスナップショット以降は予算なし"""
+        self._snapshot(-2, '10000', self.food)
+        self._snapshot(-1, '0', self.food)
+        history = self.selectors.build_budget_history(self.user, self.this_month, 3)
+        self.assertEqual(
+            [row['categories'][self.food.id]['has_budget'] for row in history['months']],
+            [True, False, False],
+        )
+
+    def test_rollover_carries_unspent_amount(self) -> None:
+        """繰り越し設定の月に余った分が翌月の予算に加算される"""
+        from app.expenses.models import Budget
+
+        Budget.objects.create(
+            user=self.user, category=self.food, amount=Decimal('10000'), rollover=True,
+        )
+        self._snapshot(-2, '10000', self.food, rollover=True)
+        self._spend(-2, '6000')
+        self._spend(-1, '12000')
+
+        history = self.selectors.build_budget_history(self.user, self.this_month, 3)
+        food = [row['categories'][self.food.id] for row in history['months']]
+        self.assertEqual(
+            [row['carryover'] for row in food], [Decimal('0'), Decimal('4000'), Decimal('2000')],
+        )
+        self.assertEqual(
+            [row['limit'] for row in food], [Decimal('10000'), Decimal('14000'), Decimal('12000')],
+        )
+
+        overview = self.selectors.build_budget_overview(
+            self.user, self.this_month.year, self.this_month.month,
+        )
+        row = next(r for r in overview['category_rows'] if r['category'].id == self.food.id)
+        self.assertEqual(
+            (row['amount'], row['carryover'], row['limit']),
+            (Decimal('10000'), Decimal('2000'), Decimal('12000')),
+        )
+
+    def test_rollover_before_window_is_included(self) -> None:
+        """表示期間より前から続く繰越額も計算に含める"""
+        self._snapshot(-5, '10000', self.food, rollover=True)
+        history = self.selectors.build_budget_history(self.user, self.this_month, 2)
+        food = history['months'][0]['categories'][self.food.id]
+        self.assertEqual(food['carryover'], Decimal('40000'))
+
+    def test_overall_rollover(self) -> None:
+        """全体予算の繰越額は全カテゴリの支出から計算する"""
+        self._snapshot(-1, '30000', rollover=True)
+        self._spend(-1, '10000', self.food)
+        self._spend(-1, '5000', self.fun)
+        history = self.selectors.build_budget_history(self.user, self.this_month, 2)
+        overall = history['months'][1]['overall']
+        self.assertTrue(overall['has_budget'])
+        self.assertEqual(
+            (overall['carryover'], overall['limit']), (Decimal('15000'), Decimal('45000')),
+        )
+
+    def test_query_count_does_not_grow_with_months(self) -> None:
+        """期間の長さによらずクエリ数は一定（支出は1回の GROUP BY）"""
+        self._snapshot(-30, '10000', self.food, rollover=True)
+        for offset in range(-23, 1):
+            self._spend(offset, '1000')
+        for months in (12, 24):
+            with self.assertNumQueries(4):
+                self.selectors.build_budget_history(self.user, self.this_month, months)
+
+    def test_setting_budget_records_snapshot(self) -> None:
+        """予算の設定・解除で今月のスナップショットが記録される"""
+        from app.expenses.models import BudgetSnapshot
+
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('budget'), {
+            'action': 'set_category', 'category_id': self.food.id,
+            'amount': '30000', 'rollover': 'on',
+        })
+        snapshot = BudgetSnapshot.objects.get(user=self.user, category=self.food)
+        self.assertEqual(
+            (snapshot.year_month, snapshot.amount, snapshot.rollover),
+            (self.this_month, Decimal('30000'), True),
+        )
+
+        client.post(reverse('budget'), {'action': 'delete_category', 'category_id': self.food.id})
+        snapshot.refresh_from_db()
+        self.assertEqual((snapshot.amount, snapshot.rollover), (Decimal('0'), False))
+
+    def test_history_view(self) -> None:
+        """予算履歴画面を期間・カテゴリで絞り込んで表示できる"""
+        self._snapshot(-1, '10000', self.food)
+        self._spend(-1, '7000')
+        client = Client()
+        client.force_login(self.user)
+
+        response = client.get(reverse('budget_history'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['rows']), 12)
+        self.assertEqual(response.context['rows'][0]['month'], self.this_month)
+
+        response = client.get(reverse('budget_history'), {'months': '24', 'category': self.food.id})
+        self.assertEqual(len(response.context['rows']), 24)
+        self.assertEqual(response.context['selected_category'], self.food)
+        self.assertEqual(response.context['rows'][1]['used'], Decimal('7000'))
+
+        response = client.get(reverse('budget_history'), {'months': '999'})
+        self.assertEqual(len(response.context['rows']), 12)
+
+
+class BudgetOverviewCacheTest(TestCase):
+    """予算サマリーのキャッシュと無効化のテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import selectors
+
+        self.selectors = selectors
+        self.user = UserFactory()
+        self.payment = PaymentMethodFactory(user=self.user)
+        self.category = CategoryFactory(user=self.user, name='食費')
+        self.today = timezone.localdate()
+
+    def _overview(self) -> dict:
+        return self.selectors.get_budget_overview(self.user, self.today.year, self.today.month)
+
+    def _food_used(self) -> Decimal:
+        rows = self._overview()['category_rows']
+        return next(r for r in rows if r['category'].id == self.category.id)['used']
+
+    def test_second_call_is_cache_read(self) -> None:
+        """2回目以降はクエリを発行しない"""
+        self._overview()
+        with self.assertNumQueries(0):
+            self._overview()
+
+    def test_invalidated_by_transaction_changes(self) -> None:
+        """取引の作成・更新・削除・一括削除で再計算される"""
+        self.assertEqual(self._food_used(), Decimal('0'))
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction = TransactionFactory(
+                user=self.user, amount=Decimal('1200'),
+                category=self.category, payment_method=self.payment,
+            )
+        self.assertEqual(self._food_used(), Decimal('1200'))
+
+        transaction.amount = Decimal('800')
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction.save()
+        self.assertEqual(self._food_used(), Decimal('800'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction.delete()
+        self.assertEqual(self._food_used(), Decimal('0'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction = TransactionFactory(
+                user=self.user, amount=Decimal('500'),
+                category=self.category, payment_method=self.payment,
+            )
+        self.assertEqual(self._food_used(), Decimal('500'))
+        client = Client()
+        client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(
+                reverse('bulk_delete_expenses'),
+                data=json.dumps({'ids': [transaction.id]}), content_type='application/json',
+            )
+        self.assertEqual(self._food_used(), Decimal('0'))
+
+    def test_invalidated_only_after_commit(self) -> None:
+        """キャッシュの無効化はコミット後に行う"""
+        self.assertEqual(self._food_used(), Decimal('0'))
+        with self.captureOnCommitCallbacks(execute=True):
+            TransactionFactory(
+                user=self.user, amount=Decimal('1200'),
+                category=self.category, payment_method=self.payment,
+            )
+            # コミット前に作り直されたキャッシュも、コミット後の無効化で取り除かれる
+            self._overview()
+        self.assertEqual(self._food_used(), Decimal('1200'))
+
+    def test_other_months_stay_cached(self) -> None:
+        """今月以降の別の月の取引の変更では、その月のキャッシュだけが無効化される"""
+        self._overview()
+        with self.captureOnCommitCallbacks(execute=True):
+            TransactionFactory(
+                user=self.user, date=timezone.now() + timedelta(days=62),
+                category=self.category, payment_method=self.payment,
+            )
+        with self.assertNumQueries(0):
+            self._overview()
+
+    def test_past_month_changes_invalidate_all_months(self) -> None:
+        """過去の月の取引の変更は繰越額に影響するため、全月分が無効化される"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._overview()
+        with self.captureOnCommitCallbacks(execute=True):
+            TransactionFactory(
+                user=self.user, date=timezone.now() - timedelta(days=62),
+                category=self.category, payment_method=self.payment,
+            )
+        with CaptureQueriesContext(connection) as queries:
+            self._overview()
+        self.assertGreater(len(queries), 0)
+
+    def test_invalidated_by_budget_and_category_changes(self) -> None:
+        """予算・カテゴリの変更で再計算される"""
+        from app.expenses.models import Budget
+
+        self.assertFalse(self._overview()['has_any_budget'])
+        with self.captureOnCommitCallbacks(execute=True):
+            budget = Budget.objects.create(
+                user=self.user, category=self.category, amount=Decimal('30000'),
+            )
+        self.assertTrue(self._overview()['has_any_budget'])
+
+        self.category.name = '食料品'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertEqual(self._overview()['category_rows'][0]['category'].name, '食料品')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            budget.delete()
+        self.assertFalse(self._overview()['has_any_budget'])
+
+    def test_other_users_not_affected(self) -> None:
+        """他のユーザーの変更ではキャッシュが残る"""
+        self._overview()
+        other = UserFactory()
+        with self.captureOnCommitCallbacks(execute=True):
+            TransactionFactory(user=other)
+            CategoryFactory(user=other)
+        with self.assertNumQueries(0):
+            self._overview()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    },
+})
+class DatabaseCacheInvalidationTest(TestCase):
+    """本番と同じ DatabaseCache で、キャッシュの無効化が発行するクエリ数のテスト"""
+
+    def setUp(self) -> None:
+        from django.core.management import call_command
+
+        from app.expenses import caching, selectors
+
+        call_command('createcachetable', verbosity=0)
+        self.caching = caching
+        self.selectors = selectors
+        self.user = UserFactory()
+        self.this_month = timezone.localdate().replace(day=1)
+        self.months = {
+            (self.user.pk, self.this_month),
+            (self.user.pk, (self.this_month + timedelta(days=31)).replace(day=1)),
+            (self.user.pk, (self.this_month + timedelta(days=62)).replace(day=1)),
+        }
+
+    def test_budget_months_deleted_in_one_query(self) -> None:
+        """バージョンの読み込みと月ごとのキーの削除をそれぞれ1クエリで行う"""
+        self.selectors.get_budget_overview(
+            self.user, self.this_month.year, self.this_month.month,
+        )
+        with self.assertNumQueries(2), self.captureOnCommitCallbacks(execute=True):
+            self.caching.invalidate_budget_overview_months(self.months)
+        # コミットまではキャッシュにアクセスしない
+        with self.assertNumQueries(0):
+            self.caching.invalidate_budget_overview_months(self.months)
+
+    def test_data_versions_read_once(self) -> None:
+        """現在のバージョンは1クエリで読み、コミット後に1回だけ書き込む"""
+        # DatabaseCache の set_many はキー1件ごとに、件数確認・存在確認・書き込みと
+        # セーブポイントの作成・解放を行う
+        queries_per_key = 5
+        with (
+            self.assertNumQueries(1 + queries_per_key * (1 + len(self.months))),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            self.caching.record_transaction_changes(self.months)
+
+
+class BudgetForecastTest(TestCase):
+    """予算の月末予測のテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import forecasting
+
+        self.forecasting = forecasting
+        self.user = UserFactory()
+        self.payment = PaymentMethodFactory(user=self.user)
+        self.food = CategoryFactory(user=self.user, name='食費')
+        self.rent = CategoryFactory(user=self.user, name='住居費')
+        self.today = date(2025, 4, 10)
+
+    def _expense(self, day: date, amount: int, category: Category) -> None:
+        TransactionFactory(
+            user=self.user, date=timezone.make_aware(datetime(day.year, day.month, day.day, 12)),
+            amount=Decimal(amount), category=category, payment_method=self.payment,
+        )
+
+    def _overview(self) -> dict:
+        from app.expenses import selectors
+
+        overview = selectors.build_budget_overview(self.user, self.today.year, self.today.month)
+        return self.forecasting.attach_budget_forecast(overview, self.user, self.today)
+
+    def _row(self, overview: dict, category: Category) -> dict:
+        return next(r for r in overview['category_rows'] if r['category'].id == category.id)
+
+    def test_curve_from_history(self) -> None:
+        """過去の月の日別支出から月平均の累積カーブを作る"""
+        for month in (1, 2, 3):
+            self._expense(date(2025, month, 5), 3000, self.food)
+            self._expense(date(2025, month, 25), 1000 * month, self.food)
+        self._expense(date(2025, 3, 1), 90000, self.rent)
+        self._expense(date(2024, 12, 5), 99999, self.food)  # 期間外
+
+        self.forecasting.refresh_spending_curves(self.user, today=self.today)
+        curves = {c.category_id: c for c in SpendingCurve.objects.filter(user=self.user)}
+        food = curves[self.food.id]
+        self.assertEqual(food.months, 3)
+        self.assertEqual(food.cumulative[3], Decimal('0'))
+        self.assertEqual(food.cumulative[4], Decimal('3000'))
+        self.assertEqual(food.cumulative[30], Decimal('5000'))
+        self.assertEqual(curves[self.rent.id].cumulative[0], Decimal('30000'))
+        self.assertEqual(curves[None].cumulative[30], Decimal('35000'))
+
+    def test_projection_and_over_date(self) -> None:
+        """今月の支出に残り日数分の平均支出を足し、予算を超える日を求める"""
+        from app.expenses.models import Budget
+
+        for month in (1, 2, 3):
+            for day in (5, 15, 25):
+                self._expense(date(2025, month, day), 2000, self.food)
+        Budget.objects.create(user=self.user, category=self.food, amount=Decimal('7000'))
+        self._expense(date(2025, 4, 3), 4000, self.food)
+        self.forecasting.refresh_spending_curves(self.user, today=self.today)
+
+        row = self._row(self._overview(), self.food)
+        # 4000 + 15日・25日の平均支出（2000 + 2000）
+        self.assertEqual(row['projected'], Decimal('8000'))
+        self.assertEqual(row['projected_over_date'], date(2025, 4, 25))
+
+    def test_no_history_uses_current_pace(self) -> None:
+        """履歴がなければ今月の1日あたりの支出で見積もる"""
+        from app.expenses.models import Budget
+
+        Budget.objects.create(user=self.user, category=self.food, amount=Decimal('20000'))
+        self._expense(date(2025, 4, 2), 10000, self.food)
+        row = self._row(self._overview(), self.food)
+        self.assertEqual(row['projected'], Decimal('30000'))
+        self.assertEqual(row['projected_over_date'], date(2025, 4, 21))
+        self.assertIsNone(self._row(self._overview(), self.rent)['projected_over_date'])
+
+    def test_months_without_spending_count_as_zero(self) -> None:
+        """支出が1か月分しかなくても、指定した月数で平均する"""
+        self._expense(date(2025, 3, 5), 9000, self.food)
+        self.forecasting.refresh_spending_curves(self.user, today=self.today)
+        curve = SpendingCurve.objects.get(user=self.user, category=self.food)
+        self.assertEqual(curve.months, 3)
+        self.assertEqual(curve.cumulative[30], Decimal('3000'))
+
+    def test_projection_uses_days_in_current_month(self) -> None:
+        """今月にない日（4月の31日）の平均支出は月末見込みに含めない"""
+        for month in (1, 3):
+            self._expense(date(2025, month, 31), 3000, self.food)
+        self._expense(date(2025, 2, 20), 3000, self.food)
+        self.forecasting.refresh_spending_curves(self.user, today=self.today)
+
+        row = self._row(self._overview(), self.food)
+        self.assertEqual(row['projected'], Decimal('1000'))
+        self.assertIsNone(row['projected_over_date'])
+
+    def test_users_without_history_get_empty_curve(self) -> None:
+        """全ユーザーの作り直しで、履歴のないユーザーにも空のカーブを保存し表示時に作り直さない"""
+        from app.expenses import selectors
+
+        self.forecasting.refresh_spending_curves(today=self.today)
+        curve = SpendingCurve.objects.get(user=self.user, category=None)
+        self.assertEqual(curve.months, 0)
+        overview = selectors.build_budget_overview(self.user, self.today.year, self.today.month)
+        with self.assertNumQueries(1):
+            self.forecasting.attach_budget_forecast(overview, self.user, self.today)
+
+    def test_render_reads_precomputed_curves(self) -> None:
+        """保存済みのカーブがあれば、表示時は1クエリで読むだけ"""
+        from app.expenses import selectors
+
+        self._expense(date(2025, 3, 5), 1000, self.food)
+        self.forecasting.refresh_spending_curves(today=self.today)
+        overview = selectors.build_budget_overview(self.user, self.today.year, self.today.month)
+        with self.assertNumQueries(1):
+            self.forecasting.attach_budget_forecast(overview, self.user, self.today)
+
+    def test_command_refreshes_all_users(self) -> None:
+        """forecast_budgets コマンドで全ユーザーのカーブを作り直す"""
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        self._expense(timezone.localdate().replace(day=1) - timedelta(days=3), 1000, self.food)
+        TransactionFactory(date=timezone.now() - timedelta(days=40))
+        out = StringIO()
+        call_command('forecast_budgets', stdout=out)
+        self.assertIn('作り直しました', out.getvalue())
+        self.assertTrue(SpendingCurve.objects.filter(user=self.user, category=self.food).exists())
+
+    def test_budget_page_shows_projection(self) -> None:
+        """予算画面に月末見込みが表示される"""
+        from app.expenses.models import Budget
+
+        Budget.objects.create(user=self.user, category=self.food, amount=Decimal('30000'))
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('budget'))
+        self.assertContains(response, '月末見込み')
+
+
+class ChartPayloadCacheTest(TestCase):
+    """月表示グラフデータのキャッシュとデータバージョンのテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import selectors
+
+        self.selectors = selectors
+        self.user = UserFactory()
+        self.payment = PaymentMethodFactory(user=self.user)
+        self.category = CategoryFactory(user=self.user, name='食費')
+        self.this_month = timezone.localdate().replace(day=1)
+        self.last_month = (self.this_month - timedelta(days=1)).replace(day=1)
+
+    def _payload(self, year_month: date, **filters: str) -> dict[str, str]:
+        start_date, end_date, date_range = self.selectors.get_date_range(
+            year_month.strftime('%Y-%m'),
+        )
+        filters = {
+            'search': '', 'transaction_type': '', 'major_category': '',
+            'category_id': '', 'payment_method_id': '', **filters,
+        }
+        transactions_qs = self.selectors.get_transactions(
+            self.user, start_date, end_date, **filters,
+        )
+        aggregate_qs = self.selectors.get_aggregate_queryset(
+            self.user, start_date, end_date, transactions_qs, **filters,
+        )
+        return self.selectors.get_month_chart_payload(
+            self.user, year_month, filters, aggregate_qs, transactions_qs, date_range,
+        )
+
+    def _spend(self, year_month: date, amount: str = '1000') -> None:
+        when = datetime.combine(year_month.replace(day=10), datetime.min.time())
+        with self.captureOnCommitCallbacks(execute=True):
+            TransactionFactory(
+                user=self.user, category=self.category, payment_method=self.payment,
+                transaction_type='expense', amount=Decimal(amount),
+                date=timezone.make_aware(when),
+            )
+
+    def _save(self, instance: Category | PaymentMethod) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def _category_total(self, payload: dict[str, str]) -> float:
+        return sum(json.loads(payload['category_data_json'])['datasets'][0]['data'])
+
+    def test_second_call_is_cache_read(self) -> None:
+        """同じ月・同じ条件ならグラフは集計し直さない"""
+        self._spend(self.last_month)
+        first = self._payload(self.last_month)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._payload(self.last_month), first)
+
+    def test_transaction_write_recomputes_only_that_month(self) -> None:
+        """取引を書き込んだ月だけが再計算され、他の月はキャッシュのまま"""
+        self._spend(self.last_month, '1000')
+        self._spend(self.this_month, '2000')
+        self._payload(self.last_month)
+        self.assertEqual(self._category_total(self._payload(self.this_month)), 2000)
+
+        self._spend(self.this_month, '500')
+        with self.assertNumQueries(0):
+            self._payload(self.last_month)
+        self.assertEqual(self._category_total(self._payload(self.this_month)), 2500)
+
+    def test_data_version_bumped_on_writes(self) -> None:
+        """取引・カテゴリの書き込みでユーザーのデータバージョンが上がる"""
+        from app.expenses import caching
+
+        version = caching.data_version(self.user.pk)
+        self._spend(self.this_month)
+        self.assertGreater(caching.data_version(self.user.pk), version)
+
+        version = caching.data_version(self.user.pk)
+        self.category.chart_color = '#123456'
+        self._save(self.category)
+        self.assertGreater(caching.data_version(self.user.pk), version)
+
+    def test_category_change_recomputes_past_months(self) -> None:
+        """カテゴリの色・名前の変更は過去の月のグラフにも反映される"""
+        self._spend(self.last_month)
+        self._payload(self.last_month)
+        self.category.chart_color = '#123456'
+        self._save(self.category)
+        payload = self._payload(self.last_month)
+        colors = json.loads(payload['category_data_json'])['datasets'][0]['backgroundColor']
+        self.assertEqual(colors[0], '#123456')
+
+    def test_payment_method_change_recomputes_past_months(self) -> None:
+        """支払方法の名前の変更は過去の月のグラフにも反映される"""
+        self._spend(self.last_month)
+        self._payload(self.last_month)
+        self.payment.name = 'クレジットカード'
+        self._save(self.payment)
+        payload = self._payload(self.last_month)
+        labels = json.loads(payload['payment_method_data_json'])['labels']
+        self.assertEqual(labels, ['クレジットカード'])
+
+    def test_filters_are_cached_separately(self) -> None:
+        """絞り込み条件ごとに別のキャッシュを使う"""
+        self._spend(self.last_month)
+        self._payload(self.last_month)
+        payload = self._payload(self.last_month, transaction_type='income')
+        self.assertEqual(json.loads(payload['category_data_json'])['labels'], ['データなし'])
+
+    def test_past_months_cached_longer(self) -> None:
+        """過去の月は長め、今月は短めの期限付きでキャッシュする（無期限にはしない）"""
+        from app.expenses import caching
+
+        self.assertEqual(
+            caching.chart_cache_timeout(self.last_month), caching.PAST_MONTH_CHART_CACHE_TIMEOUT,
+        )
+        self.assertEqual(caching.chart_cache_timeout(self.this_month), caching.CHART_CACHE_TIMEOUT)
+
+
+
+class ExpenseChartApiTest(TestCase):
+    """グラフデータ API（ETag / Last-Modified と 304）のテスト"""
+
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.payment = PaymentMethodFactory(user=self.user)
+        self.category = CategoryFactory(user=self.user, name='食費')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def _spend(self, amount: str = '1000', when: datetime | None = None) -> Transaction:
+        with self.captureOnCommitCallbacks(execute=True):
+            return TransactionFactory(
+                user=self.user, category=self.category, payment_method=self.payment,
+                transaction_type='expense', amount=Decimal(amount), date=when or timezone.now(),
+            )
+
+    def test_sends_validators(self) -> None:
+        """ETag・Last-Modified を付け、毎回再検証させる"""
+        response = self.client.get(reverse('expense_chart_data', args=['category']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'])
+        self.assertTrue(response['Last-Modified'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_not_modified_until_data_changes(self) -> None:
+        """データが変わるまで 304、取引を書き込むと 200 で新しい内容を返す"""
+        self._spend('1000')
+        url = reverse('expense_chart_data', args=['category'])
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self._spend('500')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['datasets'][0]['data'], [1500.0])
+
+    def test_if_modified_since(self) -> None:
+        """If-Modified-Since でも 304 を返す"""
+        url = reverse('expense_chart_data', args=['daily'])
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_filters_and_month(self) -> None:
+        """絞り込み条件・対象月が違えば別の ETag"""
+        url = reverse('expense_chart_data', args=['category'])
+        etags = {
+            self.client.get(url)['ETag'],
+            self.client.get(url, {'transaction_type': 'income'})['ETag'],
+            self.client.get(url, {'target_date': '2020-01'})['ETag'],
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_other_month_write_keeps_month_etag(self) -> None:
+        """別の月の取引の書き込みでは、月表示のグラフは 304 のまま"""
+        url = reverse('expense_chart_data', args=['category'])
+        params = {'target_date': '2020-01'}
+        etag = self.client.get(url, params)['ETag']
+        self._spend('1000')
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_monthly_chart(self) -> None:
+        """年表示の月別グラフ"""
+        self._spend('2000', timezone.make_aware(datetime(2025, 3, 10, 12)))
+        response = self.client.get(
+            reverse('expense_chart_data', args=['monthly']),
+            {'view_mode': 'year', 'target_date': '2025'},
+        )
+        self.assertEqual(response.json()['datasets'][1]['data'][2], 2000.0)
+
+    def test_unknown_chart_and_login_required(self) -> None:
+        response = self.client.get(reverse('expense_chart_data', args=['unknown']))
+        self.assertEqual(response.status_code, 404)
+        response = Client().get(reverse('expense_chart_data', args=['category']))
+        self.assertEqual(response.status_code, 302)
+
+    def test_list_paging_does_not_build_charts(self) -> None:
+        """一覧のページ送り・並び替えではグラフの集計を行わない"""
+        from app.expenses import selectors
+
+        for _ in range(25):
+            self._spend()
+        with patch.object(selectors, 'build_category_chart_data') as category, \
+                patch.object(selectors, 'build_daily_chart_data') as daily, \
+                patch.object(selectors, 'build_monthly_chart_data') as monthly:
+            for params in ({'page': '2'}, {'sort_by': 'amount_desc'}, {'view_mode': 'year'}):
+                response = self.client.get(reverse('expense_list'), params)
+                self.assertEqual(response.status_code, 200)
+        category.assert_not_called()
+        daily.assert_not_called()
+        monthly.assert_not_called()
+        # グラフ API には表のページ・並び順を渡さない
+        response = self.client.get(
+            reverse('expense_list'), {'page': '2', 'sort_by': 'amount_desc', 'search': '昼'},
+        )
+        self.assertEqual(response.context['chart_query'], 'search=%E6%98%BC')
+
+
+class ExpenseAnalyticsTest(TestCase):
+    """前月比・前年同月比（analytics）のテスト"""
+
+    def setUp(self) -> None:
+        from app.expenses import analytics
+
+        self.analytics = analytics
+        self.user = UserFactory()
+        self.cash = PaymentMethodFactory(user=self.user, name='現金')
+        self.card = PaymentMethodFactory(user=self.user, name='カード')
+        self.food = CategoryFactory(user=self.user, name='食費')
+        self.fun = CategoryFactory(user=self.user, name='娯楽')
+        self.month = date(2025, 6, 1)
+
+    def _spend(
+        self, year_month: date, amount: str,
+        category=None, payment_method=None, major_category='variable',
+    ) -> None:
+        TransactionFactory(
+            user=self.user, category=category or self.food,
+            payment_method=payment_method or self.cash, transaction_type='expense',
+            amount=Decimal(amount), major_category=major_category,
+            date=timezone.make_aware(datetime(year_month.year, year_month.month, 10, 12)),
+        )
+
+    def _row(self, rows: list[dict], label: str) -> dict:
+        return next(row for row in rows if row['label'] == label)
+
+    def test_month_over_month_and_year_over_year(self) -> None:
+        """当月・前月・前年同月を1行に並べ、増減と増減率を返す"""
+        self._spend(date(2025, 6, 1), '12000')
+        self._spend(date(2025, 5, 1), '10000')
+        self._spend(date(2024, 6, 1), '8000')
+        self._spend(date(2025, 6, 1), '3000', category=self.fun)
+
+        with self.assertNumQueries(1):
+            rows = self.analytics.compare_dimension(self.user, self.month, 'category')
+        food = self._row(rows, '食費')
+        self.assertEqual(
+            (food['current'], food['previous_month'], food['same_month_last_year']),
+            (12000.0, 10000.0, 8000.0),
+        )
+        self.assertEqual((food['mom_change'], food['mom_rate']), (2000.0, 20.0))
+        self.assertEqual((food['yoy_change'], food['yoy_rate']), (4000.0, 50.0))
+        fun = self._row(rows, '娯楽')
+        self.assertEqual((fun['previous_month'], fun['mom_rate']), (0.0, None))
+        self.assertEqual(rows[0]['label'], '食費')
+
+    def test_skipped_months_are_not_compared(self) -> None:
+        """支出のない月を飛ばした直前の月は前月として扱わない"""
+        self._spend(date(2025, 6, 1), '5000')
+        self._spend(date(2025, 4, 1), '9000')
+        self._spend(date(2023, 6, 1), '7000')
+        rows = self.analytics.compare_dimension(self.user, self.month, 'category')
+        food = self._row(rows, '食費')
+        self.assertEqual((food['previous_month'], food['same_month_last_year']), (0.0, 0.0))
+
+    def test_items_without_current_spending(self) -> None:
+        """当月に支出がなく比較月にだけある項目も当月 0 で含める"""
+        self._spend(date(2024, 6, 1), '4000', payment_method=self.card)
+        rows = self.analytics.compare_dimension(self.user, self.month, 'payment_method')
+        card = self._row(rows, 'カード')
+        self.assertEqual(
+            (card['current'], card['same_month_last_year'], card['yoy_rate']),
+            (0.0, 4000.0, -100.0),
+        )
+
+    def test_major_category_labels(self) -> None:
+        self._spend(date(2025, 6, 1), '1000', major_category='fixed')
+        rows = self.analytics.compare_dimension(self.user, self.month, 'major_category')
+        self.assertEqual([row['label'] for row in rows], ['固定費'])
+
+    def test_period_comparison_cached_until_data_changes(self) -> None:
+        """ユーザー・月ごとにキャッシュし、比較対象の月の取引が変われば作り直す"""
+        self._spend(date(2025, 6, 1), '1000')
+        first = self.analytics.get_period_comparison(self.user, self.month)
+        self.assertEqual(set(first['dimensions']), {'category', 'payment_method', 'major_category'})
+        self.assertEqual(first['same_month_last_year'], '2024-06')
+        with self.assertNumQueries(0):
+            self.analytics.get_period_comparison(self.user, self.month)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._spend(date(2024, 6, 1), '500')
+        result = self.analytics.get_period_comparison(self.user, self.month)
+        food = self._row(result['dimensions']['category'], '食費')
+        self.assertEqual(food['same_month_last_year'], 500.0)
+
+    def test_endpoint(self) -> None:
+        """JSON エンドポイントと ETag による 304"""
+        self._spend(date(2025, 6, 1), '1000')
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('expense_analytics')
+        response = client.get(url, {'target_date': '2025-06'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['dimensions']['category'][0]['current'], 1000.0)
+        response = client.get(url, {'target_date': '2025-06'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(Client().get(url).status_code, 302)
@@ -4,7 +4,9 @@
 from datetime import datetime, time, timedelta
 from unittest.mock import MagicMock, patch
 
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from app.home_views import build_dashboard_context
@@ -45,6 +47,11 @@ def build_test_ics(base_date: datetime) -> bytes:
     return '\r\n'.join(lines).encode('utf-8')
 
 
+def _patch_fetch(ics: bytes) -> object:
+    """ICS の取得を、ics を返すものに差し替える。"""
+    return patch('app.task.services.fetch_external_ics', return_value=services.IcsFetchResult(ics))
+
+
 class UrlValidationTest(TestCase):
     """URL正規化とSSRF対策のテスト"""
 
@@ -95,7 +102,7 @@ class SyncExternalCalendarTest(TestCase):
     def test_sync_creates_events_with_rrule_expansion(self) -> None:
         """時間指定・終日・RRULE展開を含むイベントが取り込まれること"""
         ics = build_test_ics(self.base_date)
-        with patch('app.task.services.fetch_external_ics', return_value=ics):
+        with _patch_fetch(ics):
             count = services.sync_external_calendar(self.calendar)
 
         # 単発1 + 終日1 + 週次3回 = 5件
@@ -121,7 +128,7 @@ class SyncExternalCalendarTest(TestCase):
     def test_sync_replaces_existing_events(self) -> None:
         """再同期でイベントが洗い替えされ重複しないこと"""
         ics = build_test_ics(self.base_date)
-        with patch('app.task.services.fetch_external_ics', return_value=ics):
+        with _patch_fetch(ics):
             services.sync_external_calendar(self.calendar)
             services.sync_external_calendar(self.calendar)
         self.assertEqual(self.calendar.events.count(), 5)
@@ -129,7 +136,7 @@ class SyncExternalCalendarTest(TestCase):
     def test_sync_failure_records_error_and_keeps_events(self) -> None:
         """同期失敗時はエラーを記録し、既存イベントを保持すること"""
         ics = build_test_ics(self.base_date)
-        with patch('app.task.services.fetch_external_ics', return_value=ics):
+        with _patch_fetch(ics):
             services.sync_external_calendar(self.calendar)
 
         with patch('app.task.services.fetch_external_ics', side_effect=ValueError('接続エラー')):
@@ -142,6 +149,93 @@ class SyncExternalCalendarTest(TestCase):
         self.assertEqual(self.calendar.events.count(), 5)
 
 
+def _ics_response(status_code: int, body: bytes = b'', headers: dict | None = None) -> MagicMock:
+    response = MagicMock()
+    response.is_redirect = False
+    response.is_permanent_redirect = False
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.iter_content.return_value = [body]
+    return response
+
+
+def _event_writes(ctx: CaptureQueriesContext) -> list[str]:
+    prefixes = (
+        'INSERT INTO "app_externalevent"',
+        'UPDATE "app_externalevent"',
+        'DELETE FROM "app_externalevent"',
+    )
+    return [
+        query['sql'].split(' ', 1)[0]
+        for query in ctx.captured_queries if query['sql'].startswith(prefixes)
+    ]
+
+
+class IncrementalSyncTest(TestCase):
+    """条件付き取得と差分同期のテスト"""
+
+    def setUp(self) -> None:
+        self.calendar = ExternalCalendar.objects.create(
+            user=UserFactory(), name='テストカレンダー', url='https://93.184.216.34/cal.ics',
+        )
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.ics = build_test_ics(datetime.combine(tomorrow, time.min))
+
+    def _sync_content(self, ics: bytes) -> int:
+        with _patch_fetch(ics):
+            return services.sync_external_calendar(self.calendar)
+
+    def test_not_modified_skips_parsing(self) -> None:
+        """当日に取り込み済みなら検証子を送り、304 なら解析せずに既存のイベントを残すこと"""
+        validators = {'ETag': '"v1"', 'Last-Modified': 'Wed, 14 Oct 2026 00:00:00 GMT'}
+        response = _ics_response(200, self.ics, validators)
+        with patch('requests.get', return_value=response) as mock_get:
+            services.sync_external_calendar(self.calendar)
+        self.assertNotIn('If-None-Match', mock_get.call_args.kwargs['headers'])
+        self.assertEqual(self.calendar.etag, '"v1"')
+
+        with patch('requests.get', return_value=_ics_response(304)) as mock_get, \
+                patch('icalendar.Calendar.from_ical') as mock_parse:
+            count = services.sync_external_calendar(self.calendar)
+        headers = mock_get.call_args.kwargs['headers']
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(headers['If-Modified-Since'], validators['Last-Modified'])
+        mock_parse.assert_not_called()
+        self.assertEqual(count, 5)
+        self.assertEqual(self.calendar.events.count(), 5)
+
+        # 日が変わると購読範囲が進むので、検証子を送らずに取り込み直す
+        self.calendar.content_synced_on = timezone.localdate() - timedelta(days=1)
+        response = _ics_response(200, self.ics, validators)
+        with patch('requests.get', return_value=response) as mock_get:
+            services.sync_external_calendar(self.calendar)
+        self.assertNotIn('If-None-Match', mock_get.call_args.kwargs['headers'])
+        self.calendar.refresh_from_db()
+        self.assertEqual(self.calendar.content_synced_on, timezone.localdate())
+
+    def test_only_changed_events_are_written(self) -> None:
+        """内容が同じなら書き込まず、変わったときは変更・削除されたイベントだけを書き込むこと"""
+        self._sync_content(self.ics)
+        weekly_ids = set(self.calendar.events.filter(uid='weekly-1').values_list('id', flat=True))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._sync_content(self.ics), 5)
+        self.assertEqual(_event_writes(ctx), [])
+
+        changed = self.ics.replace('歯科検診'.encode(), '歯科検診（再診）'.encode())
+        changed = changed.replace(b'UID:allday-1', b'UID:allday-2')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self._sync_content(changed), 5)
+        self.assertEqual(sorted(_event_writes(ctx)), ['DELETE', 'INSERT', 'UPDATE'])
+        weekly = self.calendar.events.filter(uid='weekly-1')
+        self.assertEqual(set(weekly.values_list('id', flat=True)), weekly_ids)
+        self.assertEqual(self.calendar.events.get(uid='single-1').title, '歯科検診（再診）')
+        self.assertEqual(
+            set(self.calendar.events.values_list('uid', flat=True)),
+            {'allday-2', 'single-1', 'weekly-1'},
+        )
+
+
 class ExternalCalendarViewTest(TestCase):
     """タスク設定画面の外部カレンダー管理のテスト"""
 
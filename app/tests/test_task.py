@@ -1,17 +1,25 @@
 """
 タスク管理機能のテスト
 """
-from datetime import timedelta
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
 
-from django.test import TestCase, Client
+from django.test import Client, TestCase
 from django.urls import reverse
 from django.utils import timezone
 
-import json
-
-from app.task.models import Task, TaskLabel, TempTaskItem, TempTaskSet
+from app.task import selectors, services
 from app.task.forms import TaskForm, TaskLabelForm
-from tests.factories import UserFactory, TaskLabelFactory
+from app.task.models import (
+    ExternalCalendar,
+    ExternalEvent,
+    Task,
+    TaskLabel,
+    TempTaskItem,
+    TempTaskSet,
+)
+from tests.factories import TaskLabelFactory, UserFactory
 
 
 class TaskLabelModelTest(TestCase):
@@ -576,9 +584,16 @@ class RecurringTaskTest(TestCase):
     def setUp(self) -> None:
         self.user = UserFactory()
 
+    def _occurrences(self, parent_task: Task) -> list[Task]:
+        """親タスク自身を除く繰り返しの回（仮想の回）を開始日時の順に返す。"""
+        from app.task import recurrence
+
+        range_end = parent_task.start_date + timedelta(days=400)
+        occurrences = recurrence.expand_occurrences(self.user, parent_task.start_date, range_end)
+        return sorted(occurrences, key=lambda task: task.start_date)
+
     def test_recurring_task_creates_child_tasks(self) -> None:
-        """繰り返しタスクが子タスクを正しく生成するかのテスト"""
-        from app.task.services import create_recurring_tasks
+        """繰り返しタスクが各回を正しく展開するかのテスト"""
 
         parent_task = Task.objects.create(
             user=self.user,
@@ -591,22 +606,20 @@ class RecurringTaskTest(TestCase):
             status='not_started'
         )
 
-        create_recurring_tasks(parent_task)
+        # 2回目以降の5回分が展開されることを確認
+        child_tasks = self._occurrences(parent_task)
+        self.assertEqual(len(child_tasks), 5)
 
-        # 子タスクが5個生成されることを確認
-        child_tasks = Task.objects.filter(parent_task=parent_task)
-        self.assertEqual(child_tasks.count(), 5)
-
-        # 各子タスクの開始日が正しく設定されていることを確認
-        for i, child in enumerate(child_tasks.order_by('start_date'), start=1):
+        # 各回の開始日が正しく設定されていることを確認
+        for i, child in enumerate(child_tasks, start=1):
             expected_date = parent_task.start_date + timedelta(days=i)
             self.assertEqual(child.start_date.date(), expected_date.date())
             self.assertEqual(child.title, parent_task.title)
             self.assertEqual(child.status, 'not_started')
 
     def test_recurring_task_without_start_date_no_children(self) -> None:
-        """開始日なしの繰り返しタスクは子タスクを生成しないテスト"""
-        from app.task.services import create_recurring_tasks
+        """開始日なしの繰り返しタスクは回を展開しないテスト"""
+        from app.task import recurrence
 
         parent_task = Task.objects.create(
             user=self.user,
@@ -617,15 +630,14 @@ class RecurringTaskTest(TestCase):
             status='not_started'
         )
 
-        create_recurring_tasks(parent_task)
-
-        # 子タスクが生成されないことを確認
-        child_tasks = Task.objects.filter(parent_task=parent_task)
-        self.assertEqual(child_tasks.count(), 0)
+        # 回が展開されないことを確認
+        self.assertFalse(recurrence.is_recurring(parent_task))
+        range_start = timezone.now() - timedelta(days=1)
+        range_end = range_start + timedelta(days=10)
+        self.assertEqual(recurrence.expand_occurrences(self.user, range_start, range_end), [])
 
     def test_delete_parent_task_deletes_children(self) -> None:
-        """親タスク削除時に子タスクもカスケード削除されるテスト"""
-        from app.task.services import create_recurring_tasks
+        """親タスク削除時に保存済みの回（例外）もカスケード削除されるテスト"""
 
         parent_task = Task.objects.create(
             user=self.user,
@@ -637,9 +649,9 @@ class RecurringTaskTest(TestCase):
             status='not_started'
         )
 
-        create_recurring_tasks(parent_task)
-
-        # 子タスクが3個あることを確認
+        # 各回を例外として保存し、3個あることを確認
+        for occurrence in self._occurrences(parent_task):
+            occurrence.save()
         self.assertEqual(Task.objects.filter(parent_task=parent_task).count(), 3)
 
         # 親タスクを削除（削除後はpkがNoneになるため事前に保存）
@@ -650,8 +662,7 @@ class RecurringTaskTest(TestCase):
         self.assertEqual(Task.objects.filter(parent_task_id=parent_task_pk).count(), 0)
 
     def test_update_recurring_task_regenerates_children(self) -> None:
-        """繰り返しタスクの更新時に子タスクが再生成されるテスト"""
-        from app.task.services import create_recurring_tasks
+        """繰り返しタスクの更新時に展開される回が変わるテスト"""
 
         parent_task = Task.objects.create(
             user=self.user,
@@ -663,25 +674,18 @@ class RecurringTaskTest(TestCase):
             status='not_started'
         )
 
-        create_recurring_tasks(parent_task)
-        initial_count = Task.objects.filter(parent_task=parent_task).count()
-        self.assertEqual(initial_count, 3)
+        self.assertEqual(len(self._occurrences(parent_task)), 3)
 
         # 繰り返し回数を変更
         parent_task.repeat_count = 5
         parent_task.save()
 
-        # 既存の子タスクを削除して再生成
-        Task.objects.filter(parent_task=parent_task).delete()
-        create_recurring_tasks(parent_task)
-
-        # 新しい子タスクが5個生成されることを確認
-        updated_count = Task.objects.filter(parent_task=parent_task).count()
-        self.assertEqual(updated_count, 5)
+        # 5回分が展開されることを確認（子タスクの作り直しは不要）
+        self.assertEqual(len(self._occurrences(parent_task)), 5)
+        self.assertFalse(Task.objects.filter(parent_task=parent_task).exists())
 
     def test_weekly_recurring_task_dates(self) -> None:
         """毎週繰り返しタスクの日付が正しく設定されるテスト"""
-        from app.task.services import create_recurring_tasks
 
         start = timezone.now()
         parent_task = Task.objects.create(
@@ -694,16 +698,14 @@ class RecurringTaskTest(TestCase):
             status='not_started'
         )
 
-        create_recurring_tasks(parent_task)
-
-        child_tasks = Task.objects.filter(parent_task=parent_task).order_by('start_date')
+        child_tasks = self._occurrences(parent_task)
+        self.assertEqual(len(child_tasks), 4)
         for i, child in enumerate(child_tasks, start=1):
             expected_date = start + timedelta(weeks=i)
             self.assertEqual(child.start_date.date(), expected_date.date())
 
     def test_monthly_recurring_task_dates(self) -> None:
         """毎月繰り返しタスクの日付が正しく設定されるテスト"""
-        from app.task.services import create_recurring_tasks
         from dateutil.relativedelta import relativedelta
 
         start = timezone.now()
@@ -717,12 +719,12 @@ class RecurringTaskTest(TestCase):
             status='not_started'
         )
 
-        create_recurring_tasks(parent_task)
-
-        child_tasks = Task.objects.filter(parent_task=parent_task).order_by('start_date')
+        # 月の加算はローカル時刻で行う（月末は丸める）
+        child_tasks = self._occurrences(parent_task)
+        self.assertEqual(len(child_tasks), 3)
         for i, child in enumerate(child_tasks, start=1):
-            expected_date = start + relativedelta(months=i)
-            self.assertEqual(child.start_date.date(), expected_date.date())
+            expected_date = timezone.localtime(start) + relativedelta(months=i)
+            self.assertEqual(timezone.localtime(child.start_date).date(), expected_date.date())
 
 
 class TaskFormEdgeCaseTest(TestCase):
@@ -1030,3 +1032,318 @@ class TempTaskSetApiTest(TestCase):
         data = json.loads(response.content)
         self.assertEqual(len(data['tasks']), 1)
         self.assertEqual(data['tasks'][0]['title'], 'セット1のタスク')
+
+
+class TaskCalendarDataTest(TestCase):
+    """月表示カレンダーデータ（build_calendar_data）のテスト"""
+
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.month_start = timezone.make_aware(datetime(2025, 3, 1))
+        self.month_end = timezone.make_aware(datetime(2025, 4, 1)) - timedelta(microseconds=1)
+
+    def _build(self) -> dict:
+        month_tasks = selectors.get_month_tasks(
+            self.user, self.month_start - timedelta(days=7), self.month_end + timedelta(days=7),
+        )
+        external_events = selectors.get_external_events(
+            self.user, self.month_start - timedelta(days=7), self.month_end + timedelta(days=7),
+        )
+        with self.assertNumQueries(1):
+            calendar_data, _ = selectors.build_calendar_data(
+                month_tasks, 2025, 3, 'sunday', external_events=external_events,
+            )
+        return {(cell['month'], cell['day']): cell for week in calendar_data for cell in week}
+
+    def _aware(self, *args: int) -> datetime:
+        return timezone.make_aware(datetime(*args))
+
+    def test_tasks_are_bucketed_into_spanned_days_with_one_query(self) -> None:
+        """複数日にまたがるタスクは期間内の各日に入り、タスクの取得は1クエリ"""
+        Task.objects.create(
+            user=self.user, title='出張',
+            start_date=self._aware(2025, 3, 10, 9), end_date=self._aware(2025, 3, 12, 18),
+        )
+        Task.objects.create(
+            user=self.user, title='締切なし', start_date=self._aware(2025, 3, 30, 9),
+        )
+        cells = self._build()
+
+        self.assertEqual(cells[(3, 9)]['task_count'], 0)
+        for day in (10, 11, 12):
+            self.assertEqual([task.title for task in cells[(3, day)]['tasks']], ['出張'])
+        self.assertEqual(cells[(3, 13)]['task_count'], 0)
+        # 終了日時のないタスクはグリッドの最後の日まで続く
+        self.assertEqual(cells[(4, 5)]['task_count'], 1)
+        self.assertEqual(cells[(3, 29)]['task_count'], 0)
+
+    def test_day_shows_first_five_items_in_display_order(self) -> None:
+        """1日のセルは終日→開始時刻の順で先頭5件を表示し、件数は全件を数える"""
+        for hour in range(6, 0, -1):
+            Task.objects.create(
+                user=self.user, title=f'{hour}時',
+                start_date=self._aware(2025, 3, 5, hour),
+                end_date=self._aware(2025, 3, 5, hour, 30),
+            )
+        Task.objects.create(
+            user=self.user, title='終日', all_day=True,
+            start_date=self._aware(2025, 3, 5), end_date=self._aware(2025, 3, 5, 23, 59, 59),
+        )
+        calendar = ExternalCalendar.objects.create(
+            user=self.user, name='仕事', url='https://example.com/a.ics',
+        )
+        ExternalEvent.objects.create(
+            calendar=calendar, title='外部', start_date=self._aware(2025, 3, 5, 1, 30),
+        )
+        cells = self._build()
+
+        self.assertEqual(cells[(3, 5)]['task_count'], 8)
+        self.assertEqual(
+            [item.title for item in cells[(3, 5)]['tasks']],
+            ['終日', '1時', '外部', '2時', '3時'],
+        )
+        # 終了日時のない外部イベントは開始日だけに表示する
+        self.assertEqual(cells[(3, 6)]['task_count'], 0)
+
+    def test_open_ended_and_point_ranges(self) -> None:
+        """開始・終了日時の空の側は無限に続き、繰り返しの回は終了日時がなければ開始日時だけになる"""
+        Task.objects.create(user=self.user, title='継続', start_date=self._aware(2025, 2, 10, 9))
+        Task.objects.create(user=self.user, title='期限', end_date=self._aware(2025, 3, 20, 18))
+        Task.objects.create(user=self.user, title='未定')
+        parent = Task.objects.create(
+            user=self.user, title='週次', frequency='weekly',
+            start_date=self._aware(2025, 2, 17, 9),
+        )
+        Task.objects.create(
+            user=self.user, title='週次', parent_task=parent,
+            start_date=self._aware(2025, 2, 24, 9), recurrence_id=self._aware(2025, 2, 24, 9),
+        )
+        # 終了が開始より前の期間も保存でき、開始日時だけの予定になる
+        Task.objects.create(
+            user=self.user, title='逆転',
+            start_date=self._aware(2025, 3, 15, 9), end_date=self._aware(2025, 3, 14, 9),
+        )
+        cells = self._build()
+
+        self.assertEqual([task.title for task in cells[(3, 1)]['tasks']], ['継続', '期限'])
+        self.assertEqual([task.title for task in cells[(3, 21)]['tasks']], ['継続'])
+        for day, titles in ((14, ['期限', '継続']), (15, ['期限', '継続', '逆転'])):
+            day_start = self._aware(2025, 3, day)
+            day_tasks = selectors.get_day_view_tasks(
+                self.user, day_start, day_start + timedelta(days=1, microseconds=-1),
+            )
+            self.assertEqual(sorted(day_tasks.values_list('title', flat=True)), titles)
+
+
+class RecurringOccurrenceTest(TestCase):
+    """繰り返しタスクの仮想の回と例外のテスト"""
+
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.start = timezone.make_aware(datetime(2025, 3, 3, 9))
+        self.parent = Task.objects.create(
+            user=self.user, title='朝会', frequency='weekly', repeat_interval=1, repeat_count=4,
+            start_date=self.start, end_date=self.start + timedelta(hours=1),
+        )
+
+    def _day_tasks(self, day: str) -> list[dict]:
+        return self.client.get(reverse('get_day_tasks', kwargs={'date': day})).json()['tasks']
+
+    def _month_titles(self) -> dict[tuple[int, int], list[str]]:
+        response = self.client.get(
+            reverse('task_list'), {'view_mode': 'month', 'target_date': '2025-03'},
+        )
+        return {
+            (cell['month'], cell['day']): [task.title for task in cell['tasks']]
+            for week in response.context['calendar_data'] for cell in week
+        }
+
+    def test_occurrences_are_expanded_without_rows(self) -> None:
+        """2回目以降は保存せず、表示する範囲の分だけ展開される"""
+        self.client.post(reverse('create_task'), {
+            'title': '日報', 'frequency': 'daily', 'repeat_interval': 1, 'repeat_count': 365,
+            'priority': 'medium', 'status': 'not_started',
+            'start_date': '2025-03-01', 'start_time': '18:00',
+            'end_date': '2025-03-01', 'end_time': '18:30',
+        })
+        self.assertEqual(Task.objects.filter(parent_task__isnull=False).count(), 0)
+
+        # repeat_count は親タスクの後に繰り返す回数
+        titles = self._month_titles()
+        for day in (3, 10, 17, 24, 31):
+            self.assertIn('朝会', titles[(3, day)])
+        self.assertNotIn('朝会', titles[(3, 4)])
+        self.assertNotIn('朝会', [task['title'] for task in self._day_tasks('2025-04-07')])
+        self.assertTrue(all('日報' in titles[(3, day)] for day in range(1, 32)))
+
+        tasks = self._day_tasks('2025-03-10')
+        self.assertEqual([task['title'] for task in tasks], ['朝会', '日報'])
+        self.assertIsNone(tasks[0]['id'])
+        self.assertEqual(tasks[0]['key'], f'{self.parent.id}/20250310T000000Z')
+
+    def test_editing_occurrence_saves_single_exception(self) -> None:
+        """1回分の編集はその回だけを例外として保存し、仮想の回と重複しない"""
+        url = reverse(
+            'edit_task_occurrence',
+            kwargs={'task_id': self.parent.id, 'occurrence': '20250310T000000Z'},
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.post(url, {
+            'title': '朝会', 'priority': 'medium', 'status': 'completed',
+            'frequency': '', 'repeat_interval': 1,
+            'start_date': '2025-03-10', 'start_time': '09:00',
+            'end_date': '2025-03-10', 'end_time': '10:00',
+        })
+        self.assertEqual(response.status_code, 302)
+
+        exception = Task.objects.get(parent_task=self.parent)
+        self.assertEqual(exception.status, 'completed')
+        self.assertEqual(exception.recurrence_id, self.start + timedelta(weeks=1))
+        tasks = self._day_tasks('2025-03-10')
+        self.assertEqual(
+            [(task['id'], task['status']) for task in tasks], [(exception.id, 'completed')],
+        )
+
+        # 規則にない日時は 404
+        missing = reverse(
+            'edit_task_occurrence',
+            kwargs={'task_id': self.parent.id, 'occurrence': '20250311T000000Z'},
+        )
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_deleting_occurrence_keeps_other_occurrences(self) -> None:
+        """1回分を削除しても他の回は残り、削除した回は再び現れない"""
+        url = reverse(
+            'delete_task_occurrence',
+            kwargs={'task_id': self.parent.id, 'occurrence': '20250317T000000Z'},
+        )
+        self.client.post(url)
+
+        self.assertEqual(self._day_tasks('2025-03-17'), [])
+        self.assertEqual(len(self._day_tasks('2025-03-24')), 1)
+        self.assertTrue(Task.objects.get(parent_task=self.parent).is_cancelled)
+
+    def _save_exception(self, weeks: int, **changes) -> Task:
+        occurrence = services.get_occurrence(self.parent, self.start + timedelta(weeks=weeks))
+        for name, value in changes.items():
+            setattr(occurrence, name, value)
+        occurrence.save()
+        return occurrence
+
+    def _edit_rule(self, repeat_interval: int, start_time: str, end_time: str) -> None:
+        self.client.post(reverse('edit_task', kwargs={'task_id': self.parent.id}), {
+            'title': '朝会', 'priority': 'medium', 'status': 'not_started',
+            'frequency': 'weekly', 'repeat_interval': repeat_interval, 'repeat_count': 4,
+            'start_date': '2025-03-03', 'start_time': start_time,
+            'end_date': '2025-03-03', 'end_time': end_time,
+        })
+
+    def test_changing_rule_keeps_matching_exceptions(self) -> None:
+        """規則を変えても、同じ日に回が残る例外と完了済みの例外は残し、それ以外の例外だけ削除する"""
+        services.cancel_occurrence(
+            services.get_occurrence(self.parent, self.start + timedelta(weeks=2)),
+        )
+        completed = self._save_exception(1, status='completed')
+        edited = self._save_exception(3, title='朝会（延長）')
+
+        # 2週おき: 3/3, 3/17, 3/31, ...
+        self._edit_rule(2, '09:00', '10:00')
+        self.assertEqual(self._day_tasks('2025-03-17'), [])
+        self.assertEqual(len(self._day_tasks('2025-03-31')), 1)
+        self.assertEqual([task['id'] for task in self._day_tasks('2025-03-10')], [completed.id])
+        self.assertFalse(Task.objects.filter(id=edited.id).exists())
+        self.assertEqual(Task.objects.filter(parent_task=self.parent).count(), 2)
+
+    def test_editing_other_fields_skips_exception_sync(self) -> None:
+        """規則の値が変わらない編集では、例外の付け替えを行わない"""
+        with patch.object(services, 'sync_occurrence_exceptions') as sync:
+            self._edit_rule(1, '09:00', '10:00')
+        sync.assert_not_called()
+        with patch.object(services, 'sync_occurrence_exceptions') as sync:
+            self._edit_rule(2, '09:00', '10:00')
+        sync.assert_called_once()
+
+    def test_changing_time_moves_exceptions(self) -> None:
+        """時刻を変えると例外を新しい回に付け替え、日時を変えていない例外は新しい時刻に移す"""
+        unchanged = self._save_exception(1, status='completed')
+        moved = self._save_exception(
+            2, start_date=self.start + timedelta(weeks=2, hours=4), end_date=None,
+        )
+
+        self._edit_rule(1, '10:00', '11:30')
+        unchanged.refresh_from_db()
+        moved.refresh_from_db()
+        new_start = timezone.make_aware(datetime(2025, 3, 10, 10))
+        self.assertEqual(
+            (unchanged.recurrence_id, unchanged.start_date, unchanged.end_date),
+            (new_start, new_start, new_start + timedelta(minutes=90)),
+        )
+        self.assertEqual(moved.recurrence_id, new_start + timedelta(weeks=1))
+        self.assertEqual(moved.start_date, self.start + timedelta(weeks=2, hours=4))
+        self.assertEqual([task['id'] for task in self._day_tasks('2025-03-10')], [unchanged.id])
+        self.assertEqual([task['id'] for task in self._day_tasks('2025-03-17')], [moved.id])
+
+
+class RecurrenceExceptionMigrationTest(TestCase):
+    """作成済みの子タスクを繰り返しの例外に変換するデータ移行のテスト"""
+
+    def setUp(self) -> None:
+        import importlib
+
+        self.migration = importlib.import_module('app.migrations.0041_task_recurrence_exceptions')
+        self.user = UserFactory()
+        self.parent = Task.objects.create(
+            user=self.user, title='月末の締め',
+            frequency='monthly', repeat_interval=1, repeat_count=3,
+            start_date=timezone.make_aware(datetime(2025, 1, 31, 10)),
+        )
+
+    def _create_children_like_before(self) -> list[Task]:
+        """以前の作り方（前の子タスクの UTC の日時に1か月足す）で子タスクを作る"""
+        from datetime import UTC
+
+        from dateutil.relativedelta import relativedelta
+
+        children = []
+        start = self.parent.start_date.astimezone(UTC)
+        for _ in range(self.parent.repeat_count):
+            start += relativedelta(months=1)
+            children.append(Task.objects.create(
+                user=self.user, title=self.parent.title, parent_task=self.parent, start_date=start,
+            ))
+        return children
+
+    def _convert(self) -> None:
+        from django.apps import apps
+
+        self.migration.convert_children_to_exceptions(apps, None)
+
+    def test_children_matched_by_nearest_date(self) -> None:
+        """月末からずれた子タスクも日付の近い回に対応付け、削除済みの回は削除した回にする"""
+        february, march, april = self._create_children_like_before()
+        self.assertEqual(timezone.localtime(march.start_date).day, 28)
+        april.delete()
+
+        self._convert()
+
+        self.assertFalse(Task.objects.filter(pk=february.pk).exists())
+        march.refresh_from_db()
+        self.assertEqual(march.recurrence_id, timezone.make_aware(datetime(2025, 3, 31, 10)))
+        self.assertEqual(march.start_date, timezone.make_aware(datetime(2025, 3, 28, 10)))
+        cancelled = Task.objects.get(parent_task=self.parent, is_cancelled=True)
+        self.assertEqual(cancelled.recurrence_id, timezone.make_aware(datetime(2025, 4, 30, 10)))
+        self.assertEqual(Task.objects.filter(parent_task=self.parent).count(), 2)
+
+    def test_changed_child_kept_as_exception(self) -> None:
+        """ステータスを変更した子タスクはその回の例外として残す"""
+        february, _, _ = self._create_children_like_before()
+        february.status = 'completed'
+        february.save()
+
+        self._convert()
+
+        february.refresh_from_db()
+        self.assertEqual(february.recurrence_id, february.start_date)
+        self.assertFalse(Task.objects.filter(parent_task=self.parent, is_cancelled=True).exists())
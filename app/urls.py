@@ -13,10 +13,21 @@ urlpatterns = [
     path('expenses/settings/', views.expenses_settings, name='expenses_settings'),
     path('expenses/edit/<int:transaction_id>/', views.edit_expenses, name='edit_expenses'),
     path('expenses/delete/<int:transaction_id>/', views.delete_expenses, name='delete_expenses'),
+    path('expenses/batch-create/', views.batch_create_expenses, name='batch_create_expenses'),
     path('expenses/bulk-delete/', views.bulk_delete_expenses, name='bulk_delete_expenses'),
+    path('expenses/bulk-edit/', views.bulk_edit_expenses, name='bulk_edit_expenses'),
+    path('expenses/import/', views.import_expenses, name='import_expenses'),
+    path('expenses/export/', views.export_expenses, name='export_expenses'),
+    path('expenses/charts/<str:chart>/', views.expense_chart_data, name='expense_chart_data'),
+    path('expenses/analytics/', views.expense_analytics, name='expense_analytics'),
     path('budget/', views.budget_view, name='budget'),
+    path('budget/history/', views.budget_history_view, name='budget_history'),
     # 定期支払い
     path('expenses/recurring/', views.recurring_payment_list, name='recurring_payment_list'),
+    path(
+        'expenses/recurring/projection/', views.recurring_payment_projection,
+        name='recurring_payment_projection',
+    ),
     path('expenses/recurring/create/', views.create_recurring_payment, name='create_recurring_payment'),
     path('expenses/recurring/edit/<int:recurring_id>/', views.edit_recurring_payment, name='edit_recurring_payment'),
     path('expenses/recurring/delete/<int:recurring_id>/', views.delete_recurring_payment, name='delete_recurring_payment'),
@@ -25,7 +36,17 @@ urlpatterns = [
     path('tasks/', views.task_list, name='task_list'),
     path('tasks/create/', views.create_task, name='create_task'),
     path('tasks/edit/<int:task_id>/', views.edit_task, name='edit_task'),
+    path(
+        'tasks/edit/<int:task_id>/<str:occurrence>/', views.edit_task_occurrence,
+        name='edit_task_occurrence',
+    ),
     path('tasks/delete/<int:task_id>/', views.delete_task, name='delete_task'),
+    path(
+        'tasks/delete/<int:task_id>/<str:occurrence>/', views.delete_task_occurrence,
+        name='delete_task_occurrence',
+    ),
+    path('tasks/bulk-delete/', views.bulk_delete_tasks, name='bulk_delete_tasks'),
+    path('tasks/bulk-edit/', views.bulk_edit_tasks, name='bulk_edit_tasks'),
     path('tasks/day/<str:date>/', views.get_day_tasks, name='get_day_tasks'),
     path('tasks/settings/', views.task_settings, name='task_settings'),
     path('tasks/board/', views.temp_task_board, name='temp_task_board'),
@@ -40,6 +61,7 @@ urlpatterns = [
     path('memos/edit/<int:memo_id>/', views.edit_memo, name='edit_memo'),
     path('memos/delete/<int:memo_id>/', views.delete_memo, name='delete_memo'),
     path('memos/bulk-delete/', views.bulk_delete_memos, name='bulk_delete_memos'),
+    path('memos/bulk-edit/', views.bulk_edit_memos, name='bulk_edit_memos'),
     path('memos/toggle-favorite/<int:memo_id>/', views.toggle_memo_favorite, name='toggle_memo_favorite'),
     path('memos/settings/', views.memo_settings, name='memo_settings'),
     # 買うものリスト
@@ -48,6 +70,7 @@ urlpatterns = [
     path('shopping/edit/<int:item_id>/', views.edit_shopping_item, name='edit_shopping_item'),
     path('shopping/delete/<int:item_id>/', views.delete_shopping_item, name='delete_shopping_item'),
     path('shopping/bulk-delete/', views.bulk_delete_shopping_items, name='bulk_delete_shopping_items'),
+    path('shopping/bulk-edit/', views.bulk_edit_shopping_items, name='bulk_edit_shopping_items'),
     path('shopping/update-count/<int:item_id>/', views.update_shopping_count, name='update_shopping_count'),
     path('shopping/toggle-check/<int:item_id>/', views.toggle_check_shopping_item, name='toggle_check_shopping'),
     path('shopping/clear-checked/', views.clear_checked_shopping_items, name='clear_checked_shopping'),
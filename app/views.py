@@ -11,15 +11,27 @@ import logging
 logger = logging.getLogger(__name__)
 
 from .expenses.views import (
-    expenses_list, create_expenses, expenses_settings, edit_expenses, delete_expenses,
-    bulk_delete_expenses, budget_view,
-    recurring_payment_list, create_recurring_payment, edit_recurring_payment,
+    expenses_list, create_expenses, batch_create_expenses, expenses_settings,
+    edit_expenses, delete_expenses,
+    bulk_delete_expenses, bulk_edit_expenses, import_expenses, export_expenses,
+    expense_chart_data, expense_analytics,
+    budget_view, budget_history_view,
+    recurring_payment_list, recurring_payment_projection,
+    create_recurring_payment, edit_recurring_payment,
     delete_recurring_payment, toggle_recurring_payment,
 )
-from .memo.views import memo_list, create_memo, edit_memo, delete_memo, bulk_delete_memos, toggle_memo_favorite, memo_settings
-from .shopping.views import shopping_list, create_shopping_item, edit_shopping_item, delete_shopping_item, bulk_delete_shopping_items, update_shopping_count, toggle_check_shopping_item, clear_checked_shopping_items
+from .memo.views import (
+    memo_list, create_memo, edit_memo, delete_memo, bulk_delete_memos, bulk_edit_memos,
+    toggle_memo_favorite, memo_settings,
+)
+from .shopping.views import (
+    shopping_list, create_shopping_item, edit_shopping_item, delete_shopping_item,
+    bulk_delete_shopping_items, bulk_edit_shopping_items, update_shopping_count,
+    toggle_check_shopping_item, clear_checked_shopping_items,
+)
 from .task.views import (
-    task_list, create_task, edit_task, delete_task, get_day_tasks, task_settings,
+    task_list, create_task, edit_task, edit_task_occurrence, delete_task, delete_task_occurrence,
+    bulk_delete_tasks, bulk_edit_tasks, get_day_tasks, task_settings,
     temp_task_board, temp_task_api, temp_task_detail_api, temp_task_clear_api,
     temp_task_sets_api, temp_task_set_detail_api,
 )
@@ -707,15 +707,25 @@ def _demo_budget_row(category, limit: int, used: int, has_budget: bool = True) -
     """予算画面/ダッシュボード用のフェイク予算行（build_budget_overview と同形）を返す。"""
     percent = round(used / limit * 100, 1) if limit > 0 else 0.0
     status = 'over' if percent > 100 else ('warning' if percent >= 80 else 'ok')
+    # 月末予測（デモは3/27時点の1日あたり支出が続く想定）
+    projected = round(used / 27 * 31)
+    projected_over_date = None
+    if has_budget and used <= limit < projected:
+        projected_over_date = date(2026, 3, min(limit * 27 // used + 1, 31))
     return {
         'category': category,
         'has_budget': has_budget,
+        'amount': limit if has_budget else 0,
+        'rollover': False,
         'limit': limit,
+        'carryover': 0,
         'used': used,
         'remaining': limit - used,
         'percent': percent,
         'percent_bar': min(percent, 100.0),
         'status': status,
+        'projected': projected,
+        'projected_over_date': projected_over_date,
     }
 
 
@@ -97,6 +97,22 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 集計結果のキャッシュとその無効化（バージョン番号）を web・cron の全プロセスで共有するため、
+# プロセスごとの LocMemCache ではなくデータベースに置く。テーブルはマイグレーションで作成する。
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
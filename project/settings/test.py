@@ -21,3 +21,11 @@ EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
 
 # パスワードハッシュを軽量化してテストを高速化
 PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# テストは1プロセスで動くのでキャッシュはメモリに置く（assertNumQueries でキャッシュの読み書きを
+# 数えない）。DatabaseCache でのクエリ数は DatabaseCacheInvalidationTest で確認する
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
@@ -112,9 +112,20 @@ declare function getCookie(name: string): string | null;
 // Global functions from transaction.ts
 declare function toggleWeekendColor(): void;
 
-// Global chart data variables (set via Django template script tags)
+// Global chart data variables (set via Django template script tags; demo page only)
 declare const categoryData: ChartData | undefined;
 declare const expenseData: ChartData | undefined;
 declare const balanceData: ChartData | undefined;
 declare const majorCategoryData: ChartData | undefined;
-declare const monthlyData: ChartData | undefined;
+
+// Chart data API URLs (set via Django template script tags)
+interface ExpenseChartUrls {
+  category?: string;
+  majorCategory?: string;
+  paymentMethod?: string;
+  purpose?: string;
+  daily?: string;
+  monthly?: string;
+  projection?: string;
+}
+declare const expenseChartUrls: ExpenseChartUrls | undefined;
@@ -6,7 +6,8 @@ interface TaskLabelData {
 }
 
 interface TaskApiData {
-  id: number;
+  id: number | null;
+  key: string;
   title: string;
   status: string;
   priority: string;
@@ -152,8 +153,8 @@ function showDayTasksModal(year: string, month: string, day: string, monthLabel:
 
                     return `
                         <div class="card task-card-mini mb-2 lp-delete-item"
-                             data-delete-url="/carbohydratepro/tasks/delete/${task.id}/"
-                             data-item-id="${task.id}"
+                             data-delete-url="/carbohydratepro/tasks/delete/${task.key}/"
+                             data-item-id="${task.key}"
                              ${borderStyle}>
                             <div class="lp-delete-overlay"><i class="fas fa-trash-alt"></i> 削除</div>
                             <div class="card-body">
@@ -177,7 +178,7 @@ function showDayTasksModal(year: string, month: string, day: string, monthLabel:
                     let suppressClick = false;
                     let clickCount = 0;
                     let clickTimer: ReturnType<typeof setTimeout> | null = null;
-                    const taskId = parseInt(card.dataset['itemId'] ?? '0', 10);
+                    const taskKey = card.dataset['itemId'] ?? '';
 
                     card.addEventListener('touchend', (e: TouchEvent) => {
                         const el = e.target as HTMLElement;
@@ -187,7 +188,7 @@ function showDayTasksModal(year: string, month: string, day: string, monthLabel:
                             e.preventDefault();
                             suppressClick = true;
                             lastTapTime = 0;
-                            if (taskId) openEditTaskModalFromList(taskId);
+                            if (taskKey) openEditTaskModalFromList(taskKey);
                         } else {
                             lastTapTime = now;
                         }
@@ -203,7 +204,7 @@ function showDayTasksModal(year: string, month: string, day: string, monthLabel:
                         } else if (clickCount >= 2) {
                             if (clickTimer !== null) clearTimeout(clickTimer);
                             clickCount = 0;
-                            if (taskId) openEditTaskModalFromList(taskId);
+                            if (taskKey) openEditTaskModalFromList(taskKey);
                         }
                     });
                 });
@@ -219,19 +220,19 @@ function showDayTasksModal(year: string, month: string, day: string, monthLabel:
         });
 }
 
-// 一覧モーダルから編集モーダルを開く
-function openEditTaskModalFromList(taskId: number): void {
+// 一覧モーダルから編集モーダルを開く（taskKey は ID か、仮想の繰り返しの回の「親ID/元の開始日時」）
+function openEditTaskModalFromList(taskKey: number | string): void {
     $('#dayTasksModal').modal('hide');
-    setTimeout(() => openEditTaskModal(taskId), 300);
+    setTimeout(() => openEditTaskModal(taskKey), 300);
 }
 
 // 一覧モーダルからタスクを削除
-function deleteTaskFromList(taskId: number): void {
+function deleteTaskFromList(taskKey: number | string): void {
     if (!confirm('このタスクを削除してもよろしいですか？')) return;
 
     const csrfToken = document.querySelector<HTMLInputElement>('[name=csrfmiddlewaretoken]')?.value || '';
 
-    fetch(`/carbohydratepro/tasks/delete/${taskId}/`, {
+    fetch(`/carbohydratepro/tasks/delete/${taskKey}/`, {
         method: 'POST',
         headers: {
             'X-CSRFToken': csrfToken,
@@ -350,9 +351,9 @@ async function openCreateTaskModalWithDate(year: string, month: string, day: str
 }
 
 // 編集モーダル関連
-async function openEditTaskModal(taskId: number): Promise<void> {
+async function openEditTaskModal(taskKey: number | string): Promise<void> {
     try {
-        const response = await fetch(`/carbohydratepro/tasks/edit/${taskId}/`, {
+        const response = await fetch(`/carbohydratepro/tasks/edit/${taskKey}/`, {
             headers: { 'X-Requested-With': 'XMLHttpRequest' },
         });
         if (!response.ok) throw new Error(`ステータス: ${response.status}`);
@@ -240,6 +240,7 @@ function createLineChartConfig(
                         label: (ctx: ChartTooltipContext) => {
                             if (ctx.dataset.label === '基準線 (0円)') return '';
                             const value = ctx.parsed.y;
+                            if (Number.isNaN(value)) return '';
                             const formatted = value.toLocaleString('ja-JP');
                             return `${ctx.dataset.label ?? ''}: ${formatted}円`;
                         },
@@ -271,6 +272,7 @@ function initializeLineChart(
     maxTicksY: number,
     hoverRadius: number,
     tickCount: number,
+    forecastData: number[] | null = null,
 ): void {
     const canvas = document.getElementById(canvasId) as HTMLCanvasElement | null;
     if (!canvas) return;
@@ -282,13 +284,27 @@ function initializeLineChart(
     }
 
     const config = createLineChartConfig(balanceData, maxTicksX, maxTicksY, hoverRadius);
+    if (forecastData) {
+        config.data.datasets.push({
+            label: '見込み（定期支払い）',
+            data: forecastData,
+            borderColor: balanceData.datasets[0].borderColor,
+            borderWidth: 2,
+            borderDash: [6, 4],
+            pointRadius: 0,
+            pointHoverRadius: hoverRadius,
+            fill: false,
+            order: 0,
+        });
+    }
     const ctx = canvas.getContext('2d');
     if (!ctx) return;
     const chart = new Chart(ctx, config);
 
     const originalData = balanceData.datasets[0].data;
-    const minValue = Math.min(...originalData);
-    const maxValue = Math.max(...originalData);
+    const scaleValues = originalData.concat((forecastData || []).filter(value => !Number.isNaN(value)));
+    const minValue = Math.min(...scaleValues);
+    const maxValue = Math.max(...scaleValues);
     const scale = getNiceScale(minValue, maxValue, tickCount);
 
     chart.options.scales!.y!.min = Math.min(scale.min - scale.step, 0);
@@ -322,8 +338,8 @@ function toggleWeekendColor(): void {
     localStorage.setItem('weekendColorEnabled', String(weekendColorEnabled));
 
     // 棒グラフの色を更新
-    if (activeBarCharts.length > 0 && typeof expenseData !== 'undefined') {
-        const colors = buildBarColors(expenseData.labels);
+    if (activeBarCharts.length > 0 && currentExpenseData !== null) {
+        const colors = buildBarColors(currentExpenseData.labels);
         activeBarCharts.forEach(chart => {
             chart.data.datasets[0].backgroundColor = colors;
             chart.update();
@@ -331,16 +347,95 @@ function toggleWeekendColor(): void {
     }
 }
 
-// 棒グラフのチャートインスタンスを保持
+// 棒グラフのチャートインスタンスと、その日別支出データを保持
 const activeBarCharts: Chart[] = [];
+let currentExpenseData: ChartData | null = null;
+
+interface DailyChartPayload {
+    expense: ChartData;
+    balance: ChartData;
+}
+
+// 定期支払いの見込み（recurring_payment_projection の応答のうち使う部分）
+interface RecurringProjection {
+    start: string;
+    days: { date: string; net: number }[];
+}
+
+// 残高グラフに重ねる見込みの系列。見込みの開始前日の実績残高から、定期支払いの収支を積み上げる。
+// 見込みの対象外の日は NaN にして線を描かない。重ねるものがなければ null
+function buildForecastSeries(balanceData: ChartData, projection: RecurringProjection): number[] | null {
+    if (projection.days.length === 0) return null;
+    const netByDate = new Map(projection.days.map(day => [day.date, day.net] as [string, number]));
+    const balance = balanceData.datasets[0].data;
+    let projected = 0;
+    const series = balanceData.labels.map((label, index) => {
+        if (label < projection.start) {
+            const next = balanceData.labels[index + 1];
+            return next !== undefined && next >= projection.start ? balance[index] : NaN;
+        }
+        projected += netByDate.get(label) || 0;
+        return balance[index] + projected;
+    });
+    return series.some(value => !Number.isNaN(value)) ? series : null;
+}
+
+// 見込みの系列を取得（取得できなくても残高グラフは表示する）
+async function fetchForecastSeries(url: string, balanceData: ChartData): Promise<number[] | null> {
+    try {
+        return buildForecastSeries(balanceData, await fetchChartData<RecurringProjection>(url));
+    } catch (error) {
+        console.warn('Projection data not available', error);
+        return null;
+    }
+}
 
-// グラフ初期化関数
-function initializeExpenseCharts(): void {
-    if (typeof categoryData === 'undefined' || typeof expenseData === 'undefined' ||
-        typeof balanceData === 'undefined' || typeof majorCategoryData === 'undefined') {
+// グラフデータ API から JSON を取得（ETag による再検証はブラウザの HTTP キャッシュに任せる）
+async function fetchChartData<T>(url: string): Promise<T> {
+    const response = await fetch(url, {
+        credentials: 'same-origin',
+        headers: { 'Accept': 'application/json' },
+    });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    return await response.json() as T;
+}
+
+// 月ビューのグラフ初期化（デモはテンプレート埋め込みのデータ、通常は API から取得）
+async function initializeExpenseCharts(): Promise<void> {
+    if (typeof categoryData !== 'undefined' && typeof expenseData !== 'undefined' &&
+        typeof balanceData !== 'undefined' && typeof majorCategoryData !== 'undefined') {
+        renderExpenseCharts(categoryData, majorCategoryData, expenseData, balanceData);
+        return;
+    }
+    if (typeof expenseChartUrls === 'undefined' || !expenseChartUrls.category ||
+        !expenseChartUrls.majorCategory || !expenseChartUrls.daily) {
         console.warn('Chart data not available');
         return;
     }
+    try {
+        const [category, majorCategory, daily] = await Promise.all([
+            fetchChartData<ChartData>(expenseChartUrls.category),
+            fetchChartData<ChartData>(expenseChartUrls.majorCategory),
+            fetchChartData<DailyChartPayload>(expenseChartUrls.daily),
+        ]);
+        const forecast = expenseChartUrls.projection
+            ? await fetchForecastSeries(expenseChartUrls.projection, daily.balance)
+            : null;
+        renderExpenseCharts(category, majorCategory, daily.expense, daily.balance, forecast);
+    } catch (error) {
+        console.warn('Chart data not available', error);
+    }
+}
+
+// 月ビューのグラフを描画
+function renderExpenseCharts(
+    categoryData: ChartData,
+    majorCategoryData: ChartData,
+    expenseData: ChartData,
+    balanceData: ChartData,
+    forecastData: number[] | null = null,
+): void {
+    currentExpenseData = expenseData;
 
     // カテゴリ円グラフ
     const ctxPie = document.getElementById('categoryPieChart') as HTMLCanvasElement | null;
@@ -444,15 +539,59 @@ function initializeExpenseCharts(): void {
     }
 
     // PC用折れ線グラフ
-    initializeLineChart('balanceLineChart', balanceData, 10, 5, 6, 5);
+    initializeLineChart('balanceLineChart', balanceData, 10, 5, 6, 5, forecastData);
 
     // モバイル用折れ線グラフ
-    initializeLineChart('balanceLineChartMobile', balanceData, 8, 4, 8, 4);
+    initializeLineChart('balanceLineChartMobile', balanceData, 8, 4, 8, 4, forecastData);
 }
 
-// 年ビュー: 月別収支グラフを描画
-function initializeYearlyCharts(): void {
-    if (typeof monthlyData === 'undefined') return;
+// 内訳の円グラフ（支払方法別・用途別）を描画
+function renderBreakdownPieChart(canvasId: string, data: ChartData, title: string): void {
+    const canvas = document.getElementById(canvasId) as HTMLCanvasElement | null;
+    if (!canvas) return;
+    const ctx = canvas.getContext('2d');
+    if (!ctx) return;
+    new Chart(ctx, {
+        type: 'pie',
+        data,
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                title: { display: true, text: title },
+                legend: { display: false },
+            },
+        },
+    });
+}
+
+// 支払方法別・用途別の内訳グラフを API から取得して描画（他のグラフの表示は待たせない）
+async function initializeBreakdownCharts(): Promise<void> {
+    if (typeof expenseChartUrls === 'undefined') return;
+    const breakdowns: [string | undefined, string, string][] = [
+        [expenseChartUrls.paymentMethod, 'paymentMethodPieChart', '支払方法別割合'],
+        [expenseChartUrls.purpose, 'purposePieChart', '用途別割合'],
+    ];
+    await Promise.all(breakdowns.map(async ([url, canvasId, title]) => {
+        if (!url) return;
+        try {
+            renderBreakdownPieChart(canvasId, await fetchChartData<ChartData>(url), title);
+        } catch (error) {
+            console.warn('Chart data not available', error);
+        }
+    }));
+}
+
+// 年ビュー: 月別収支グラフを API から取得して描画
+async function initializeYearlyCharts(): Promise<void> {
+    if (typeof expenseChartUrls === 'undefined' || !expenseChartUrls.monthly) return;
+    let monthlyData: ChartData;
+    try {
+        monthlyData = await fetchChartData<ChartData>(expenseChartUrls.monthly);
+    } catch (error) {
+        console.warn('Chart data not available', error);
+        return;
+    }
 
     const canvas = document.getElementById('monthlyBarChart') as HTMLCanvasElement | null;
     if (!canvas) return;
@@ -521,9 +660,10 @@ function initTransactionDoubleClick(): void {
 // ページ読み込み後にグラフとフィルターを初期化
 document.addEventListener('DOMContentLoaded', () => {
     if (document.getElementById('monthlyBarChart')) {
-        initializeYearlyCharts();
+        void initializeYearlyCharts();
     } else {
-        initializeExpenseCharts();
+        void initializeExpenseCharts();
+        void initializeBreakdownCharts();
     }
     initializeExpenseFilters();
     initLongPressDelete();
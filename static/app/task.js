@@ -121,8 +121,8 @@ function showDayTasksModal(year, month, day, monthLabel) {
                         </span>` : '';
                 return `
                         <div class="card task-card-mini mb-2 lp-delete-item"
-                             data-delete-url="/carbohydratepro/tasks/delete/${task.id}/"
-                             data-item-id="${task.id}"
+                             data-delete-url="/carbohydratepro/tasks/delete/${task.key}/"
+                             data-item-id="${task.key}"
                              ${borderStyle}>
                             <div class="lp-delete-overlay"><i class="fas fa-trash-alt"></i> 削除</div>
                             <div class="card-body">
@@ -145,7 +145,7 @@ function showDayTasksModal(year, month, day, monthLabel) {
                 let suppressClick = false;
                 let clickCount = 0;
                 let clickTimer = null;
-                const taskId = parseInt((_a = card.dataset['itemId']) !== null && _a !== void 0 ? _a : '0', 10);
+                const taskKey = (_a = card.dataset['itemId']) !== null && _a !== void 0 ? _a : '';
                 card.addEventListener('touchend', (e) => {
                     const el = e.target;
                     if (isInteractiveTarget(el) || !!el.closest('.lp-delete-overlay') || card.classList.contains('delete-pending'))
@@ -155,8 +155,8 @@ function showDayTasksModal(year, month, day, monthLabel) {
                         e.preventDefault();
                         suppressClick = true;
                         lastTapTime = 0;
-                        if (taskId)
-                            openEditTaskModalFromList(taskId);
+                        if (taskKey)
+                            openEditTaskModalFromList(taskKey);
                     }
                     else {
                         lastTapTime = now;
@@ -178,8 +178,8 @@ function showDayTasksModal(year, month, day, monthLabel) {
                         if (clickTimer !== null)
                             clearTimeout(clickTimer);
                         clickCount = 0;
-                        if (taskId)
-                            openEditTaskModalFromList(taskId);
+                        if (taskKey)
+                            openEditTaskModalFromList(taskKey);
                     }
                 });
             });
@@ -194,18 +194,18 @@ function showDayTasksModal(year, month, day, monthLabel) {
         alert('タスクの取得に失敗しました。');
     });
 }
-// 一覧モーダルから編集モーダルを開く
-function openEditTaskModalFromList(taskId) {
+// 一覧モーダルから編集モーダルを開く（taskKey は ID か、仮想の繰り返しの回の「親ID/元の開始日時」）
+function openEditTaskModalFromList(taskKey) {
     $('#dayTasksModal').modal('hide');
-    setTimeout(() => openEditTaskModal(taskId), 300);
+    setTimeout(() => openEditTaskModal(taskKey), 300);
 }
 // 一覧モーダルからタスクを削除
-function deleteTaskFromList(taskId) {
+function deleteTaskFromList(taskKey) {
     var _a;
     if (!confirm('このタスクを削除してもよろしいですか？'))
         return;
     const csrfToken = ((_a = document.querySelector('[name=csrfmiddlewaretoken]')) === null || _a === void 0 ? void 0 : _a.value) || '';
-    fetch(`/carbohydratepro/tasks/delete/${taskId}/`, {
+    fetch(`/carbohydratepro/tasks/delete/${taskKey}/`, {
         method: 'POST',
         headers: {
             'X-CSRFToken': csrfToken,
@@ -322,9 +322,9 @@ async function openCreateTaskModalWithDate(year, month, day) {
     }
 }
 // 編集モーダル関連
-async function openEditTaskModal(taskId) {
+async function openEditTaskModal(taskKey) {
     try {
-        const response = await fetch(`/carbohydratepro/tasks/edit/${taskId}/`, {
+        const response = await fetch(`/carbohydratepro/tasks/edit/${taskKey}/`, {
             headers: { 'X-Requested-With': 'XMLHttpRequest' },
         });
         if (!response.ok)
@@ -221,6 +221,8 @@ function createLineChartConfig(balanceData, maxTicksLimitX, maxTicksLimitY, hove
                             if (ctx.dataset.label === '基準線 (0円)')
                                 return '';
                             const value = ctx.parsed.y;
+                            if (Number.isNaN(value))
+                                return '';
                             const formatted = value.toLocaleString('ja-JP');
                             return `${(_a = ctx.dataset.label) !== null && _a !== void 0 ? _a : ''}: ${formatted}円`;
                         },
@@ -244,7 +246,7 @@ function createLineChartConfig(balanceData, maxTicksLimitX, maxTicksLimitY, hove
     };
 }
 // 折れ線グラフの初期化とアニメーション開始
-function initializeLineChart(canvasId, balanceData, maxTicksX, maxTicksY, hoverRadius, tickCount) {
+function initializeLineChart(canvasId, balanceData, maxTicksX, maxTicksY, hoverRadius, tickCount, forecastData = null) {
     const canvas = document.getElementById(canvasId);
     if (!canvas)
         return;
@@ -255,13 +257,27 @@ function initializeLineChart(canvasId, balanceData, maxTicksX, maxTicksY, hoverR
         canvas.height = 300;
     }
     const config = createLineChartConfig(balanceData, maxTicksX, maxTicksY, hoverRadius);
+    if (forecastData) {
+        config.data.datasets.push({
+            label: '見込み（定期支払い）',
+            data: forecastData,
+            borderColor: balanceData.datasets[0].borderColor,
+            borderWidth: 2,
+            borderDash: [6, 4],
+            pointRadius: 0,
+            pointHoverRadius: hoverRadius,
+            fill: false,
+            order: 0,
+        });
+    }
     const ctx = canvas.getContext('2d');
     if (!ctx)
         return;
     const chart = new Chart(ctx, config);
     const originalData = balanceData.datasets[0].data;
-    const minValue = Math.min(...originalData);
-    const maxValue = Math.max(...originalData);
+    const scaleValues = originalData.concat((forecastData || []).filter(value => !Number.isNaN(value)));
+    const minValue = Math.min(...scaleValues);
+    const maxValue = Math.max(...scaleValues);
     const scale = getNiceScale(minValue, maxValue, tickCount);
     chart.options.scales.y.min = Math.min(scale.min - scale.step, 0);
     chart.options.scales.y.max = scale.max + scale.step;
@@ -288,23 +304,85 @@ function toggleWeekendColor() {
     weekendColorEnabled = !weekendColorEnabled;
     localStorage.setItem('weekendColorEnabled', String(weekendColorEnabled));
     // 棒グラフの色を更新
-    if (activeBarCharts.length > 0 && typeof expenseData !== 'undefined') {
-        const colors = buildBarColors(expenseData.labels);
+    if (activeBarCharts.length > 0 && currentExpenseData !== null) {
+        const colors = buildBarColors(currentExpenseData.labels);
         activeBarCharts.forEach(chart => {
             chart.data.datasets[0].backgroundColor = colors;
             chart.update();
         });
     }
 }
-// 棒グラフのチャートインスタンスを保持
+// 棒グラフのチャートインスタンスと、その日別支出データを保持
 const activeBarCharts = [];
-// グラフ初期化関数
-function initializeExpenseCharts() {
-    if (typeof categoryData === 'undefined' || typeof expenseData === 'undefined' ||
-        typeof balanceData === 'undefined' || typeof majorCategoryData === 'undefined') {
+let currentExpenseData = null;
+// 残高グラフに重ねる見込みの系列。見込みの開始前日の実績残高から、定期支払いの収支を積み上げる。
+// 見込みの対象外の日は NaN にして線を描かない。重ねるものがなければ null
+function buildForecastSeries(balanceData, projection) {
+    if (projection.days.length === 0)
+        return null;
+    const netByDate = new Map(projection.days.map(day => [day.date, day.net]));
+    const balance = balanceData.datasets[0].data;
+    let projected = 0;
+    const series = balanceData.labels.map((label, index) => {
+        if (label < projection.start) {
+            const next = balanceData.labels[index + 1];
+            return next !== undefined && next >= projection.start ? balance[index] : NaN;
+        }
+        projected += netByDate.get(label) || 0;
+        return balance[index] + projected;
+    });
+    return series.some(value => !Number.isNaN(value)) ? series : null;
+}
+// 見込みの系列を取得（取得できなくても残高グラフは表示する）
+async function fetchForecastSeries(url, balanceData) {
+    try {
+        return buildForecastSeries(balanceData, await fetchChartData(url));
+    }
+    catch (error) {
+        console.warn('Projection data not available', error);
+        return null;
+    }
+}
+// グラフデータ API から JSON を取得（ETag による再検証はブラウザの HTTP キャッシュに任せる）
+async function fetchChartData(url) {
+    const response = await fetch(url, {
+        credentials: 'same-origin',
+        headers: { 'Accept': 'application/json' },
+    });
+    if (!response.ok)
+        throw new Error(`HTTP ${response.status}`);
+    return await response.json();
+}
+// 月ビューのグラフ初期化（デモはテンプレート埋め込みのデータ、通常は API から取得）
+async function initializeExpenseCharts() {
+    if (typeof categoryData !== 'undefined' && typeof expenseData !== 'undefined' &&
+        typeof balanceData !== 'undefined' && typeof majorCategoryData !== 'undefined') {
+        renderExpenseCharts(categoryData, majorCategoryData, expenseData, balanceData);
+        return;
+    }
+    if (typeof expenseChartUrls === 'undefined' || !expenseChartUrls.category ||
+        !expenseChartUrls.majorCategory || !expenseChartUrls.daily) {
         console.warn('Chart data not available');
         return;
     }
+    try {
+        const [category, majorCategory, daily] = await Promise.all([
+            fetchChartData(expenseChartUrls.category),
+            fetchChartData(expenseChartUrls.majorCategory),
+            fetchChartData(expenseChartUrls.daily),
+        ]);
+        const forecast = expenseChartUrls.projection
+            ? await fetchForecastSeries(expenseChartUrls.projection, daily.balance)
+            : null;
+        renderExpenseCharts(category, majorCategory, daily.expense, daily.balance, forecast);
+    }
+    catch (error) {
+        console.warn('Chart data not available', error);
+    }
+}
+// 月ビューのグラフを描画
+function renderExpenseCharts(categoryData, majorCategoryData, expenseData, balanceData, forecastData = null) {
+    currentExpenseData = expenseData;
     // カテゴリ円グラフ
     const ctxPie = document.getElementById('categoryPieChart');
     if (ctxPie) {
@@ -399,14 +477,62 @@ function initializeExpenseCharts() {
             new Chart(majorPCCtx, majorCategoryConfig);
     }
     // PC用折れ線グラフ
-    initializeLineChart('balanceLineChart', balanceData, 10, 5, 6, 5);
+    initializeLineChart('balanceLineChart', balanceData, 10, 5, 6, 5, forecastData);
     // モバイル用折れ線グラフ
-    initializeLineChart('balanceLineChartMobile', balanceData, 8, 4, 8, 4);
+    initializeLineChart('balanceLineChartMobile', balanceData, 8, 4, 8, 4, forecastData);
+}
+// 内訳の円グラフ（支払方法別・用途別）を描画
+function renderBreakdownPieChart(canvasId, data, title) {
+    const canvas = document.getElementById(canvasId);
+    if (!canvas)
+        return;
+    const ctx = canvas.getContext('2d');
+    if (!ctx)
+        return;
+    new Chart(ctx, {
+        type: 'pie',
+        data,
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                title: { display: true, text: title },
+                legend: { display: false },
+            },
+        },
+    });
+}
+// 支払方法別・用途別の内訳グラフを API から取得して描画（他のグラフの表示は待たせない）
+async function initializeBreakdownCharts() {
+    if (typeof expenseChartUrls === 'undefined')
+        return;
+    const breakdowns = [
+        [expenseChartUrls.paymentMethod, 'paymentMethodPieChart', '支払方法別割合'],
+        [expenseChartUrls.purpose, 'purposePieChart', '用途別割合'],
+    ];
+    await Promise.all(breakdowns.map(async ([url, canvasId, title]) => {
+        if (!url)
+            return;
+        try {
+            renderBreakdownPieChart(canvasId, await fetchChartData(url), title);
+        }
+        catch (error) {
+            console.warn('Chart data not available', error);
+        }
+    }));
 }
-// 年ビュー: 月別収支グラフを描画
-function initializeYearlyCharts() {
-    if (typeof monthlyData === 'undefined')
+// 年ビュー: 月別収支グラフを API から取得して描画
+async function initializeYearlyCharts() {
+    if (typeof expenseChartUrls === 'undefined' || !expenseChartUrls.monthly)
+        return;
+    let monthlyData;
+    try {
+        monthlyData = await fetchChartData(expenseChartUrls.monthly);
+    }
+    catch (error) {
+        console.warn('Chart data not available', error);
         return;
+    }
     const canvas = document.getElementById('monthlyBarChart');
     if (!canvas)
         return;
@@ -475,10 +601,11 @@ function initTransactionDoubleClick() {
 // ページ読み込み後にグラフとフィルターを初期化
 document.addEventListener('DOMContentLoaded', () => {
     if (document.getElementById('monthlyBarChart')) {
-        initializeYearlyCharts();
+        void initializeYearlyCharts();
     }
     else {
-        initializeExpenseCharts();
+        void initializeExpenseCharts();
+        void initializeBreakdownCharts();
     }
     initializeExpenseFilters();
     initLongPressDelete();